@@ -0,0 +1,30 @@
+-- Durham Region Transit trip-level records for SQL-side performance analysis
+-- Holds one row per operated trip with the derived fields the analysis groups on
+
+-- Trip Records Table
+CREATE TABLE IF NOT EXISTS trip_records (
+    route_id VARCHAR(50) NOT NULL,
+    route_name VARCHAR(255),
+    service_type VARCHAR(50),
+    trip_date DATE,
+    scheduled_departure TIMESTAMP,
+    actual_departure TIMESTAMP,
+    scheduled_arrival TIMESTAMP,
+    actual_arrival TIMESTAMP,
+    boardings INTEGER,
+    hour INTEGER,
+    delay_seconds DOUBLE PRECISION,
+    on_time INTEGER,
+    revenue_seconds DOUBLE PRECISION
+);
+
+-- Covering index for the per route/day/hour aggregation: the grouped scan
+-- reads only this index, already in group order
+CREATE INDEX IF NOT EXISTS idx_trip_records_partials ON trip_records(
+    route_id, route_name, service_type, trip_date, hour, boardings, on_time, delay_seconds, revenue_seconds
+);
+
+-- Date-range slices (reports over a sub-period of a large archive)
+CREATE INDEX IF NOT EXISTS idx_trip_records_date ON trip_records(
+    trip_date, route_id, route_name, service_type, hour, boardings, on_time, delay_seconds, revenue_seconds
+);
@@ -0,0 +1,28 @@
+-- GTFS service calendars loaded alongside routes, stops, trips and stop_times
+-- Lets trips.service_id be resolved to the dates a trip actually runs
+
+-- Weekly Service Patterns (calendar.txt)
+CREATE TABLE IF NOT EXISTS calendar (
+    service_id VARCHAR(50) PRIMARY KEY,
+    monday BOOLEAN NOT NULL,
+    tuesday BOOLEAN NOT NULL,
+    wednesday BOOLEAN NOT NULL,
+    thursday BOOLEAN NOT NULL,
+    friday BOOLEAN NOT NULL,
+    saturday BOOLEAN NOT NULL,
+    sunday BOOLEAN NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL
+);
+
+-- Service Exceptions (calendar_dates.txt): 1 = service added, 2 = service removed
+CREATE TABLE IF NOT EXISTS calendar_dates (
+    service_id VARCHAR(50) NOT NULL,
+    service_date DATE NOT NULL,
+    exception_type INTEGER NOT NULL CHECK (exception_type IN (1, 2)),
+    PRIMARY KEY (service_id, service_date)
+);
+
+-- Stop-level schedule lookups (headways, departures per stop)
+CREATE INDEX IF NOT EXISTS idx_stop_times_stop ON stop_times(stop_id);
+CREATE INDEX IF NOT EXISTS idx_trips_service ON trips(service_id);
@@ -0,0 +1,73 @@
+"""
+Durham Region Transit CSV Partitioning
+Splits a trip CSV into line-aligned byte ranges that can be parsed independently
+"""
+
+import io
+import os
+from typing import List, Tuple
+
+
+def split_csv_byte_ranges(path: str, partitions: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Split a CSV into contiguous, line-aligned byte ranges
+
+    Assumes records do not contain embedded newlines (true for trip exports).
+
+    Args:
+        path: CSV file with a single header line
+        partitions: Desired number of ranges (fewer are returned for tiny files)
+
+    Returns:
+        (header line bytes, [(start, end), ...]) covering every data row once
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+
+        boundaries = [data_start]
+        for i in range(1, partitions):
+            target = data_start + (size - data_start) * i // partitions
+            if target <= boundaries[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()  # move to the start of the next full line
+            position = f.tell()
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+        boundaries.append(size)
+
+    ranges = [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+    return header, ranges
+
+
+class CSVByteRangeReader(io.RawIOBase):
+    """Read-only stream of a header line followed by one byte range of a file"""
+
+    def __init__(self, path: str, header: bytes, start: int, end: int):
+        super().__init__()
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._header = header
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer)
+        if self._header:
+            n = min(len(view), len(self._header))
+            view[:n] = self._header[:n]
+            self._header = self._header[n:]
+            return n
+        if self._remaining <= 0:
+            return 0
+        n = self._file.readinto(view[:min(len(view), self._remaining)])
+        self._remaining -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
@@ -0,0 +1,376 @@
+"""
+Durham Region Transit Headway Regularity
+Stop-level headways, bunching and gaps from observed stop events, in bounded memory
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Union
+from pandas.api.types import union_categoricals
+from time_segmentation import TimePeriodScheme, DRT_SERVICE_PERIODS
+from trip_dataset import TripDataset
+from instrumentation import stage
+
+# One row per vehicle arrival at a stop (AVL / APC stop events)
+STOP_EVENT_COLUMNS = [
+    'route_id', 'direction_id', 'stop_id', 'trip_date',
+    'scheduled_arrival', 'actual_arrival'
+]
+
+# Headways are taken between consecutive trips of the same route and
+# direction at a stop, within one service day
+HEADWAY_KEYS = ['route_id', 'direction_id', 'stop_id']
+
+# Like the trip partials, every measure is a plain sum of whole seconds or
+# counts, so partial tables from different buckets or chunks merge by adding
+HEADWAY_MEASURES = [
+    'headways', 'scheduled_seconds', 'observed_seconds',
+    'deviation_seconds', 'deviation_sq_seconds', 'bunched', 'gaps'
+]
+
+# Bunched: observed headway under 25% of scheduled; gap: over twice scheduled
+BUNCHING_RATIO = 0.25
+GAP_RATIO = 2.0
+
+# Seconds value of a missing (NaT) timestamp after _prepare_events
+NO_TIME = np.iinfo(np.int64).min
+
+
+def _seconds(values: pd.Series) -> np.ndarray:
+    """Timestamps (or timestamp strings) as int64 epoch seconds, NO_TIME for missing"""
+    stamps = pd.to_datetime(values)
+    seconds = stamps.to_numpy('datetime64[s]').astype(np.int64)
+    return np.where(stamps.isna().to_numpy(), NO_TIME, seconds)
+
+
+def _prepare_events(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduce raw stop events to keys plus integer times
+
+    Keys become categoricals (small to spill, and coded once per chunk).
+    Events without a scheduled arrival cannot be placed in the schedule
+    and are dropped; a missing actual arrival marks a trip that was not
+    observed (e.g. cancelled) at that stop.
+    """
+    missing = [col for col in STOP_EVENT_COLUMNS if col not in events.columns]
+    if missing:
+        raise ValueError(f"Missing stop event columns: {missing}")
+
+    prepared = pd.DataFrame({
+        'route_id': events['route_id'].astype('category').array,
+        'direction_id': events['direction_id'].astype('category').array,
+        'stop_id': events['stop_id'].astype('category').array,
+        'service_day': (_seconds(events['trip_date']) // 86400).astype(np.int32),
+        'scheduled': _seconds(events['scheduled_arrival']),
+        'actual': _seconds(events['actual_arrival'])
+    })
+    return prepared[prepared['scheduled'] != NO_TIME].reset_index(drop=True)
+
+
+def _key_codes(values: pd.Series):
+    """Integer codes and uniques; missing values (e.g. no direction_id) get their own code"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(np.int64)
+        uniques = values.cat.categories.to_numpy()
+        if (codes < 0).any():
+            codes[codes < 0] = len(uniques)
+            uniques = np.append(uniques.astype(object), np.nan)
+        return codes, uniques
+    return pd.factorize(values.to_numpy(), use_na_sentinel=False)
+
+
+def _concat_prepared(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate prepared chunks, merging their key categories instead of decoding them"""
+    if len(frames) == 1:
+        return frames[0]
+    combined = pd.concat([frame.drop(columns=HEADWAY_KEYS) for frame in frames], ignore_index=True)
+    for col in HEADWAY_KEYS:
+        combined[col] = union_categoricals([frame[col] for frame in frames])
+    return combined
+
+
+def headway_partials(events: pd.DataFrame, period_scheme: TimePeriodScheme = DRT_SERVICE_PERIODS,
+                     bunching_ratio: float = BUNCHING_RATIO, gap_ratio: float = GAP_RATIO,
+                     prepared: bool = False) -> pd.DataFrame:
+    """
+    Per (route, direction, stop, period) headway sums from complete stop event groups
+
+    Arrivals are ordered by (route, direction, stop, service day, scheduled
+    time) with one int64 sort. Each observed arrival's headway is the time
+    since the previous observed arrival of the group and is compared with
+    the scheduled headway from the previous scheduled trip, so a trip with
+    no actual arrival shows up as a gap for the one behind it. A headway
+    belongs to the period of its scheduled arrival.
+
+    Every event of a (route, direction, stop) must be in the frame; use
+    analyze_stop_events to split larger inputs into such groups.
+
+    Args:
+        events: Stop events with STOP_EVENT_COLUMNS
+        period_scheme: Time period definitions used to segment headways
+        bunching_ratio: Observed/scheduled headway ratio below which arrivals are bunched
+        gap_ratio: Observed/scheduled headway ratio above which a headway is a gap
+        prepared: events already went through _prepare_events
+
+    Returns:
+        HEADWAY_KEYS + time_period + HEADWAY_MEASURES, one row per group with
+        headways; the ratios used are kept in .attrs['thresholds']
+    """
+    if not prepared:
+        events = _prepare_events(events)
+    if events.empty:
+        return _with_thresholds(pd.DataFrame(columns=HEADWAY_KEYS + ['time_period'] + HEADWAY_MEASURES),
+                                bunching_ratio, gap_ratio)
+
+    route_codes, routes = _key_codes(events['route_id'])
+    direction_codes, directions = _key_codes(events['direction_id'])
+    stop_codes, stops = _key_codes(events['stop_id'])
+    stop_key = (route_codes.astype(np.int64) * len(directions) + direction_codes) * len(stops) + stop_codes
+    stop_groups, stop_keys = pd.factorize(stop_key)
+
+    service_day = events['service_day'].to_numpy()
+    scheduled = events['scheduled'].to_numpy()
+    actual = events['actual'].to_numpy()
+
+    # One sort: (stop group, day) in the high digits, scheduled time below
+    first_day = int(service_day.min())
+    days = int(service_day.max()) - first_day + 1
+    group = stop_groups.astype(np.int64) * days + (service_day - first_day)
+    offset = scheduled - scheduled.min()
+    span = int(offset.max()) + 1
+    if int(group.max()) + 1 < np.iinfo(np.int64).max // span:
+        order = np.argsort(group * span + offset, kind='stable')
+    else:
+        order = np.lexsort((offset, group))
+    group, scheduled, actual = group[order], scheduled[order], actual[order]
+
+    # Previous observed arrival of the same group, carried forward by index
+    index = np.arange(len(group))
+    observed = actual != NO_TIME
+    last_observed = np.maximum.accumulate(np.where(observed, index, -1))
+    previous = np.r_[-1, last_observed[:-1]]
+    has_previous = np.r_[False, group[1:] == group[:-1]]
+    valid = observed & has_previous & (previous >= 0)
+    valid[valid] &= group[previous[valid]] == group[valid]
+
+    observed_headway = actual[valid] - actual[previous[valid]]
+    scheduled_headway = scheduled[valid] - scheduled[index[valid] - 1]
+    timed = scheduled_headway > 0
+    observed_headway, scheduled_headway = observed_headway[timed], scheduled_headway[timed]
+    at = index[valid][timed]
+
+    # Period of each headway's scheduled arrival (naive local timestamps)
+    hour = (scheduled[at] // 3600) % 24
+    day_of_week = (group[at] % days + first_day + 3) % 7
+    period_codes = period_scheme.classify(hour, day_of_week).codes.astype(np.int64)
+    n_periods = len(period_scheme.labels)
+
+    stop_group = group[at] // days
+    bins = stop_group * n_periods + period_codes
+    n_bins = len(stop_keys) * n_periods
+    deviation = (observed_headway - scheduled_headway).astype(np.float64)
+    sums = {
+        'headways': np.bincount(bins, minlength=n_bins),
+        'scheduled_seconds': np.bincount(bins, scheduled_headway.astype(np.float64), n_bins),
+        'observed_seconds': np.bincount(bins, observed_headway.astype(np.float64), n_bins),
+        'deviation_seconds': np.bincount(bins, deviation, n_bins),
+        'deviation_sq_seconds': np.bincount(bins, deviation ** 2, n_bins),
+        'bunched': np.bincount(bins, observed_headway < bunching_ratio * scheduled_headway, n_bins).astype(np.int64),
+        'gaps': np.bincount(bins, observed_headway > gap_ratio * scheduled_headway, n_bins).astype(np.int64)
+    }
+
+    present = np.flatnonzero(sums['headways'])
+    stop_key = stop_keys[present // n_periods]
+    stop_code = stop_key % len(stops)
+    direction_code = (stop_key // len(stops)) % len(directions)
+    route_code = stop_key // len(stops) // len(directions)
+    partials = pd.DataFrame({
+        'route_id': np.asarray(routes)[route_code],
+        'direction_id': np.asarray(directions)[direction_code],
+        'stop_id': np.asarray(stops)[stop_code],
+        'time_period': pd.Categorical.from_codes(present % n_periods, categories=period_scheme.labels),
+        **{measure: sums[measure][present] for measure in HEADWAY_MEASURES}
+    })
+    return _with_thresholds(partials, bunching_ratio, gap_ratio)
+
+
+def _with_thresholds(partials: pd.DataFrame, bunching_ratio: float, gap_ratio: float) -> pd.DataFrame:
+    """Record the bunching / gap ratios a partial table was counted with"""
+    partials.attrs['thresholds'] = {'bunching_ratio': bunching_ratio, 'gap_ratio': gap_ratio}
+    return partials
+
+
+def _stop_hash(events: pd.DataFrame) -> np.ndarray:
+    """
+    Stable uint64 hash of each event's (route, direction, stop)
+
+    Values are hashed as strings, once per distinct value, so the same stop
+    lands in the same bucket whichever file or chunk it was read from.
+    """
+    combined = np.zeros(len(events), dtype=np.uint64)
+    for col in HEADWAY_KEYS:
+        codes, uniques = _key_codes(events[col])
+        hashes = pd.util.hash_array(np.asarray(uniques).astype(str).astype(object))
+        combined = combined * np.uint64(1_000_003) ^ hashes[codes]
+    return combined
+
+
+def spill_stop_events(frames: Iterable[pd.DataFrame], spill_dir: str, buckets: int = 64) -> Dict:
+    """
+    Hash-partition stop events by (route, direction, stop) into bucket files
+
+    Each chunk is reduced to integer times and split with one stable sort
+    on the bucket number; every bucket then holds complete stop groups and
+    can be analyzed on its own.
+
+    Returns:
+        {'events', 'chunks', 'paths': per-bucket lists of spill files}
+    """
+    paths = [[] for _ in range(buckets)]
+    events_seen = 0
+    chunks = 0
+    for chunk, frame in enumerate(frames):
+        prepared = _prepare_events(frame)
+        bucket = (_stop_hash(prepared) % np.uint64(buckets)).astype(np.int64)
+        order = np.argsort(bucket, kind='stable')
+        bounds = np.searchsorted(bucket[order], np.arange(buckets + 1))
+        for b in range(buckets):
+            if bounds[b + 1] > bounds[b]:
+                path = os.path.join(spill_dir, f'bucket-{b:04d}-part-{chunk:05d}.pkl')
+                prepared.take(order[bounds[b]:bounds[b + 1]]).to_pickle(path)
+                paths[b].append(path)
+        events_seen += len(prepared)
+        chunks += 1
+    return {'events': events_seen, 'chunks': chunks, 'paths': paths}
+
+
+def analyze_stop_events(source: Union[str, pd.DataFrame],
+                        period_scheme: TimePeriodScheme = DRT_SERVICE_PERIODS,
+                        chunksize: int = 5_000_000, buckets: int = 64, spill_dir: str = None,
+                        bunching_ratio: float = BUNCHING_RATIO, gap_ratio: float = GAP_RATIO) -> pd.DataFrame:
+    """
+    Headway partials for a stop event file, directory / glob of files, or frame
+
+    Input that fits in one chunk is analyzed directly. Larger input is read
+    chunk by chunk and spilled to hash buckets on disk (spill_stop_events),
+    then each bucket is analyzed in turn, so memory is bounded by the
+    largest bucket rather than the whole network-month.
+
+    Args:
+        source: Stop event CSV, directory or glob (see TripDataset), or a DataFrame
+        period_scheme: Time period definitions used to segment headways
+        chunksize: Rows parsed per CSV chunk
+        buckets: Number of hash buckets for spilled input
+        spill_dir: Directory for bucket files (default: a temporary directory,
+            removed afterwards)
+        bunching_ratio: See headway_partials
+        gap_ratio: See headway_partials
+
+    Returns:
+        Headway partial table (see headway_partials)
+    """
+    options = {'period_scheme': period_scheme, 'bunching_ratio': bunching_ratio, 'gap_ratio': gap_ratio}
+    if isinstance(source, pd.DataFrame):
+        with stage('headways.analyze', rows_in=len(source), mode='frame') as record:
+            partials = headway_partials(source, **options)
+            record['rows_out'] = len(partials)
+        return partials
+
+    frames = iter(TripDataset(source).read(columns=STOP_EVENT_COLUMNS, chunksize=chunksize))
+    first = next(frames, None)
+    if first is None:
+        raise ValueError(f"No stop events found in {source}")
+    second = next(frames, None)
+    if second is None:
+        with stage('headways.analyze', rows_in=len(first), mode='frame') as record:
+            partials = headway_partials(first, **options)
+            record['rows_out'] = len(partials)
+        return partials
+
+    owned = spill_dir is None
+    spill_dir = tempfile.mkdtemp(prefix='drt_headways_') if owned else spill_dir
+    os.makedirs(spill_dir, exist_ok=True)
+    try:
+        with stage('headways.spill', buckets=buckets) as record:
+            spilled = spill_stop_events(itertools.chain([first, second], frames), spill_dir, buckets)
+            record['rows_in'] = spilled['events']
+            record['chunks'] = spilled['chunks']
+
+        results = []
+        with stage('headways.analyze', rows_in=spilled['events'], mode='buckets') as record:
+            for bucket_paths in spilled['paths']:
+                if not bucket_paths:
+                    continue
+                bucket = _concat_prepared([pd.read_pickle(path) for path in bucket_paths])
+                results.append(headway_partials(bucket, prepared=True, **options))
+                for path in bucket_paths:
+                    os.remove(path)
+            partials = _with_thresholds(pd.concat(results, ignore_index=True), bunching_ratio, gap_ratio)
+            record['rows_out'] = len(partials)
+    finally:
+        if owned:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    print(f"[v0] Analyzed {spilled['events']:,} stop events in {spilled['chunks']} chunks "
+          f"via {sum(1 for p in spilled['paths'] if p)} buckets")
+    return partials
+
+
+def headway_metrics(partials: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    """
+    Regularity metrics per group of a headway partial table
+
+    headway_cv is the TCQSM headway adherence measure: standard deviation
+    of (observed - scheduled) headway over the mean scheduled headway.
+
+    Args:
+        partials: Table from headway_partials / analyze_stop_events
+        by: Any of HEADWAY_KEYS and 'time_period' ([] for system-wide)
+    """
+    if by:
+        sums = partials.groupby(by, observed=True, sort=True)[HEADWAY_MEASURES].sum().reset_index()
+    else:
+        sums = partials[HEADWAY_MEASURES].sum().to_frame().T
+
+    n = sums['headways']
+    variance = (sums['deviation_sq_seconds'] - sums['deviation_seconds'] ** 2 / n) / (n - 1)
+    metrics = sums[by].copy() if by else pd.DataFrame(index=sums.index)
+    metrics['headways'] = n.astype('int64')
+    metrics['scheduled_headway_minutes'] = sums['scheduled_seconds'] / n / 60
+    metrics['observed_headway_minutes'] = sums['observed_seconds'] / n / 60
+    metrics['headway_cv'] = np.sqrt(variance.clip(lower=0)).where(n > 1) / (sums['scheduled_seconds'] / n)
+    metrics['bunching_pct'] = sums['bunched'] / n * 100
+    metrics['gap_pct'] = sums['gaps'] / n * 100
+    return metrics.reset_index(drop=True)
+
+
+def summarize_regularity(partials: Optional[pd.DataFrame], top: int = 10, min_headways: int = 20) -> Optional[Dict]:
+    """
+    Report section: system, period and route regularity plus the worst stops
+
+    Args:
+        partials: Headway partial table (None when no stop events were loaded)
+        top: Stops listed per ranking
+        min_headways: Stops (per period) with fewer headways are not ranked
+
+    The reported thresholds are the ratios the partials were counted with.
+    """
+    if partials is None or partials.empty:
+        return None
+
+    stops = headway_metrics(partials, HEADWAY_KEYS + ['time_period'])
+    ranked = stops[stops['headways'] >= min_headways]
+    return {
+        'thresholds': dict(partials.attrs.get('thresholds', {'bunching_ratio': BUNCHING_RATIO,
+                                                              'gap_ratio': GAP_RATIO})),
+        'system': headway_metrics(partials, []).to_dict('records')[0],
+        'by_period': headway_metrics(partials, ['time_period']).to_dict('records'),
+        'by_route': headway_metrics(partials, ['route_id', 'direction_id']).to_dict('records'),
+        'least_regular_stops': ranked.nlargest(top, 'headway_cv').to_dict('records'),
+        'most_bunching_stops': ranked.nlargest(top, 'bunching_pct').to_dict('records'),
+        'stops_analyzed': int(stops[HEADWAY_KEYS].drop_duplicates().shape[0])
+    }
@@ -0,0 +1,205 @@
+"""
+Durham Region Transit Pipeline Instrumentation
+Per-stage wall time, CPU time, peak memory and row counts with a JSON-lines trace
+"""
+
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, memory fields are left empty
+    resource = None
+
+# Environment variable naming a JSON-lines file that receives every stage record
+TRACE_PATH_ENV = 'DRT_TRACE_PATH'
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """High-water resident set size of this process (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Tracer:
+    """
+    Records one entry per pipeline stage
+
+    Only clock reads and one getrusage() call happen per stage, so tracing
+    is cheap enough to leave on. Memory is the process peak RSS at stage
+    end and how much the stage raised it (0 if it stayed under an earlier
+    peak), rather than allocation tracking, which would slow numpy/pandas.
+
+    One tracer may be shared by threads: each thread nests its own stages,
+    and records and trace file lines are appended under a lock.
+    """
+
+    def __init__(self, trace_path: Optional[str] = None, max_records: int = 10_000):
+        """
+        Args:
+            trace_path: JSON-lines file each finished stage is appended to
+            max_records: Stage records kept in memory for summary()
+        """
+        self.trace_path = trace_path
+        self.records = deque(maxlen=max_records)
+        self._recorded = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _open_stages(self) -> List[str]:
+        """Names of the calling thread's unfinished stages, outermost first"""
+        if not hasattr(self._local, 'open'):
+            self._local.open = []
+        return self._local.open
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **fields) -> Iterator[Dict]:
+        """
+        Time a block of work
+
+        The yielded dict may be updated inside the block, e.g. with
+        rows_in / rows_out once they are known.
+        """
+        open_stages = self._open_stages()
+        record = {'stage': name, 'parent': open_stages[-1] if open_stages else None,
+                  'depth': len(open_stages)}
+        record.update(fields)
+        open_stages.append(name)
+
+        rss_before = peak_rss_bytes()
+        started_at = datetime.now().isoformat()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        except BaseException as exc:
+            record['error'] = type(exc).__name__
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            rss_after = peak_rss_bytes()
+            open_stages.pop()
+
+            record.update({
+                'started_at': started_at,
+                'wall_s': round(wall, 6),
+                'cpu_s': round(cpu, 6),
+                'peak_rss_mb': round(rss_after / 1024 ** 2, 2) if rss_after is not None else None,
+                'peak_rss_increase_mb': round((rss_after - rss_before) / 1024 ** 2, 2)
+                if rss_after is not None else None
+            })
+            line = json.dumps(record, default=str) + '\n' if self.trace_path else None
+            with self._lock:
+                self.records.append(record)
+                self._recorded += 1
+                if line:
+                    self._write(line)
+
+    def _write(self, line: str):
+        with open(self.trace_path, 'a') as f:
+            f.write(line)
+
+    def mark(self) -> int:
+        """Number of stages finished so far; pass to summary(since=...) to scope it"""
+        with self._lock:
+            return self._recorded
+
+    def _snapshot(self, since: int = 0) -> List[Dict]:
+        with self._lock:
+            # Stages evicted by max_records are gone; skip those before since
+            first = self._recorded - len(self.records)
+            return list(self.records)[max(since - first, 0):]
+
+    def summary(self, since: int = 0) -> Dict:
+        """
+        Top-level totals plus one compact entry per recorded stage
+
+        Args:
+            since: Only count stages finished after this mark()
+        """
+        records = self._snapshot(since)
+        top_level = [r for r in records if r['parent'] is None]
+        peaks = [r['peak_rss_mb'] for r in records if r['peak_rss_mb'] is not None]
+        return {
+            'total_wall_s': round(sum(r['wall_s'] for r in top_level), 3),
+            'total_cpu_s': round(sum(r['cpu_s'] for r in top_level), 3),
+            'peak_rss_mb': max(peaks) if peaks else None,
+            'stages': [
+                {key: r[key] for key in ('stage', 'parent', 'wall_s', 'cpu_s', 'peak_rss_increase_mb',
+                                         'rows_in', 'rows_out') if r.get(key) is not None}
+                for r in records
+            ]
+        }
+
+    def format_summary(self) -> List[str]:
+        """Human-readable stage table lines"""
+        lines = [f"{'stage':40s} {'wall s':>9s} {'cpu s':>9s} {'+rss MB':>9s} {'rows':>12s}"]
+        for r in self._snapshot():
+            indent = '  ' * r['depth']
+            rows = r.get('rows_out', r.get('rows_in'))
+            rss = r['peak_rss_increase_mb']
+            lines.append(
+                f"{indent + r['stage']:40s} {r['wall_s']:9.3f} {r['cpu_s']:9.3f} "
+                f"{rss if rss is not None else '':>9} {f'{rows:,}' if rows is not None else '':>12s}"
+            )
+        return lines
+
+
+_default = Tracer(os.environ.get(TRACE_PATH_ENV))
+
+# Per-thread override set by use_tracer()
+_routing = threading.local()
+
+
+def active_tracer() -> Tracer:
+    """Tracer that stage() and @traced record into on the calling thread"""
+    return getattr(_routing, 'tracer', None) or _default
+
+
+@contextlib.contextmanager
+def use_tracer(tracer: Tracer):
+    """Route the calling thread's stage records to tracer for the duration of the block"""
+    previous = getattr(_routing, 'tracer', None)
+    _routing.tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _routing.tracer = previous
+
+
+def stage(name: str, **fields):
+    """Time a block of work on the active tracer"""
+    return active_tracer().stage(name, **fields)
+
+
+def traced(name: str) -> Callable:
+    """
+    Decorator recording a function call as a stage
+
+    rows_in is the length of the first argument and rows_out the length of
+    the result, whenever those are DataFrames.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with active_tracer().stage(name) as record:
+                if args and hasattr(args[0], 'columns'):
+                    record['rows_in'] = len(args[0])
+                result = fn(*args, **kwargs)
+                if hasattr(result, 'columns'):
+                    record['rows_out'] = len(result)
+                return result
+        return wrapper
+    return decorator
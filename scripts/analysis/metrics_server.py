@@ -0,0 +1,357 @@
+"""
+Durham Region Transit Metrics Query Server
+Local HTTP service answering route- and date-filtered metric queries for the dashboard
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+from ridership_analysis import RidershipAnalyzer
+from trip_aggregates import TripAggregates
+from trip_dataset import TripDataset
+from report_export import json_default
+
+# Endpoint -> RidershipAnalyzer method evaluated on the filtered partials
+QUERY_ENDPOINTS = {
+    '/api/overview': 'get_data_overview',
+    '/api/boardings': 'compute_boardings_analysis',
+    '/api/ontime': 'compute_ontime_performance',
+    '/api/productivity': 'compute_productivity_metrics',
+    '/api/timeseries': 'generate_time_series_data',
+    '/api/heatmap': 'generate_heatmap_data'
+}
+
+
+class QueryError(ValueError):
+    """Invalid query parameters (HTTP 400)"""
+
+
+class TTLLRUCache:
+    """
+    Thread-safe result cache with per-entry expiry and least-recently-used eviction
+
+    get_or_compute() coalesces concurrent misses: the first thread to miss
+    a key computes it while the others wait for that result.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute: Callable) -> Tuple[object, bool]:
+        """
+        Cached value for key, calling compute() at most once per concurrent miss
+
+        Threads that miss while another thread is computing the same key wait
+        for its result (or its exception). Results computed across a clear()
+        are returned to the threads already waiting but not stored, and
+        misses after the clear() start a fresh computation.
+
+        Returns:
+            (value, False if this call computed it)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], True
+            if entry is not None:
+                del self._entries[key]
+            pending = self._pending.get(key)
+            leader = pending is None
+            if leader:
+                self.misses += 1
+                pending = self._pending[key] = Future()
+                generation = self._generation
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return pending.result(), True
+        try:
+            value = compute()
+        except BaseException as exc:
+            with self._lock:
+                self._release(key, pending)
+            pending.set_exception(exc)
+            raise
+        with self._lock:
+            self._release(key, pending)
+            if generation == self._generation:
+                self._store(key, value)
+        pending.set_result(value)
+        return value, False
+
+    def _release(self, key, pending: Future):
+        # After a clear() another leader may already own the key
+        if self._pending.get(key) is pending:
+            del self._pending[key]
+
+    def clear(self):
+        """Drop every entry; later misses recompute instead of waiting on in-flight results"""
+        with self._lock:
+            self._entries.clear()
+            self._pending = {}
+            self._generation += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._pending),
+                'hit_rate': round((self.hits + self.coalesced) / lookups, 4) if lookups else None
+            }
+
+
+class MetricsQueryService:
+    """
+    Answers filtered metric queries from one loaded analyzer
+
+    The partial aggregates are built once; each query masks them by route
+    and date and evaluates the regular RidershipAnalyzer metric method on
+    that slice, so filtered numbers use exactly the report's definitions.
+    Encoded responses are cached by normalized query.
+    """
+
+    def __init__(self, analyzer: RidershipAnalyzer, cache_size: int = 512, cache_ttl: float = 300.0):
+        """
+        Args:
+            analyzer: Loaded analyzer (any load mode)
+            cache_size: Maximum cached responses
+            cache_ttl: Seconds a cached response stays valid
+        """
+        self.analyzer = analyzer
+        self.cache = TTLLRUCache(cache_size, cache_ttl)
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._refresh()
+
+    def _refresh(self):
+        """(Re)index the analyzer's partials; called again if its data changes"""
+        self.analyzer.get_data_overview()  # builds the partials once, up front
+        table = self.analyzer.aggregates.table
+        self._table = table
+        self._fields = list(self.analyzer.aggregates.fields)
+        self._route_keys = table['route_id'].astype(str).to_numpy()
+        self._dates = table['trip_date'].to_numpy()
+        sketches = self.analyzer.aggregates.sketches
+        self._sketches = sketches
+        if sketches is not None:
+            self._sketch_route_keys = sketches['route_id'].astype(str).to_numpy()
+            self._sketch_dates = sketches['trip_date'].to_numpy()
+        routes = self.analyzer.route_summary()[['route_id', 'route_name', 'service_type']]
+        self._routes_body = self._encode(routes.to_dict('records'))
+        self._data_version = self.analyzer.data_version
+        self.cache.clear()
+
+    @staticmethod
+    def normalize_query(params: Dict[str, Sequence[str]]) -> Tuple:
+        """(sorted routes or None, start YYYY-MM-DD or None, end YYYY-MM-DD or None)"""
+        routes = None
+        if params.get('route'):
+            values = (r.strip() for value in params['route'] for r in value.split(','))
+            routes = tuple(sorted({r for r in values if r}))
+
+        def day(name):
+            value = (params.get(name) or [None])[0]
+            if not value:
+                return None
+            try:
+                return pd.Timestamp(value).strftime('%Y-%m-%d')
+            except ValueError:
+                raise QueryError(f"Invalid {name} date: {value!r}")
+
+        start, end = day('start'), day('end')
+        if start and end and start > end:
+            raise QueryError(f"start ({start}) is after end ({end})")
+        return routes, start, end
+
+    def _slice(self, routes: Optional[Tuple[str, ...]], start: Optional[str],
+               end: Optional[str]) -> Optional[RidershipAnalyzer]:
+        """Analyzer over the partial rows matching the filters (None if empty)"""
+        table = self._filter(self._table, self._route_keys, self._dates, routes, start, end)
+        if table.empty:
+            return None
+        sketches = None
+        if self._sketches is not None:
+            sketches = self._filter(self._sketches, self._sketch_route_keys, self._sketch_dates,
+                                    routes, start, end)
+        return RidershipAnalyzer.from_aggregates(TripAggregates(table, self._fields, sketches),
+                                                 self.analyzer.period_scheme)
+
+    @staticmethod
+    def _filter(frame: pd.DataFrame, route_keys, dates, routes, start, end) -> pd.DataFrame:
+        mask = None
+        if routes is not None:
+            mask = pd.Series(route_keys).isin(routes).to_numpy()
+        if start:
+            in_range = dates >= pd.Timestamp(start).to_datetime64()
+            mask = in_range if mask is None else mask & in_range
+        if end:
+            in_range = dates <= pd.Timestamp(end).to_datetime64()
+            mask = in_range if mask is None else mask & in_range
+        return frame if mask is None else frame[mask].reset_index(drop=True)
+
+    def query(self, endpoint: str, params: Dict[str, Sequence[str]]) -> Tuple[int, bytes, bool]:
+        """
+        Run (or serve from cache) one query
+
+        Returns:
+            (HTTP status, JSON body, served from cache)
+        """
+        with self._lock:
+            if self._data_version != self.analyzer.data_version:
+                self._refresh()
+
+        if endpoint == '/api/health':
+            return 200, self._encode({'status': 'ok', 'cache': self.cache.stats()}), False
+        if endpoint == '/api/routes':
+            return 200, self._routes_body, False
+        if endpoint not in QUERY_ENDPOINTS:
+            return 404, self._encode({'error': f"Unknown endpoint {endpoint}",
+                                      'endpoints': sorted(QUERY_ENDPOINTS)}), False
+
+        try:
+            routes, start, end = self.normalize_query(params)
+        except QueryError as exc:
+            return 400, self._encode({'error': str(exc)}), False
+
+        # Concurrent identical misses compute the response once
+        response, cached = self.cache.get_or_compute(
+            (endpoint, routes, start, end), lambda: self._compute(endpoint, routes, start, end)
+        )
+        return response[0], response[1], cached
+
+    def _compute(self, endpoint: str, routes: Optional[Tuple[str, ...]], start: Optional[str],
+                 end: Optional[str]) -> Tuple[int, bytes]:
+        """(HTTP status, JSON body) for one normalized query"""
+        view = self._slice(routes, start, end)
+        if view is None:
+            return 404, self._encode({'error': 'No trips match the query',
+                                      'route': routes, 'start': start, 'end': end})
+        result = getattr(view, QUERY_ENDPOINTS[endpoint])()
+        return 200, self._encode({'query': {'route': routes, 'start': start, 'end': end},
+                                  'result': result})
+
+    @staticmethod
+    def _encode(payload) -> bytes:
+        return json.dumps(_nan_to_none(payload), separators=(',', ':'), default=json_default).encode('utf-8')
+
+
+def _nan_to_none(value):
+    """NaN is not valid JSON for browsers; send null instead"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _nan_to_none(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_nan_to_none(item) for item in value]
+    return value
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """GET /api/<metric>?route=...&start=YYYY-MM-DD&end=YYYY-MM-DD"""
+
+    service: MetricsQueryService = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            status, body, cached = self.service.query(url.path.rstrip('/') or '/', parse_qs(url.query))
+        except Exception as exc:  # keep serving; report the failure to the client
+            status, body, cached = 500, MetricsQueryService._encode({'error': str(exc)}), False
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('X-Cache', 'HIT' if cached else 'MISS')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(service: MetricsQueryService, host: str = '127.0.0.1', port: int = 8050) -> ThreadingHTTPServer:
+    """Threaded HTTP server bound to service (port 0 picks a free port)"""
+    handler = type('BoundMetricsRequestHandler', (MetricsRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def load_analyzer(source: str, chunksize: int = None) -> RidershipAnalyzer:
+    """Analyzer from saved aggregate state (.pkl), a partitioned dataset or a trip CSV"""
+    if source.endswith('.pkl'):
+        return RidershipAnalyzer.from_state(source)
+    if os.path.isdir(source) or any(ch in source for ch in '*?['):
+        return RidershipAnalyzer.from_dataset(TripDataset(source), chunksize=chunksize)
+    return RidershipAnalyzer(source, chunksize=chunksize)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve filtered DRT metrics over HTTP')
+    parser.add_argument('source', help='Trip CSV, partitioned directory/glob, or saved state (.pkl)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--cache-size', type=int, default=512)
+    parser.add_argument('--cache-ttl', type=float, default=300.0)
+    args = parser.parse_args()
+
+    service = MetricsQueryService(load_analyzer(args.source, args.chunksize), args.cache_size, args.cache_ttl)
+    server = make_server(service, args.host, args.port)
+    print(f"[v0] Serving metrics on http://{args.host}:{server.server_port}/api/ "
+          f"({', '.join(sorted(QUERY_ENDPOINTS))})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
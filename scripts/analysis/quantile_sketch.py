@@ -0,0 +1,117 @@
+"""
+Durham Region Transit Delay Quantile Sketches
+Mergeable log-bucketed histograms giving bounded relative-error delay percentiles
+"""
+
+import numpy as np
+import pandas as pd
+from typing import List, Sequence
+
+# Relative accuracy of every sketch in the pipeline. Sketches built with
+# different accuracies cannot be merged, so this is a single constant
+# (changing it invalidates saved aggregate state).
+DELAY_SKETCH_ACCURACY = 0.01
+
+# Grain sketches are stored at; coarser groupings are merges of these rows
+SKETCH_KEYS = ['route_id', 'trip_date', 'time_period']
+
+SKETCH_QUANTILES = (0.5, 0.9, 0.95)
+
+
+class DelaySketchMapping:
+    """
+    Maps delays (seconds) to signed logarithmic bins, DDSketch style
+
+    Bin k > 0 holds delays in (gamma^(k-2), gamma^(k-1)], bin -k the same
+    magnitudes early, and bin 0 delays under one second. Every value in a
+    bin is within relative_accuracy of the bin's representative value, so
+    a quantile read from bin counts has that relative error bound. Counts
+    are integers, so merged sketches do not depend on merge order.
+    """
+
+    def __init__(self, relative_accuracy: float = DELAY_SKETCH_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+
+    def bins(self, delay_seconds) -> np.ndarray:
+        """Bin index per delay (NaN delays are not binned; filter them first)"""
+        values = np.asarray(delay_seconds, dtype=np.float64)
+        magnitude = np.abs(values)
+        index = np.zeros(len(values), dtype=np.int32)
+        binned = magnitude >= 1
+        index[binned] = np.ceil(np.log(magnitude[binned]) / self._log_gamma).astype(np.int32) + 1
+        return np.where(values < 0, -index, index)
+
+    def values(self, bins) -> np.ndarray:
+        """Representative delay (seconds) of each bin"""
+        bins = np.asarray(bins)
+        magnitude = 2 * self.gamma ** (np.abs(bins) - 1) / (self.gamma + 1)
+        return np.where(bins == 0, 0.0, np.sign(bins) * magnitude)
+
+
+DELAY_SKETCH = DelaySketchMapping()
+
+
+def sketch_from_frame(df: pd.DataFrame, delay_seconds: pd.Series,
+                      mapping: DelaySketchMapping = DELAY_SKETCH) -> pd.DataFrame:
+    """
+    Sparse sketch table (SKETCH_KEYS + delay_bin -> count) for enriched trips
+
+    Args:
+        df: Enriched trip frame with the SKETCH_KEYS columns
+        delay_seconds: Arrival delay per trip (NaN rows are skipped)
+        mapping: Bin mapping
+    """
+    present = delay_seconds.notna().to_numpy()
+    work = df.loc[present, SKETCH_KEYS].assign(
+        delay_bin=mapping.bins(delay_seconds.to_numpy()[present]),
+        count=1
+    )
+    work['trip_date'] = work['trip_date'].dt.normalize()
+    return work.groupby(SKETCH_KEYS + ['delay_bin'], dropna=False, observed=True,
+                        sort=True)['count'].sum().reset_index()
+
+
+def merge_sketches(tables: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """Merge sketch tables by adding bin counts"""
+    tables = [t for t in tables if t is not None]
+    if not tables:
+        return None
+    if len(tables) == 1:
+        return tables[0]
+    return pd.concat(tables, ignore_index=True).groupby(
+        SKETCH_KEYS + ['delay_bin'], dropna=False, observed=True, sort=True
+    )['count'].sum().reset_index()
+
+
+def sketch_quantiles(sketch: pd.DataFrame, by: List[str], quantiles: Sequence[float] = SKETCH_QUANTILES,
+                     mapping: DelaySketchMapping = DELAY_SKETCH) -> pd.DataFrame:
+    """
+    Delay quantiles in minutes per group of sketch rows
+
+    Args:
+        sketch: Sketch table (any subset of rows, e.g. a date slice)
+        by: Grouping columns (subset of SKETCH_KEYS; [] for one overall row)
+        quantiles: Quantiles to estimate
+
+    Returns:
+        One row per group with delay_p50_minutes-style columns
+    """
+    merged = sketch.groupby(by + ['delay_bin'], observed=True, sort=True)['count'].sum().reset_index() \
+        if by else sketch.groupby('delay_bin', sort=True)['count'].sum().reset_index()
+
+    group_ids = merged.groupby(by, observed=True, sort=False).ngroup().to_numpy() if by \
+        else np.zeros(len(merged), dtype=np.int64)
+    counts = merged['count'].to_numpy()
+    cumulative = merged.groupby(group_ids)['count'].cumsum().to_numpy()
+    totals = np.bincount(group_ids, weights=counts)
+    starts = np.r_[0, np.flatnonzero(np.diff(group_ids)) + 1]
+
+    result = merged.iloc[starts][by].reset_index(drop=True) if by else pd.DataFrame(index=[0])
+    for q in quantiles:
+        # First bin whose cumulative count passes rank q * (n - 1)
+        passed = cumulative > q * (totals[group_ids] - 1)
+        first = pd.Series(passed).groupby(group_ids).idxmax().to_numpy()
+        result[f'delay_p{int(round(q * 100))}_minutes'] = mapping.values(merged['delay_bin'].to_numpy()[first]) / 60
+    return result
@@ -0,0 +1,255 @@
+"""
+Durham Region Transit Report Export
+Streams report sections to JSON (row or columnar layout) and large tables to NumPy archives
+"""
+
+import json
+import math
+import os
+import time
+import numpy as np
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+LAYOUTS = ('records', 'columnar')
+MANIFEST_NAME = 'manifest.json'
+
+# Values of a binary table's '<col>.missing' array
+MISSING_NONE, MISSING_NAN = 1, 2
+
+
+def json_default(value):
+    """Serialize numpy scalars/arrays that pandas results can leave behind"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def is_record_table(value) -> bool:
+    """A non-empty list of dicts that all share the same keys"""
+    if not isinstance(value, list) or not value or not isinstance(value[0], dict):
+        return False
+    keys = value[0].keys()
+    return all(isinstance(row, dict) and row.keys() == keys for row in value)
+
+
+def to_columnar(value):
+    """
+    Recursively turn record tables into {'columns': [...], 'data': {col: [...]}}
+
+    Each column name appears once instead of once per row, which is what
+    makes the layout smaller and faster to parse for wide daily/heatmap tables.
+    """
+    if is_record_table(value):
+        columns = list(value[0].keys())
+        return {
+            'columns': columns,
+            'data': {col: [to_columnar(row[col]) for row in value] for col in columns}
+        }
+    if isinstance(value, dict):
+        return {key: to_columnar(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_columnar(item) for item in value]
+    return value
+
+
+def from_columnar(value):
+    """Inverse of to_columnar(): column tables back to lists of row dicts"""
+    if isinstance(value, dict) and set(value) == {'columns', 'data'}:
+        columns = value['columns']
+        data = value['data']
+        length = len(data[columns[0]]) if columns else 0
+        return [{col: from_columnar(data[col][i]) for col in columns} for i in range(length)]
+    if isinstance(value, dict):
+        return {key: from_columnar(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [from_columnar(item) for item in value]
+    return value
+
+
+def _extract_tables(value, path: str, min_rows: int, tables: Dict) -> object:
+    """Replace large record tables with references, collecting them in tables"""
+    if is_record_table(value) and len(value) >= min_rows:
+        tables[path] = value
+        return {'$table': path, 'rows': len(value)}
+    if isinstance(value, dict):
+        return {key: _extract_tables(item, f'{path}.{key}', min_rows, tables) for key, item in value.items()}
+    return value
+
+
+def _save_table_npz(path: str, rows: List[Dict]):
+    """
+    One array per column; strings and mixed values are stored as unicode
+
+    None and NaN in object columns are recorded in a '<col>.missing' array
+    and restored by _load_table_npz(), so binary tables load with the same
+    values as the JSON export.
+    """
+    columns = {}
+    for col in rows[0]:
+        values = [row[col] for row in rows]
+        array = np.asarray(values)
+        if array.dtype == object:
+            missing = np.array([_missing_marker(v) for v in values], dtype=np.int8)
+            present = [v for v, marker in zip(values, missing) if not marker]
+            # Missing slots hold a present value so the column keeps its type
+            fill = present[0] if present else ''
+            array = np.asarray([fill if marker else v for v, marker in zip(values, missing)])
+            if array.dtype == object:
+                array = np.asarray([str(v) for v in array])
+            if missing.any():
+                columns[f'{col}.missing'] = missing
+        columns[col] = array
+    np.savez_compressed(path, **columns)
+
+
+def _missing_marker(value) -> int:
+    if value is None:
+        return MISSING_NONE
+    if isinstance(value, float) and math.isnan(value):
+        return MISSING_NAN
+    return 0
+
+
+def _load_table_npz(path: str) -> Dict:
+    with np.load(path) as archive:
+        columns = [name for name in archive.files if not name.endswith('.missing')]
+        data = {}
+        for col in columns:
+            values = archive[col].tolist()
+            if f'{col}.missing' in archive.files:
+                for i, marker in enumerate(archive[f'{col}.missing'].tolist()):
+                    if marker:
+                        values[i] = None if marker == MISSING_NONE else float('nan')
+            data[col] = values
+        return {'columns': columns, 'data': data}
+
+
+def write_report_json(report_data: Dict, output_path: str, layout: str = 'records',
+                      indent: Optional[int] = 2) -> Dict:
+    """
+    Write the report one section at a time
+
+    Each top-level section is encoded and written on its own, so the whole
+    document never exists as a single string. With layout='records' and
+    indent=2 the output is identical to json.dump(report_data, f, indent=2).
+
+    Returns:
+        {'path', 'bytes', 'seconds'}
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r}; expected one of {LAYOUTS}")
+
+    start = time.perf_counter()
+    separators = (',', ': ') if indent is not None else (',', ':')
+    pad = '\n' + ' ' * indent if indent is not None else ''
+
+    with open(output_path, 'w') as f:
+        f.write('{')
+        for i, (name, section) in enumerate(report_data.items()):
+            if layout == 'columnar':
+                section = to_columnar(section)
+            encoded = json.dumps(section, indent=indent, separators=separators, default=json_default)
+            if indent is not None:
+                # JSON strings never contain raw newlines, so this only re-indents structure
+                encoded = encoded.replace('\n', pad)
+            f.write((',' if i else '') + pad + json.dumps(name) + separators[1] + encoded)
+        f.write(('\n' if indent is not None else '') + '}')
+
+    return {'path': output_path, 'bytes': os.path.getsize(output_path),
+            'seconds': round(time.perf_counter() - start, 6)}
+
+
+def export_sections(report_data: Dict, output_dir: str, layout: str = 'columnar',
+                    binary_tables: bool = False, min_binary_rows: int = 1000,
+                    sections: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Write each report section to its own file plus a manifest
+
+    Dashboards read manifest.json and fetch only the sections they show.
+
+    Args:
+        report_data: Report dict from DRTReportGenerator.generate_full_report
+        output_dir: Directory for <section>.json files and manifest.json
+        layout: 'columnar' (column arrays) or 'records' (one dict per row)
+        binary_tables: Store record tables with at least min_binary_rows rows
+            as compressed .npz column archives referenced from the JSON
+        min_binary_rows: Size threshold for binary tables
+        sections: Subset of top-level sections to write (default: all)
+
+    Returns:
+        Manifest dict (also written to output_dir/manifest.json)
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r}; expected one of {LAYOUTS}")
+    os.makedirs(output_dir, exist_ok=True)
+    names = list(sections) if sections is not None else list(report_data)
+
+    manifest = {
+        'generated_at': datetime.now().isoformat(),
+        'layout': layout,
+        'sections': {}
+    }
+
+    for name in names:
+        start = time.perf_counter()
+        section = report_data[name]
+        tables = {}
+        if binary_tables:
+            section = _extract_tables(section, name, min_binary_rows, tables)
+        if layout == 'columnar':
+            section = to_columnar(section)
+
+        entry = {'file': f'{name}.json', 'tables': {}}
+        path = os.path.join(output_dir, entry['file'])
+        with open(path, 'w') as f:
+            json.dump(section, f, separators=(',', ':'), default=json_default)
+        size = os.path.getsize(path)
+
+        for table_path, rows in tables.items():
+            table_file = f'{table_path}.npz'
+            _save_table_npz(os.path.join(output_dir, table_file), rows)
+            table_bytes = os.path.getsize(os.path.join(output_dir, table_file))
+            entry['tables'][table_path] = {'file': table_file, 'rows': len(rows), 'bytes': table_bytes}
+            size += table_bytes
+
+        entry['bytes'] = size
+        entry['seconds'] = round(time.perf_counter() - start, 6)
+        manifest['sections'][name] = entry
+
+    manifest['total_bytes'] = sum(s['bytes'] for s in manifest['sections'].values())
+    manifest['total_seconds'] = round(sum(s['seconds'] for s in manifest['sections'].values()), 6)
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_section(output_dir: str, name: str, layout: str = 'records'):
+    """
+    Read one exported section, resolving binary table references
+
+    Args:
+        output_dir: Directory written by export_sections()
+        name: Top-level section name
+        layout: Return tables as 'records' (row dicts) or 'columnar'
+    """
+    with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    entry = manifest['sections'][name]
+    with open(os.path.join(output_dir, entry['file'])) as f:
+        section = json.load(f)
+
+    def resolve(value):
+        if isinstance(value, dict) and '$table' in value:
+            return _load_table_npz(os.path.join(output_dir, entry['tables'][value['$table']]['file']))
+        if isinstance(value, dict):
+            return {key: resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [resolve(item) for item in value]
+        return value
+
+    section = resolve(section)
+    return from_columnar(section) if layout == 'records' else section
@@ -3,75 +3,206 @@ Durham Region Transit Report Generator
 Produces structured municipal transit planning reports
 """
 
-import json
+import os
+import sys
 from datetime import datetime
+from typing import Dict, List
 from ridership_analysis import RidershipAnalyzer
+from trip_dataset import TripDataset
+from instrumentation import Tracer, use_tracer, TRACE_PATH_ENV
+from report_export import write_report_json, export_sections
+
+# Report sections: name -> (sections it is derived from, progress message).
+# Each is built by DRTReportGenerator._build_<name>, in this order for full reports.
+REPORT_SECTIONS = {
+    'data_overview': ((), 'Generating data overview...'),
+    'boardings': ((), 'Computing boardings analysis...'),
+    'ontime_performance': ((), 'Computing on-time performance...'),
+    'headway_regularity': ((), 'Computing headway regularity...'),
+    'productivity': ((), 'Computing productivity metrics...'),
+    'timeseries': ((), 'Generating time series data...'),
+    'heatmap': ((), 'Generating heatmap data...'),
+    'recommendations': (('boardings', 'ontime_performance', 'productivity'),
+                        'Generating comprehensive optimization recommendations...'),
+    'executive_summary': (('data_overview', 'boardings', 'ontime_performance', 'productivity'), None),
+    'methodology': ((), None),
+    'limitations': ((), None)
+}
 
 class DRTReportGenerator:
     """Generates comprehensive transit analysis reports"""
     
-    def __init__(self, csv_path: str):
-        """Initialize report generator with data"""
-        self.analyzer = RidershipAnalyzer(csv_path)
+    def __init__(self, csv_path: str, chunksize: int = None,
+                 cache_dir: str = None, use_cache: bool = True, compact: bool = False,
+                 workers: int = 1, start_date: str = None, end_date: str = None,
+                 routes: List[str] = None, trace_path: str = None, stop_events: str = None):
+        """
+        Initialize report generator with data
+        
+        Args:
+            csv_path: Path to CSV file containing trip records, or a directory /
+                glob of partitioned trip files (see TripDataset)
+            chunksize: Stream the CSV in chunks of this many rows (bounded memory)
+            cache_dir: Enriched trip frame cache directory shared across runs
+            use_cache: Set False to bypass the cache for this run
+            compact: Hold trips in the compact dtype layout
+            workers: Process pool size for partitioned parallel aggregation
+                (1 = serial); the report is identical either way
+            start_date: First trip date to include (partitioned datasets)
+            end_date: Last trip date to include (partitioned datasets)
+            routes: Route ids to include (partitioned datasets)
+            trace_path: JSON-lines file receiving per-stage timings
+                (default: $DRT_TRACE_PATH, if set)
+            stop_events: Stop event CSV, directory or glob for the headway
+                regularity section (left out of the report metrics if not given)
+        """
+        self.tracer = Tracer(trace_path or os.environ.get(TRACE_PATH_ENV))
+        with use_tracer(self.tracer):
+            if os.path.isdir(csv_path) or any(ch in csv_path for ch in '*?['):
+                self.analyzer = RidershipAnalyzer.from_dataset(
+                    TripDataset(csv_path), start_date, end_date, routes, chunksize=chunksize
+                )
+            else:
+                self.analyzer = RidershipAnalyzer(
+                    csv_path, chunksize=chunksize, cache_dir=cache_dir, use_cache=use_cache,
+                    compact=compact, workers=workers
+                )
+            if stop_events:
+                self.analyzer.load_stop_events(stop_events)
         self.report_data = {}
+        self._sections = {}
+        self._data_version = self.analyzer.data_version
+        # Stages before this tracer mark were reported by an earlier generate_full_report()
+        self._report_mark = 0
     
-    def generate_full_report(self) -> Dict:
-        """Generate complete report with all sections"""
+    def section(self, name: str):
+        """
+        Return one report section, computing it (and its dependencies) on first access
         
-        print("[v0] Generating data overview...")
-        overview = self.analyzer.get_data_overview()
+        Results are memoized until the analyzer's data changes or the section
+        (or one of its dependencies) is invalidated.
+        """
+        if name not in REPORT_SECTIONS:
+            raise KeyError(f"Unknown report section: {name}")
+        if self._data_version != self.analyzer.data_version:
+            self.invalidate()
         
-        print("[v0] Computing boardings analysis...")
-        boardings = self.analyzer.compute_boardings_analysis()
+        if name not in self._sections:
+            dependencies, message = REPORT_SECTIONS[name]
+            inputs = {dep: self.section(dep) for dep in dependencies}
+            if message:
+                print(f"[v0] {message}")
+            with use_tracer(self.tracer), self.tracer.stage(f'report.{name}'):
+                self._sections[name] = getattr(self, f'_build_{name}')(**inputs)
+        return self._sections[name]
+    
+    def invalidate(self, name: str = None):
+        """
+        Drop a memoized section and everything that depends on it
         
-        print("[v0] Computing on-time performance...")
-        ontime = self.analyzer.compute_ontime_performance()
+        Args:
+            name: Section to recompute on next access (default: all sections)
+        """
+        if name is None:
+            self._sections = {}
+            self._data_version = self.analyzer.data_version
+            return
         
-        print("[v0] Computing productivity metrics...")
-        productivity = self.analyzer.compute_productivity_metrics()
+        stale = {name}
+        changed = True
+        while changed:
+            dependents = {section for section, (deps, _) in REPORT_SECTIONS.items()
+                          if stale.intersection(deps)}
+            changed = not dependents <= stale
+            stale |= dependents
+        for section in stale:
+            self._sections.pop(section, None)
+    
+    def append(self, source, replace_days: bool = False) -> Dict:
+        """Fold new trip records into the analyzer; sections recompute on next access"""
+        with use_tracer(self.tracer):
+            result = self.analyzer.append(source, replace_days)
+        self.invalidate()
+        return result
+    
+    def generate_full_report(self) -> Dict:
+        """
+        Generate complete report with all sections
         
-        print("[v0] Generating time series data...")
-        timeseries = self.analyzer.generate_time_series_data()
+        The metadata performance block covers the stages run since the
+        previous report (the initial load, for the first one).
+        """
         
-        print("[v0] Generating heatmap data...")
-        heatmap = self.analyzer.generate_heatmap_data()
-        
-        # Compile metrics for recommendations
-        metrics = {
-            'boardings': boardings,
-            'ontime': ontime,
-            'productivity': productivity
-        }
-        
-        print("[v0] Generating comprehensive optimization recommendations...")
-        recommendations = self.analyzer.generate_recommendations(metrics)
+        with use_tracer(self.tracer) as tracer, tracer.stage('report.generate'):
+            sections = {name: self.section(name) for name in REPORT_SECTIONS}
+        performance = self.tracer.summary(since=self._report_mark)
+        self._report_mark = self.tracer.mark()
         
         self.report_data = {
             'metadata': {
                 'generated_at': datetime.now().isoformat(),
                 'report_type': 'Durham Region Transit Performance Analysis',
-                'data_period': overview['date_range']
+                'data_period': sections['data_overview']['date_range'],
+                'performance': performance
             },
-            'executive_summary': self._generate_executive_summary(
-                overview, boardings, ontime, productivity
-            ),
-            'data_overview': overview,
-            'methodology': self._get_methodology(),
+            'executive_summary': sections['executive_summary'],
+            'data_overview': sections['data_overview'],
+            'methodology': sections['methodology'],
             'metrics': {
-                'boardings': boardings,
-                'ontime_performance': ontime,
-                'productivity': productivity
+                'boardings': sections['boardings'],
+                'ontime_performance': sections['ontime_performance'],
+                'productivity': sections['productivity']
             },
             'visualizations': {
-                'timeseries': timeseries,
-                'heatmap': heatmap
+                'timeseries': sections['timeseries'],
+                'heatmap': sections['heatmap']
             },
-            'recommendations': recommendations,
-            'limitations': self._get_limitations()
+            'recommendations': sections['recommendations'],
+            'limitations': sections['limitations']
         }
         
+        if sections['headway_regularity'] is not None:
+            self.report_data['metrics']['headway_regularity'] = sections['headway_regularity']
+        
         return self.report_data
     
+    def _build_data_overview(self):
+        return self.analyzer.get_data_overview()
+    
+    def _build_boardings(self):
+        return self.analyzer.compute_boardings_analysis()
+    
+    def _build_ontime_performance(self):
+        return self.analyzer.compute_ontime_performance()
+    
+    def _build_headway_regularity(self):
+        return self.analyzer.compute_headway_regularity()
+    
+    def _build_productivity(self):
+        return self.analyzer.compute_productivity_metrics()
+    
+    def _build_timeseries(self):
+        return self.analyzer.generate_time_series_data()
+    
+    def _build_heatmap(self):
+        return self.analyzer.generate_heatmap_data()
+    
+    def _build_recommendations(self, boardings, ontime_performance, productivity):
+        return self.analyzer.generate_recommendations({
+            'boardings': boardings,
+            'ontime': ontime_performance,
+            'productivity': productivity
+        })
+    
+    def _build_executive_summary(self, data_overview, boardings, ontime_performance, productivity):
+        return self._generate_executive_summary(data_overview, boardings, ontime_performance, productivity)
+    
+    def _build_methodology(self):
+        return self._get_methodology()
+    
+    def _build_limitations(self):
+        return self._get_limitations()
+    
     def _generate_executive_summary(self, overview, boardings, ontime, productivity):
         """Generate executive summary bullet points"""
         
@@ -92,15 +223,16 @@ class DRTReportGenerator:
         """Return methodology description"""
         return {
             'tools': ['PostgreSQL/SQLite', 'Python Pandas', 'SQLAlchemy', 'NumPy'],
-            'time_segmentation': {
-                'weekday_am_peak': '6:00 AM - 9:00 AM',
-                'weekday_pm_peak': '3:00 PM - 7:00 PM',
-                'weekend_all_day': 'All hours on Saturday/Sunday'
-            },
+            'time_segmentation': self.analyzer.period_scheme.describe(),
             'definitions': {
                 'on_time_threshold': '≤5 minutes late from scheduled arrival',
-                'revenue_hour': 'One scheduled trip (simplified metric)',
-                'productivity': 'Total boardings divided by revenue hours'
+                'revenue_hour': 'Scheduled running time (scheduled departure to scheduled arrival) summed over trips',
+                'productivity': 'Total boardings divided by revenue hours',
+                'delay_percentiles': 'p50/p90/p95 arrival delay from mergeable log-bucketed '
+                                     'sketches (within 1% relative error)',
+                'headway_regularity': 'Headway CV: std. dev. of (actual - scheduled) headway over mean '
+                                      'scheduled headway per stop; bunched below 25% and gaps above '
+                                      '200% of the scheduled headway'
             },
             'filters_applied': [
                 'Removed trips with missing boardings data',
@@ -115,20 +247,56 @@ class DRTReportGenerator:
             'Analysis based on one month of data; seasonal variations not captured',
             'Passenger sociodemographic data not included in dataset',
             'External factors (weather, special events, construction) not accounted for',
-            'Revenue hour calculation simplified; actual operator scheduling data would improve accuracy',
+            'Revenue hours exclude layover and deadhead time, so productivity is per in-service hour',
             'Stop-level dwell time analysis limited by data granularity',
             'Does not include passenger satisfaction surveys or qualitative feedback'
         ]
     
-    def export_json(self, output_path: str):
-        """Export report data as JSON"""
-        with open(output_path, 'w') as f:
-            json.dump(self.report_data, f, indent=2)
-        print(f"[v0] Report exported to {output_path}")
+    def export_json(self, output_path: str, layout: str = 'records', indent: int = 2) -> Dict:
+        """
+        Export report data as JSON, streamed section by section
+        
+        Args:
+            output_path: Destination file
+            layout: 'records' (one object per table row) or 'columnar'
+                (one array per table column, smaller and faster to parse)
+            indent: Pretty-print indent; None writes compact JSON
+        
+        Returns:
+            Output size in bytes and serialization time
+        """
+        with self.tracer.stage('report.export_json', layout=layout):
+            stats = write_report_json(self.report_data, output_path, layout, indent)
+        print(f"[v0] Report exported to {output_path} ({stats['bytes']:,} bytes in {stats['seconds']:.3f} s)")
+        return stats
+    
+    def export_sections(self, output_dir: str, layout: str = 'columnar', binary_tables: bool = False,
+                        min_binary_rows: int = 1000, sections: List[str] = None) -> Dict:
+        """
+        Export each report section to its own file with a manifest.json
+        
+        Dashboards can fetch only the sections they need; see report_export.
+        
+        Args:
+            output_dir: Directory for the section files
+            layout: 'columnar' or 'records'
+            binary_tables: Write large tables as compressed .npz column archives
+            min_binary_rows: Row count from which a table is written as .npz
+            sections: Top-level sections to export (default: all)
+        
+        Returns:
+            Manifest with per-section file, size and serialization time
+        """
+        with self.tracer.stage('report.export_sections', layout=layout):
+            manifest = export_sections(self.report_data, output_dir, layout, binary_tables,
+                                       min_binary_rows, sections)
+        print(f"[v0] Exported {len(manifest['sections'])} sections to {output_dir} "
+              f"({manifest['total_bytes']:,} bytes in {manifest['total_seconds']:.3f} s)")
+        return manifest
     
     def export_summary_text(self, output_path: str):
         """Export human-readable summary report"""
-        with open(output_path, 'w') as f:
+        with self.tracer.stage('report.export_summary_text'), open(output_path, 'w') as f:
             f.write("=" * 80 + "\n")
             f.write("DURHAM REGION TRANSIT PERFORMANCE ANALYSIS REPORT\n")
             f.write("=" * 80 + "\n\n")
@@ -147,6 +315,13 @@ class DRTReportGenerator:
             f.write(f"System On-Time Performance: {metrics['ontime_performance']['system_ontime_pct']}%\n")
             f.write(f"Total Boardings: {self.report_data['data_overview']['total_boardings']:,}\n")
             f.write(f"Routes Analyzed: {self.report_data['data_overview']['unique_routes']}\n")
+            headways = metrics.get('headway_regularity')
+            if headways is not None:
+                system = headways['system']
+                f.write(f"Headway Regularity (CV): {system['headway_cv']:.2f} "
+                        f"({headways['stops_analyzed']:,} route-stops)\n")
+                f.write(f"Bunched Arrivals: {system['bunching_pct']:.1f}%  "
+                        f"Service Gaps: {system['gap_pct']:.1f}%\n")
             f.write("\n")
             
             f.write("OPTIMIZATION RECOMMENDATIONS\n")
@@ -179,10 +354,14 @@ class DRTReportGenerator:
 
 
 if __name__ == '__main__':
-    # Generate report from CSV
-    generator = DRTReportGenerator('data/drt_trip_data.csv')
+    # Generate report from a CSV file or partitioned trip directory
+    data_source = sys.argv[1] if len(sys.argv) > 1 else 'data/drt_trip_data.csv'
+    stop_events = sys.argv[2] if len(sys.argv) > 2 else None
+    generator = DRTReportGenerator(data_source, stop_events=stop_events)
     report = generator.generate_full_report()
+    print("\n".join(generator.tracer.format_summary()))
     
     # Export in multiple formats
     generator.export_json('reports/drt_performance_report.json')
     generator.export_summary_text('reports/drt_performance_summary.txt')
+    generator.export_sections('reports/sections')
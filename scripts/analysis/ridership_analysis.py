@@ -3,102 +3,454 @@ Durham Region Transit Ridership Analysis Module
 Processes CSV data to compute boardings, productivity, and ridership patterns
 """
 
+import io
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, time
 from typing import Dict, List, Tuple
+from time_segmentation import TimePeriodScheme, DRT_SERVICE_PERIODS
+from trip_aggregates import TripAggregates
+from trip_cache import TripFrameCache
+from csv_partitions import split_csv_byte_ranges, CSVByteRangeReader
+from trip_dataset import TripDataset, KEY_DTYPES
+from instrumentation import stage
+from quantile_sketch import sketch_quantiles
+from headway_analysis import analyze_stop_events, summarize_regularity
+
+REQUIRED_COLUMNS = [
+    'route_id', 'route_name', 'service_type',
+    'scheduled_departure', 'actual_departure',
+    'scheduled_arrival', 'actual_arrival',
+    'boardings', 'trip_date'
+]
+
+# String keys stored as categoricals in the compact layout
+COMPACT_CATEGORY_COLUMNS = ['route_id', 'route_name', 'service_type', 'time_period']
 
 class RidershipAnalyzer:
     """Analyzes DRT ridership data and computes key performance metrics"""
     
-    def __init__(self, data_path: str):
+    def __init__(self, data_path: str, period_scheme: TimePeriodScheme = DRT_SERVICE_PERIODS,
+                 chunksize: int = None, cache_dir: str = None, use_cache: bool = True,
+                 compact: bool = False, workers: int = 1):
         """
         Initialize analyzer with CSV data
         
         Args:
             data_path: Path to CSV file containing trip records
+            period_scheme: Time period definitions used to segment trips
+            chunksize: If set, stream the CSV in chunks of this many rows and
+                keep only mergeable partial aggregates (self.df stays None)
+            cache_dir: Directory of the enriched trip frame cache (in-memory mode only)
+            use_cache: Set False to bypass the cache (neither read nor written)
+            compact: Store the in-memory frame with categorical keys and
+                narrow numeric dtypes (see memory_profile)
+            workers: If > 1, parse line-aligned byte ranges of the CSV in a
+                process pool and keep only the merged partial aggregates
         """
-        self.df = pd.read_csv(data_path)
-        self._validate_data()
-        self._segment_time_periods()
-    
-    def _validate_data(self):
-        """Validate data quality and check for missing values"""
-        required_columns = [
-            'route_id', 'route_name', 'service_type',
-            'scheduled_departure', 'actual_departure',
-            'scheduled_arrival', 'actual_arrival',
-            'boardings', 'trip_date'
-        ]
-        
-        missing_cols = [col for col in required_columns if col not in self.df.columns]
+        self.period_scheme = period_scheme
+        self.aggregates = None
+        self.data_version = 0
+        self._standard_usage = None
+        self._route_summary = None
+        self._route_summary_source = None
+        self.headways = None
+        
+        mode = 'parallel' if workers > 1 else 'stream' if chunksize \
+            else 'cached' if cache_dir and use_cache else 'csv'
+        with stage('analyzer.load', mode=mode) as record:
+            if mode == 'parallel':
+                self.df = None
+                self._aggregate_parallel(data_path, workers, chunksize)
+            elif mode == 'stream':
+                self.df = None
+                self._stream_csv(data_path, chunksize)
+            elif mode == 'cached':
+                self.df = self._load_cached(data_path, TripFrameCache(cache_dir))
+            else:
+                self.df = self._load_csv(data_path)
+            record['rows_out'] = self._trip_count()
+        
+        if compact and self.df is not None:
+            with stage('analyzer.compact', rows_in=len(self.df)):
+                self._standard_usage = self._column_usage(self.df)
+                self.df = self._compact_dtypes(self.df)
+    
+    def _load_csv(self, data_path: str) -> pd.DataFrame:
+        """Parse, validate and enrich the full CSV in memory"""
+        df = pd.read_csv(data_path, dtype=KEY_DTYPES)
+        self._report_nulls(self.enrich(df))
+        return df
+    
+    def _load_cached(self, data_path: str, cache: TripFrameCache) -> pd.DataFrame:
+        """Load the enriched frame from cache, building and storing it on a miss"""
+        key = cache.key_for(data_path, self.period_scheme.fingerprint())
+        df = cache.load(key)
+        if df is not None:
+            print(f"[v0] Loaded {len(df):,} enriched trips from cache ({key})")
+            return df
+        
+        df = self._load_csv(data_path)
+        cache.store(key, df, source_path=data_path)
+        return df
+    
+    @classmethod
+    def _empty(cls, period_scheme: TimePeriodScheme) -> 'RidershipAnalyzer':
+        """Analyzer with no data loaded (pool workers, restored state)"""
+        analyzer = cls.__new__(cls)
+        analyzer.period_scheme = period_scheme
+        analyzer.df = None
+        analyzer.aggregates = None
+        analyzer.data_version = 0
+        analyzer._standard_usage = None
+        analyzer._route_summary = None
+        analyzer._route_summary_source = None
+        analyzer.headways = None
+        return analyzer
+    
+    def _trip_count(self) -> int:
+        """Trips held, whether as a frame or as partial aggregates"""
+        if self.df is not None:
+            return len(self.df)
+        return int(self.aggregates.table['trips'].sum()) if self.aggregates.table is not None else 0
+    
+    def _stream_csv(self, data_path, chunksize: int):
+        """Validate, enrich and aggregate the CSV one bounded chunk at a time"""
+        self.aggregates, null_counts = self._aggregate_chunks(
+            pd.read_csv(data_path, chunksize=chunksize, dtype=KEY_DTYPES)
+        )
+        if null_counts is None:
+            raise ValueError(f"No trip records found in {data_path}")
+        self._report_nulls(null_counts)
+    
+    def _aggregate_chunks(self, chunks) -> Tuple[TripAggregates, pd.Series]:
+        """Fold an iterable of raw trip frames into partial aggregates"""
+        aggregates = TripAggregates()
+        null_counts = None
+        
+        for chunk in chunks:
+            chunk_nulls = self.enrich(chunk)
+            null_counts = chunk_nulls if null_counts is None else null_counts + chunk_nulls
+            aggregates.add_frame(chunk)
+        
+        return aggregates, null_counts
+    
+    def _aggregate_parallel(self, data_path: str, workers: int, chunksize: int = None):
+        """
+        Aggregate byte-range partitions of the CSV in a process pool
+        
+        Partials are merged in file order. Every measure is an integer-valued
+        sum, so the result is identical to a serial run over the same file.
+        """
+        header, ranges = split_csv_byte_ranges(data_path, workers)
+        print(f"[v0] Aggregating {len(ranges)} partitions with {workers} workers...")
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                _aggregate_csv_range,
+                [data_path] * len(ranges), [header] * len(ranges), ranges,
+                [self.period_scheme] * len(ranges), [chunksize] * len(ranges)
+            ))
+        
+        self.aggregates = TripAggregates()
+        null_counts = None
+        for aggregates, chunk_nulls in results:
+            self.aggregates.merge(aggregates)
+            null_counts = chunk_nulls if null_counts is None else null_counts + chunk_nulls
+        
+        if null_counts is None:
+            raise ValueError(f"No trip records found in {data_path}")
+        self._report_nulls(null_counts)
+    
+    @classmethod
+    def from_aggregates(cls, aggregates: TripAggregates,
+                        period_scheme: TimePeriodScheme = DRT_SERVICE_PERIODS) -> 'RidershipAnalyzer':
+        """Analyzer over precomputed partial aggregates (no trip-level frame)"""
+        analyzer = cls._empty(period_scheme)
+        analyzer.aggregates = aggregates
+        return analyzer
+    
+    @classmethod
+    def from_state(cls, state_path: str,
+                   period_scheme: TimePeriodScheme = DRT_SERVICE_PERIODS) -> 'RidershipAnalyzer':
+        """
+        Restore an analyzer from aggregate state written by save_state()
+        
+        Args:
+            state_path: Path of the persisted partial aggregates
+            period_scheme: Must match the scheme the state was built with
+        """
+        aggregates = TripAggregates.load(state_path)
+        if aggregates.metadata.get('period_scheme') != period_scheme.fingerprint():
+            raise ValueError(f"State {state_path} was built with a different time period scheme")
+        
+        return cls.from_aggregates(aggregates, period_scheme)
+    
+    @classmethod
+    def from_dataset(cls, dataset: TripDataset, start_date: str = None, end_date: str = None,
+                     routes: List[str] = None, period_scheme: TimePeriodScheme = DRT_SERVICE_PERIODS,
+                     chunksize: int = None) -> 'RidershipAnalyzer':
+        """
+        Aggregate a date/route slice of a partitioned trip dataset
+        
+        Only partitions overlapping the filters are opened and only the
+        required columns are parsed; the analyzer keeps partial aggregates.
+        
+        Args:
+            dataset: Partitioned trip files
+            start_date: Inclusive first trip date (YYYY-MM-DD)
+            end_date: Inclusive last trip date (YYYY-MM-DD)
+            routes: Route ids to include (default: all)
+            period_scheme: Time period definitions used to segment trips
+            chunksize: Rows per parsed chunk within each file
+        """
+        analyzer = cls._empty(period_scheme)
+        with stage('analyzer.load', mode='dataset') as record:
+            analyzer.aggregates, null_counts = analyzer._aggregate_chunks(dataset.read(
+                start_date, end_date, routes, columns=REQUIRED_COLUMNS, chunksize=chunksize
+            ))
+            if null_counts is not None:
+                record['rows_out'] = analyzer._trip_count()
+        if null_counts is None:
+            raise ValueError(f"No trip records in {dataset.source} match the requested slice")
+        analyzer._report_nulls(null_counts)
+        return analyzer
+    
+    def save_state(self, state_path: str):
+        """Persist the per-route/day/hour partial aggregates for later append() runs"""
+        self._partials()
+        self.aggregates.save(state_path, {'period_scheme': self.period_scheme.fingerprint()})
+        print(f"[v0] Saved aggregate state ({len(self.aggregates.table):,} partial rows) to {state_path}")
+    
+    def append(self, source, replace_days: bool = False) -> Dict:
+        """
+        Fold new trip records into the aggregate state without rescanning history
+        
+        Only the new records are parsed and aggregated; every metric method
+        then reflects them. The trip-level frame (self.df) is released since
+        it no longer covers the full period, and data_version is bumped so
+        memoized consumers know to recompute.
+        
+        Args:
+            source: CSV path or DataFrame of raw trip records
+            replace_days: Treat the new records as the complete restatement of
+                each (route_id, trip_date) they cover, so late corrections
+                replace previously loaded trips for that route and day. Other
+                routes on the same day are kept. By default records are added.
+        
+        Returns:
+            Summary with the appended row count and any replaced days
+        """
+        self._partials()
+        with stage('analyzer.append') as record:
+            frame = pd.read_csv(source, dtype=KEY_DTYPES) if isinstance(source, str) else source.copy()
+            record['rows_in'] = len(frame)
+            
+            new_aggregates, null_counts = self._aggregate_chunks([frame])
+            self._report_nulls(null_counts)
+            
+            if replace_days:
+                replaced = self.aggregates.replace_days(new_aggregates)
+            else:
+                replaced = []
+                self.aggregates.merge(new_aggregates)
+        
+        self.df = None
+        self._standard_usage = None
+        self.data_version += 1
+        print(f"[v0] Appended {len(frame):,} trips (replaced days: {replaced or 'none'})")
+        
+        return {'rows_appended': len(frame), 'replaced_days': replaced}
+    
+    def enrich(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Validate raw trip records and add derived fields in place
+        
+        Returns:
+            Null counts of the required columns
+        """
+        null_counts = self._check_columns(df)
+        self._validate_data(df)
+        self._segment_time_periods(df)
+        return null_counts
+    
+    def _check_columns(self, df: pd.DataFrame) -> pd.Series:
+        """Check for required columns and return null counts per column"""
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
         if missing_cols:
             raise ValueError(f"Missing required columns: {missing_cols}")
         
-        # Check for null values
-        null_counts = self.df[required_columns].isnull().sum()
+        return df[REQUIRED_COLUMNS].isnull().sum()
+    
+    def _report_nulls(self, null_counts: pd.Series):
         print(f"[v0] Data validation - Null counts:\n{null_counts}")
-        
-        # Convert timestamps
-        self.df['scheduled_departure'] = pd.to_datetime(self.df['scheduled_departure'])
-        self.df['actual_departure'] = pd.to_datetime(self.df['actual_departure'])
-        self.df['scheduled_arrival'] = pd.to_datetime(self.df['scheduled_arrival'])
-        self.df['actual_arrival'] = pd.to_datetime(self.df['actual_arrival'])
-        self.df['trip_date'] = pd.to_datetime(self.df['trip_date'])
+    
+    def _validate_data(self, df: pd.DataFrame):
+        """Convert timestamps and derive delay / on-time fields in place"""
+        df['scheduled_departure'] = pd.to_datetime(df['scheduled_departure'])
+        df['actual_departure'] = pd.to_datetime(df['actual_departure'])
+        df['scheduled_arrival'] = pd.to_datetime(df['scheduled_arrival'])
+        df['actual_arrival'] = pd.to_datetime(df['actual_arrival'])
+        df['trip_date'] = pd.to_datetime(df['trip_date'])
         
         # Calculate delay in minutes
-        self.df['delay_minutes'] = (
-            self.df['actual_arrival'] - self.df['scheduled_arrival']
+        df['delay_minutes'] = (
+            df['actual_arrival'] - df['scheduled_arrival']
         ).dt.total_seconds() / 60
         
         # On-time performance (≤5 min late)
-        self.df['on_time'] = self.df['delay_minutes'] <= 5
+        df['on_time'] = df['delay_minutes'] <= 5
     
-    def _segment_time_periods(self):
+    def _segment_time_periods(self, df: pd.DataFrame):
         """Segment trips into peak/off-peak periods"""
-        self.df['hour'] = self.df['scheduled_departure'].dt.hour
-        self.df['day_of_week'] = self.df['trip_date'].dt.dayofweek  # 0=Mon, 6=Sun
-        self.df['is_weekend'] = self.df['day_of_week'] >= 5
-        
-        # Define time periods
-        def categorize_period(row):
-            if row['is_weekend']:
-                return 'Weekend All Day'
-            elif 6 <= row['hour'] < 9:
-                return 'Weekday AM Peak'
-            elif 15 <= row['hour'] < 19:
-                return 'Weekday PM Peak'
+        df['hour'] = df['scheduled_departure'].dt.hour
+        df['day_of_week'] = df['trip_date'].dt.dayofweek  # 0=Mon, 6=Sun
+        df['is_weekend'] = df['day_of_week'] >= 5
+        
+        # Single (day of week x hour) table lookup - no per-row Python calls
+        df['time_period'] = self.period_scheme.classify(
+            df['hour'], df['day_of_week']
+        )
+    
+    def _compact_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return df with categorical string keys and the narrowest numeric dtypes"""
+        df = df.copy()
+        for col in COMPACT_CATEGORY_COLUMNS:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        
+        # Counts and calendar fields are small non-negative integers
+        for col in ('boardings', 'hour', 'day_of_week'):
+            if pd.api.types.is_integer_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], downcast='unsigned')
             else:
-                return 'Weekday Off-Peak'
+                df[col] = df[col].astype('float32')
+        
+        df['delay_minutes'] = df['delay_minutes'].astype('float32')
+        
+        # Flags as one byte per row
+        for col in ('on_time', 'is_weekend'):
+            df[col] = df[col].astype('bool')
         
-        self.df['time_period'] = self.df.apply(categorize_period, axis=1)
+        return df
+    
+    def _column_usage(self, df: pd.DataFrame) -> Dict:
+        usage = df.memory_usage(deep=True, index=False)
+        return {col: {'dtype': str(df[col].dtype), 'bytes': int(usage[col])} for col in df.columns}
+    
+    def memory_profile(self) -> Dict:
+        """Report bytes per column for the standard and compact frame layouts"""
+        if self.df is None:
+            raise ValueError("memory_profile requires an in-memory frame (analyzer was streamed)")
+        
+        if self._standard_usage is not None:
+            standard, compact = self._standard_usage, self._column_usage(self.df)
+        else:
+            standard, compact = self._column_usage(self.df), self._column_usage(self._compact_dtypes(self.df))
+        
+        columns = [{
+            'column': col,
+            'standard_dtype': standard[col]['dtype'],
+            'standard_bytes': standard[col]['bytes'],
+            'compact_dtype': compact[col]['dtype'],
+            'compact_bytes': compact[col]['bytes']
+        } for col in standard]
+        
+        total_standard = sum(c['standard_bytes'] for c in columns)
+        total_compact = sum(c['compact_bytes'] for c in columns)
+        
+        return {
+            'rows': len(self.df),
+            'is_compact': self._standard_usage is not None,
+            'columns': columns,
+            'total_standard_bytes': total_standard,
+            'total_compact_bytes': total_compact,
+            'reduction_pct': round((1 - total_compact / total_standard) * 100, 2) if total_standard else 0.0
+        }
+    
+    def _partials(self) -> pd.DataFrame:
+        """Per (route, day, hour, period) partial sums every metric is derived from"""
+        if self.aggregates is None:
+            with stage('analyzer.partials', rows_in=len(self.df)) as record:
+                self.aggregates = TripAggregates.from_frame(self.df)
+                record['rows_out'] = len(self.aggregates.table)
+        return self.aggregates.table
+    
+    def route_summary(self) -> pd.DataFrame:
+        """
+        Per-route totals shared by the boardings, on-time and productivity metrics
+        
+        Built with one grouped pass over the partials and memoized until the
+        partials change. Route name and service type are route attributes
+        (first value per route).
+        """
+        p = self._partials()
+        if self._route_summary is not None and self._route_summary_source is p:
+            return self._route_summary
+        
+        summary = p.groupby('route_id').agg(
+            route_name=('route_name', 'first'),
+            service_type=('service_type', 'first'),
+            trips=('trips', 'sum'),
+            boardings=('boardings', 'sum'),
+            on_time=('on_time', 'sum'),
+            delay_seconds=('delay_seconds', 'sum'),
+            delay_sq_seconds=('delay_sq_seconds', 'sum'),
+            delay_count=('delay_count', 'sum'),
+            revenue_seconds=('revenue_seconds', 'sum'),
+            revenue_count=('revenue_count', 'sum')
+        ).reset_index()
+        
+        n = summary['delay_count']
+        summary['delay_minutes'] = summary['delay_seconds'] / n / 60
+        variance = (summary['delay_sq_seconds'] - summary['delay_seconds'] ** 2 / n) / (n - 1)
+        summary['delay_std_minutes'] = np.sqrt(variance.clip(lower=0)).where(n > 1) / 60
+        
+        self._route_summary = summary
+        self._route_summary_source = p
+        return summary
+    
+    def delay_quantiles(self, by: List[str]) -> pd.DataFrame:
+        """
+        p50/p90/p95 arrival delay (minutes) per group, from the mergeable sketches
+        
+        Args:
+            by: Any of 'route_id', 'trip_date', 'time_period' ([] for system-wide)
+        
+        Returns:
+            One row per group, or None if the aggregates carry no sketches
+            (state saved before sketches existed)
+        """
+        self._partials()
+        sketches = self.aggregates.sketches
+        if sketches is None or sketches.empty:
+            return None
+        return sketch_quantiles(sketches, by)
     
     def get_data_overview(self) -> Dict:
         """Generate data overview statistics"""
+        p = self._partials()
         return {
-            'total_records': len(self.df),
+            'total_records': int(p['trips'].sum()),
             'date_range': {
-                'start': self.df['trip_date'].min().strftime('%Y-%m-%d'),
-                'end': self.df['trip_date'].max().strftime('%Y-%m-%d')
+                'start': p['trip_date'].min().strftime('%Y-%m-%d'),
+                'end': p['trip_date'].max().strftime('%Y-%m-%d')
             },
-            'unique_routes': self.df['route_id'].nunique(),
-            'total_boardings': int(self.df['boardings'].sum()),
-            'fields': list(self.df.columns)
+            'unique_routes': p['route_id'].nunique(),
+            'total_boardings': int(p['boardings'].sum()),
+            'fields': list(self.aggregates.fields)
         }
     
     def compute_boardings_analysis(self) -> Dict:
         """Compute boardings metrics by route and time period"""
+        p = self._partials()
         
-        # Average boardings per hour by route
-        route_boardings = self.df.groupby('route_id').agg({
-            'boardings': 'sum',
-            'route_name': 'first',
-            'service_type': 'first'
-        }).reset_index()
+        summary = self.route_summary()
         
-        # Calculate trips per route to get hourly rate
-        trips_count = self.df.groupby('route_id').size()
-        route_boardings['total_trips'] = route_boardings['route_id'].map(trips_count)
+        # Average boardings per trip by route
+        route_boardings = summary[['route_id', 'boardings', 'route_name', 'service_type']].copy()
+        route_boardings['total_trips'] = summary['trips']
         route_boardings['avg_boardings_per_trip'] = (
             route_boardings['boardings'] / route_boardings['total_trips']
         )
@@ -107,9 +459,11 @@ class RidershipAnalyzer:
         top_5 = route_boardings.nlargest(5, 'boardings')
         
         # Peak vs off-peak comparison
-        period_comparison = self.df.groupby('time_period')['boardings'].agg([
-            'sum', 'mean', 'count'
-        ]).reset_index()
+        period_comparison = p.groupby('time_period', observed=True).agg(
+            sum=('boardings', 'sum'),
+            count=('boardings_count', 'sum')
+        ).reset_index()
+        period_comparison.insert(2, 'mean', period_comparison['sum'] / period_comparison['count'])
         
         return {
             'top_5_routes': top_5.to_dict('records'),
@@ -119,15 +473,17 @@ class RidershipAnalyzer:
     
     def compute_ontime_performance(self) -> Dict:
         """Calculate on-time performance metrics"""
+        p = self._partials()
         
         # System-wide on-time performance
-        system_ontime = (self.df['on_time'].sum() / len(self.df)) * 100
+        system_ontime = (p['on_time'].sum() / p['trips'].sum()) * 100
+        
+        summary = self.route_summary()
         
         # Route-level on-time performance
-        route_reliability = self.df.groupby(['route_id', 'route_name']).agg({
-            'on_time': 'mean',
-            'delay_minutes': 'mean'
-        }).reset_index()
+        route_reliability = summary[['route_id', 'route_name']].copy()
+        route_reliability['on_time'] = summary['on_time'] / summary['trips']
+        route_reliability['delay_minutes'] = summary['delay_minutes']
         
         route_reliability['on_time_pct'] = route_reliability['on_time'] * 100
         route_reliability = route_reliability.sort_values('on_time_pct', ascending=False)
@@ -136,65 +492,147 @@ class RidershipAnalyzer:
         highest_reliability = route_reliability.head(5)
         lowest_reliability = route_reliability.tail(5)
         
-        # Correlation between delays and boardings
-        route_stats = self.df.groupby('route_id').agg({
-            'boardings': 'sum',
-            'delay_minutes': 'mean'
-        })
-        correlation = route_stats['boardings'].corr(route_stats['delay_minutes'])
+        # Correlation between delays and boardings (undefined for a single route)
+        correlation = summary['boardings'].corr(summary['delay_minutes']) if len(summary) > 1 else np.nan
         
-        return {
+        result = {
             'system_ontime_pct': round(system_ontime, 2),
             'highest_reliability': highest_reliability.to_dict('records'),
             'lowest_reliability': lowest_reliability.to_dict('records'),
             'delay_boarding_correlation': round(correlation, 3),
             'all_routes': route_reliability.to_dict('records')
         }
+        
+        # Delay percentiles (sketch estimates, within 1% relative error)
+        route_percentiles = self.delay_quantiles(['route_id'])
+        if route_percentiles is not None:
+            for key in ('highest_reliability', 'lowest_reliability', 'all_routes'):
+                routes = pd.DataFrame(result[key])
+                result[key] = routes.merge(route_percentiles, on='route_id', how='left').to_dict('records')
+            result['system_delay_percentiles'] = self.delay_quantiles([]).to_dict('records')[0]
+            result['period_delay_percentiles'] = self.delay_quantiles(['time_period']).to_dict('records')
+        
+        return result
+    
+    def load_stop_events(self, source, chunksize: int = 5_000_000, buckets: int = 64,
+                         spill_dir: str = None) -> int:
+        """
+        Compute stop-level headway partials from observed stop events
+        
+        Larger-than-chunk input is spilled to hash buckets on disk and
+        analyzed bucket by bucket (see headway_analysis.analyze_stop_events).
+        
+        Args:
+            source: Stop event CSV, directory / glob of CSVs, or DataFrame
+            chunksize: Rows parsed per CSV chunk
+            buckets: Hash buckets used when the input spans several chunks
+            spill_dir: Directory for bucket files (default: temporary)
+        
+        Returns:
+            Number of headways measured
+        """
+        self.headways = analyze_stop_events(source, self.period_scheme, chunksize, buckets, spill_dir)
+        self.data_version += 1
+        return int(self.headways['headways'].sum())
+    
+    def compute_headway_regularity(self) -> Dict:
+        """Headway CV, bunching and gaps by period, route and stop (None without stop events)"""
+        return summarize_regularity(self.headways)
     
-    def compute_productivity_metrics(self) -> Dict:
-        """Calculate boardings per revenue hour by service type"""
+    @staticmethod
+    def _revenue_hours(sums: pd.DataFrame) -> pd.Series:
+        """
+        Scheduled revenue hours from summed trip spans
+        
+        Trips without a usable schedule span are credited the average span
+        of the group's trips that have one (NaN if none do).
+        """
+        count = sums['revenue_count'].where(sums['revenue_count'] > 0)
+        return sums['revenue_seconds'] / 3600 * sums['trips'] / count
+    
+    def compute_productivity_metrics(self, schedule_hours: pd.DataFrame = None) -> Dict:
+        """
+        Calculate boardings per revenue hour by route, service type and period
         
-        # Assume each trip = 1 revenue hour (simplified - would use actual schedule data)
-        route_productivity = self.df.groupby(['route_id', 'route_name', 'service_type']).agg({
-            'boardings': 'sum'
-        }).reset_index()
+        Revenue hours are the scheduled running time (scheduled arrival minus
+        scheduled departure) of every trip, summed in the partials pass.
         
-        trips_per_route = self.df.groupby('route_id').size()
-        route_productivity['revenue_hours'] = route_productivity['route_id'].map(trips_per_route)
+        Args:
+            schedule_hours: Optional route_id / revenue_hours frame from the
+                GTFS schedule (see gtfs_reader.scheduled_revenue_hours); its
+                hours replace the trip-record spans for the routes it covers
+        """
+        p = self._partials()
+        summary = self.route_summary()
+        
+        route_productivity = summary[['route_id', 'route_name', 'service_type', 'boardings', 'trips']].copy()
+        route_productivity['revenue_hours'] = self._revenue_hours(summary)
+        route_productivity['hours_source'] = 'trip_schedule'
+        if schedule_hours is not None:
+            gtfs_hours = route_productivity['route_id'].astype(str).map(
+                schedule_hours.set_index(schedule_hours['route_id'].astype(str))['revenue_hours']
+            )
+            covered = gtfs_hours > 0
+            route_productivity.loc[covered, 'revenue_hours'] = gtfs_hours[covered]
+            route_productivity.loc[covered, 'hours_source'] = 'gtfs'
         route_productivity['boardings_per_hour'] = (
             route_productivity['boardings'] / route_productivity['revenue_hours']
         )
         
-        # Service type comparison
-        service_type_productivity = route_productivity.groupby('service_type').agg({
-            'boardings_per_hour': 'mean',
-            'boardings': 'sum'
-        }).reset_index()
+        # Service type comparison: total boardings over total hours, so
+        # long, busy routes weigh in proportion to the service they run
+        service_type_productivity = route_productivity.groupby('service_type').agg(
+            boardings=('boardings', 'sum'),
+            revenue_hours=('revenue_hours', 'sum'),
+            routes=('route_id', 'count')
+        ).reset_index()
+        service_type_productivity['boardings_per_hour'] = (
+            service_type_productivity['boardings'] / service_type_productivity['revenue_hours']
+        )
+        
+        # Period comparison from the same partial sums (trip-record spans)
+        period_productivity = p.groupby('time_period', observed=True)[
+            ['trips', 'boardings', 'revenue_seconds', 'revenue_count']
+        ].sum().reset_index()
+        period_productivity['revenue_hours'] = self._revenue_hours(period_productivity)
+        period_productivity['boardings_per_hour'] = (
+            period_productivity['boardings'] / period_productivity['revenue_hours']
+        )
+        period_productivity = period_productivity[['time_period', 'boardings', 'revenue_hours', 'boardings_per_hour']]
         
         # Bottom 10 routes by productivity
         bottom_10 = route_productivity.nsmallest(10, 'boardings_per_hour')
         
         return {
             'service_type_productivity': service_type_productivity.to_dict('records'),
+            'period_productivity': period_productivity.to_dict('records'),
             'bottom_10_routes': bottom_10.to_dict('records'),
             'all_routes': route_productivity.to_dict('records')
         }
     
     def generate_time_series_data(self) -> Dict:
         """Generate time series data for trend visualization"""
+        p = self._partials()
         
         # Daily on-time performance
-        daily_ontime = self.df.groupby(self.df['trip_date'].dt.date).agg({
-            'on_time': 'mean',
-            'delay_minutes': 'mean',
-            'boardings': 'sum'
-        }).reset_index()
+        daily_ontime = p.groupby(p['trip_date'].dt.date)[
+            ['trips', 'on_time', 'delay_seconds', 'delay_count', 'boardings']
+        ].sum().reset_index()
+        
+        daily_ontime['on_time'] = daily_ontime['on_time'] / daily_ontime['trips']
+        daily_ontime['delay_minutes'] = daily_ontime['delay_seconds'] / daily_ontime['delay_count'] / 60
+        daily_ontime = daily_ontime[['trip_date', 'on_time', 'delay_minutes', 'boardings']]
         
         daily_ontime['on_time_pct'] = daily_ontime['on_time'] * 100
+        
+        daily_percentiles = self.delay_quantiles(['trip_date'])
+        if daily_percentiles is not None:
+            daily_percentiles['trip_date'] = daily_percentiles['trip_date'].dt.date
+            daily_ontime = daily_ontime.merge(daily_percentiles, on='trip_date', how='left')
         daily_ontime['trip_date'] = daily_ontime['trip_date'].astype(str)
         
         # Hourly ridership patterns
-        hourly_ridership = self.df.groupby(['hour', 'is_weekend'])['boardings'].sum().reset_index()
+        hourly_ridership = p.groupby(['hour', 'is_weekend'])['boardings'].sum().reset_index()
         hourly_ridership['period_type'] = hourly_ridership['is_weekend'].map({
             True: 'Weekend',
             False: 'Weekday'
@@ -207,21 +645,37 @@ class RidershipAnalyzer:
     
     def generate_heatmap_data(self) -> List[Dict]:
         """Generate ridership heatmap data by route and time period"""
+        p = self._partials()
         
-        heatmap = self.df.groupby(['route_id', 'route_name', 'time_period'])['boardings'].sum().reset_index()
+        heatmap = p.groupby(
+            ['route_id', 'route_name', 'time_period'], observed=True
+        )['boardings'].sum().reset_index()
         
         # Pivot for heatmap format
         heatmap_pivot = heatmap.pivot_table(
             index=['route_id', 'route_name'],
             columns='time_period',
             values='boardings',
-            fill_value=0
+            fill_value=0,
+            observed=True
         ).reset_index()
         
         return heatmap_pivot.to_dict('records')
     
-    def generate_recommendations(self, metrics: Dict) -> List[Dict]:
-        """Generate comprehensive data-driven recommendations based on analysis and transit planning best practices"""
+    def generate_recommendations(self, metrics: Dict = None) -> List[Dict]:
+        """
+        Generate comprehensive data-driven recommendations based on analysis and transit planning best practices
+        
+        Args:
+            metrics: Precomputed boardings/ontime/productivity results; when
+                omitted they are derived from the memoized route summary
+        """
+        if metrics is None:
+            metrics = {
+                'boardings': self.compute_boardings_analysis(),
+                'ontime': self.compute_ontime_performance(),
+                'productivity': self.compute_productivity_metrics()
+            }
         
         recommendations = []
         
@@ -336,6 +790,17 @@ class RidershipAnalyzer:
         
         return recommendations
 
+def _aggregate_csv_range(data_path: str, header: bytes, byte_range: Tuple[int, int],
+                         period_scheme: TimePeriodScheme, chunksize: int = None):
+    """Pool worker: parse one byte range of the CSV and return (aggregates, null counts)"""
+    start, end = byte_range
+    analyzer = RidershipAnalyzer._empty(period_scheme)
+    
+    with io.BufferedReader(CSVByteRangeReader(data_path, header, start, end)) as stream:
+        frames = pd.read_csv(stream, chunksize=chunksize, dtype=KEY_DTYPES) if chunksize \
+            else [pd.read_csv(stream, dtype=KEY_DTYPES)]
+        return analyzer._aggregate_chunks(frames)
+
 if __name__ == '__main__':
     # Example usage
     analyzer = RidershipAnalyzer('data/drt_trip_data.csv')
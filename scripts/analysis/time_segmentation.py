@@ -0,0 +1,118 @@
+"""
+Durham Region Transit Time Period Segmentation
+Table-driven classification of trips into service periods by hour and day of week
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Sequence, Tuple
+
+WEEKDAYS = (0, 1, 2, 3, 4)
+WEEKEND = (5, 6)
+ALL_DAYS = WEEKDAYS + WEEKEND
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+class TimePeriodScheme:
+    """Compiles ordered period rules into a 7 x 24 (day of week x hour) lookup table"""
+
+    def __init__(self, rules: List[Tuple[str, Sequence[int], int, int]], default: str):
+        """
+        Build the lookup table for a set of period rules
+
+        Args:
+            rules: Ordered (label, days_of_week, start_hour, end_hour) tuples.
+                Days use 0=Mon..6=Sun, hours are [start, end). The first
+                matching rule wins.
+            default: Label for any slot not covered by a rule (and for
+                missing or out-of-range hours/days)
+        """
+        self.rules = [(label, tuple(days), start, end) for label, days, start, end in rules]
+        self.default = default
+
+        # Categories are kept alphabetical so groupby/pivot output ordering
+        # matches what plain string labels produced before
+        self.labels = sorted({label for label, _, _, _ in self.rules} | {default})
+        codes = {label: i for i, label in enumerate(self.labels)}
+        self.default_code = codes[default]
+
+        table = np.full((7, 24), -1, dtype=np.int8)
+        for label, days, start, end in self.rules:
+            for day in days:
+                slot = table[day, start:end]
+                slot[slot == -1] = codes[label]
+        table[table == -1] = self.default_code
+        self.lookup = table.ravel()
+
+    def classify(self, hours, days_of_week=None) -> pd.Categorical:
+        """
+        Map hour and day-of-week arrays to period labels with one array lookup
+
+        Args:
+            hours: Hour of day values (0-23); NaN/out of range fall to the default
+            days_of_week: Day of week values (0=Mon); if omitted, Monday is
+                assumed, which suits schemes whose rules apply to all days
+
+        Returns:
+            Categorical of period labels aligned with the inputs
+        """
+        hours = np.asarray(hours, dtype='float64')
+        if days_of_week is None:
+            days = np.zeros_like(hours)
+        else:
+            days = np.asarray(days_of_week, dtype='float64')
+
+        valid = (hours >= 0) & (hours < 24) & (days >= 0) & (days < 7)
+        slots = np.where(valid, days * 24 + hours, 0).astype(np.intp)
+        codes = np.where(valid, self.lookup[slots], self.default_code)
+
+        return pd.Categorical.from_codes(codes, categories=self.labels)
+
+    def label_for(self, hour: int, day_of_week: int = 0) -> str:
+        """Classify a single hour (scalar convenience wrapper around the table)"""
+        if not (0 <= hour < 24 and 0 <= day_of_week < 7):
+            return self.default
+        return self.labels[self.lookup[int(day_of_week) * 24 + int(hour)]]
+
+    def describe(self) -> Dict[str, str]:
+        """Human-readable period definitions for report methodology sections"""
+        description = {}
+        for label, days, start, end in self.rules:
+            key = label.lower().replace('-', '_').replace(' ', '_')
+            if start == 0 and end == 24:
+                description[key] = f"All hours on {'/'.join(DAY_NAMES[d] for d in days)}"
+            else:
+                description[key] = f"{_format_hour(start)} - {_format_hour(end)}"
+        return description
+
+    def fingerprint(self) -> str:
+        """Stable text identity of the rule set (used in cache keys)"""
+        return repr((self.rules, self.default))
+
+
+def _format_hour(hour: int) -> str:
+    suffix = 'AM' if hour % 24 < 12 else 'PM'
+    return f"{(hour % 12) or 12}:00 {suffix}"
+
+
+# DRT planning periods used by the ridership analysis and reports
+DRT_SERVICE_PERIODS = TimePeriodScheme(
+    rules=[
+        ('Weekday AM Peak', WEEKDAYS, 6, 9),
+        ('Weekday PM Peak', WEEKDAYS, 15, 19),
+        ('Weekend All Day', WEEKEND, 0, 24),
+    ],
+    default='Weekday Off-Peak'
+)
+
+# Hour-of-day bands used by the ETL ridership feature engineering
+ETL_HOURLY_PERIODS = TimePeriodScheme(
+    rules=[
+        ('Morning Rush', ALL_DAYS, 6, 9),
+        ('Midday', ALL_DAYS, 9, 16),
+        ('Evening Rush', ALL_DAYS, 16, 19),
+        ('Evening', ALL_DAYS, 19, 23),
+    ],
+    default='Overnight'
+)
@@ -0,0 +1,194 @@
+"""
+Durham Region Transit Trip Aggregates
+Mergeable partial aggregates of enriched trip records
+"""
+
+import pandas as pd
+from typing import Dict, List, Optional
+from quantile_sketch import sketch_from_frame, merge_sketches, DELAY_SKETCH_ACCURACY
+
+# Grain of the partial table: one row per route, day, hour and period
+PARTIAL_KEYS = [
+    'route_id', 'route_name', 'service_type',
+    'trip_date', 'hour', 'is_weekend', 'time_period'
+]
+
+# Every measure is a plain sum so partials merge by adding. Delay and
+# scheduled running time are kept in whole seconds (exactly representable)
+# so merged totals do not depend on how the trips were chunked.
+PARTIAL_MEASURES = [
+    'trips', 'boardings', 'boardings_count',
+    'on_time', 'delay_seconds', 'delay_sq_seconds', 'delay_count',
+    'revenue_seconds', 'revenue_count'
+]
+
+# Measures added after the first saved states; absent ones load as zero
+LATER_MEASURES = ['revenue_seconds', 'revenue_count']
+
+
+class TripAggregates:
+    """Accumulates per (route, day, hour, period) sums that metrics are derived from"""
+
+    def __init__(self, table: Optional[pd.DataFrame] = None, fields: Optional[List[str]] = None,
+                 sketches: Optional[pd.DataFrame] = None):
+        """
+        Args:
+            table: Existing partial table (PARTIAL_KEYS + PARTIAL_MEASURES columns)
+            fields: Column names of the enriched trip frame the partials came from
+            sketches: Delay quantile sketch table (see quantile_sketch.SKETCH_KEYS)
+        """
+        self.table = table
+        self.fields = fields or []
+        self.sketches = sketches
+        self.metadata = {}
+
+    @staticmethod
+    def partials_from_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Collapse an enriched trip frame to the partial table in one groupby pass"""
+        delay_seconds = (df['actual_arrival'] - df['scheduled_arrival']).dt.total_seconds()
+
+        # Scheduled running time is the trip's revenue time; missing or
+        # negative spans are left out of revenue_count
+        revenue_seconds = (df['scheduled_arrival'] - df['scheduled_departure']).dt.total_seconds()
+        has_span = revenue_seconds >= 0
+
+        # Widen measures first so compact (narrow dtype) frames sum identically
+        boardings = df['boardings']
+        boardings = boardings.astype('int64' if pd.api.types.is_integer_dtype(boardings) else 'float64')
+
+        work = df[PARTIAL_KEYS].assign(
+            trips=1,
+            boardings=boardings,
+            boardings_count=boardings.notna().astype('int64'),
+            on_time=df['on_time'].astype('int64'),
+            delay_seconds=delay_seconds,
+            delay_sq_seconds=delay_seconds ** 2,
+            delay_count=delay_seconds.notna().astype('int64'),
+            revenue_seconds=revenue_seconds.where(has_span, 0.0),
+            revenue_count=has_span.astype('int64')
+        )
+        work['trip_date'] = work['trip_date'].dt.normalize()
+
+        partials = work.groupby(
+            PARTIAL_KEYS, dropna=False, observed=True, sort=True
+        )[PARTIAL_MEASURES].sum().reset_index()
+
+        # Dictionary-encoded route attributes go back to plain values so
+        # partials from compact and standard frames merge cleanly
+        for col in ('route_id', 'route_name', 'service_type'):
+            dtype = partials[col].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                partials[col] = partials[col].astype(dtype.categories.dtype)
+
+        return partials
+
+    @staticmethod
+    def sketches_from_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Per (route, day, period) delay sketches of an enriched trip frame"""
+        delay_seconds = (df['actual_arrival'] - df['scheduled_arrival']).dt.total_seconds()
+        sketches = sketch_from_frame(df, delay_seconds)
+        dtype = sketches['route_id'].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            sketches['route_id'] = sketches['route_id'].astype(dtype.categories.dtype)
+        return sketches
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'TripAggregates':
+        """Build aggregates from a fully enriched trip frame"""
+        return cls(cls.partials_from_frame(df), list(df.columns), cls.sketches_from_frame(df))
+
+    def add_frame(self, df: pd.DataFrame):
+        """Fold another enriched chunk of trips into the running partials"""
+        if not self.fields:
+            self.fields = list(df.columns)
+        self._combine(self.partials_from_frame(df))
+        self.sketches = merge_sketches([self.sketches, self.sketches_from_frame(df)])
+
+    def merge(self, other: 'TripAggregates') -> 'TripAggregates':
+        """Fold another set of partials (e.g. from a different chunk) into this one"""
+        if not self.fields:
+            self.fields = list(other.fields)
+        if other.table is not None:
+            self._combine(other.table)
+        self.sketches = merge_sketches([self.sketches, other.sketches])
+        return self
+
+    def _combine(self, partials: pd.DataFrame):
+        if self.table is None:
+            self.table = partials
+            return
+        self.table = pd.concat([self.table, partials], ignore_index=True).groupby(
+            PARTIAL_KEYS, dropna=False, observed=True, sort=True
+        )[PARTIAL_MEASURES].sum().reset_index()
+
+    def replace_days(self, other: 'TripAggregates') -> List[str]:
+        """
+        Merge other, first dropping existing partials for every route-day it covers
+
+        Used for restated (late-corrected) days: the incoming partials are
+        taken as the complete record for their (route_id, trip_date) keys.
+        Other routes on the same days are kept, so a correction for one
+        route does not erase the rest of the day.
+
+        Returns:
+            Days (YYYY-MM-DD) on which previous partials were replaced
+        """
+        restated = [_route_days(frame) for frame in (other.table, other.sketches) if frame is not None]
+        if not restated:
+            return []
+        restated = restated[0].append(restated[1:]).unique()
+        replaced = set()
+        if self.table is not None:
+            overlap = _route_days(self.table).isin(restated)
+            replaced.update(self.table.loc[overlap, 'trip_date'].dt.strftime('%Y-%m-%d'))
+            self.table = self.table[~overlap].reset_index(drop=True)
+        if self.sketches is not None:
+            overlap = _route_days(self.sketches).isin(restated)
+            replaced.update(pd.to_datetime(self.sketches.loc[overlap, 'trip_date']).dt.strftime('%Y-%m-%d'))
+            self.sketches = self.sketches[~overlap].reset_index(drop=True)
+        self.merge(other)
+        return sorted(replaced)
+
+    def save(self, path: str, metadata: Optional[Dict] = None):
+        """Persist the partial table, delay sketches and field list (pickle)"""
+        metadata = dict(metadata or {}, sketch_accuracy=DELAY_SKETCH_ACCURACY)
+        pd.to_pickle({'table': self.table, 'fields': self.fields, 'sketches': self.sketches,
+                      'metadata': metadata}, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'TripAggregates':
+        """
+        Load partials written by save(); metadata is kept on .metadata
+
+        Sketches saved with a different accuracy (or by an older version)
+        are dropped, since they cannot be merged with new ones. Measures the
+        older version did not keep are zero, i.e. no trips counted for them.
+        Integer route ids from states saved before route keys were always
+        parsed as text are converted to text.
+        """
+        state = pd.read_pickle(path)
+        table = state['table']
+        if table is not None:
+            for col in LATER_MEASURES:
+                if col not in table.columns:
+                    table[col] = 0.0 if col.endswith('_seconds') else 0
+            _text_route_ids(table)
+        sketches = state.get('sketches')
+        if state['metadata'].get('sketch_accuracy') != DELAY_SKETCH_ACCURACY:
+            sketches = None
+        if sketches is not None:
+            _text_route_ids(sketches)
+        aggregates = cls(table, state['fields'], sketches)
+        aggregates.metadata = state['metadata']
+        return aggregates
+
+
+def _text_route_ids(frame: pd.DataFrame):
+    """Convert integer route ids (older saved states) to text in place"""
+    if pd.api.types.is_integer_dtype(frame['route_id']):
+        frame['route_id'] = frame['route_id'].astype(str)
+
+
+def _route_days(frame: pd.DataFrame) -> pd.MultiIndex:
+    """(route_id, trip_date) key of every row"""
+    return pd.MultiIndex.from_arrays([frame['route_id'], pd.to_datetime(frame['trip_date'])])
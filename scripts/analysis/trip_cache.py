@@ -0,0 +1,178 @@
+"""
+Durham Region Transit Trip Frame Cache
+On-disk columnar cache of validated, enriched trip frames keyed by source content
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Bump when the enrichment logic changes so stale entries are never reused
+CACHE_FORMAT_VERSION = 2
+
+
+def file_fingerprint(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content, read in fixed-size blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TripFrameCache:
+    """
+    Stores enriched trip frames as uncompressed NumPy column archives (.npz)
+
+    String columns are dictionary-encoded (int32 codes + unique values) and
+    datetimes are kept as datetime64 arrays, so loading is a set of array
+    reads with no CSV parsing or timestamp conversion. Each entry has a JSON
+    sidecar recording its source and column layout. Entries are evicted
+    least-recently-used first once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3):
+        """
+        Args:
+            cache_dir: Directory holding cache entries (created if missing)
+            max_bytes: Total size cap for all entries
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, source_path: str, config_fingerprint: str) -> str:
+        """Cache key from source content and the enrichment configuration"""
+        parts = [file_fingerprint(source_path), config_fingerprint, str(CACHE_FORMAT_VERSION)]
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.npz', base + '.json'
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        """Return the cached frame for key, or None on a miss"""
+        data_path, meta_path = self._paths(key)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        columns = {}
+        with np.load(data_path, allow_pickle=False) as arrays:
+            for spec in meta['columns']:
+                name, kind, dtype = spec['name'], spec['kind'], spec['dtype']
+                if kind == 'dictionary':
+                    columns[name] = _decode_strings(
+                        arrays[f'{name}.codes'], arrays[f'{name}.values'], dtype
+                    )
+                elif kind == 'categorical':
+                    columns[name] = pd.Categorical.from_codes(
+                        arrays[f'{name}.codes'], categories=arrays[f'{name}.values'].astype(object)
+                    )
+                else:
+                    columns[name] = arrays[name]
+
+        # Touch both files so LRU eviction sees this entry as recently used
+        for path in (data_path, meta_path):
+            os.utime(path)
+
+        return pd.DataFrame(columns, columns=[spec['name'] for spec in meta['columns']])
+
+    def store(self, key: str, df: pd.DataFrame, source_path: str = None):
+        """Write df under key, then evict old entries beyond the size cap"""
+        data_path, meta_path = self._paths(key)
+        arrays = {}
+        specs = []
+
+        for name in df.columns:
+            col = df[name]
+            if isinstance(col.dtype, pd.CategoricalDtype):
+                arrays[f'{name}.codes'] = col.cat.codes.to_numpy()
+                arrays[f'{name}.values'] = np.asarray(col.cat.categories, dtype=str)
+                specs.append({'name': name, 'kind': 'categorical', 'dtype': 'category'})
+            elif col.dtype == object or pd.api.types.is_string_dtype(col.dtype):
+                codes, uniques = pd.factorize(col)
+                arrays[f'{name}.codes'] = codes.astype(np.int32)
+                arrays[f'{name}.values'] = np.asarray(uniques, dtype=str)
+                specs.append({'name': name, 'kind': 'dictionary', 'dtype': str(col.dtype)})
+            else:
+                arrays[name] = col.to_numpy()
+                specs.append({'name': name, 'kind': 'array', 'dtype': str(col.dtype)})
+
+        # Write to temporary names first so a crash never leaves a half entry
+        tmp_data = data_path + '.tmp.npz'
+        np.savez(tmp_data, **arrays)
+        os.replace(tmp_data, data_path)
+
+        meta = {
+            'source_path': os.path.abspath(source_path) if source_path else None,
+            'created_at': datetime.now().isoformat(),
+            'rows': len(df),
+            'columns': specs
+        }
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+        self._evict()
+
+    def entries(self) -> List[Dict]:
+        """List cache entries with size, last access time and source"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            data_path, meta_path = self._paths(key)
+            if not os.path.exists(data_path):
+                continue
+            with open(meta_path) as f:
+                meta = json.load(f)
+            entries.append({
+                'key': key,
+                'bytes': os.path.getsize(data_path) + os.path.getsize(meta_path),
+                'last_used': os.path.getmtime(data_path),
+                'source_path': meta.get('source_path')
+            })
+        return entries
+
+    def invalidate(self, source_path: str = None) -> int:
+        """
+        Remove entries built from source_path (or every entry if omitted)
+
+        Returns:
+            Number of entries removed
+        """
+        target = os.path.abspath(source_path) if source_path else None
+        removed = 0
+        for entry in self.entries():
+            if target is None or entry['source_path'] == target:
+                self._remove(entry['key'])
+                removed += 1
+        return removed
+
+    def _remove(self, key: str):
+        for path in self._paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _evict(self):
+        entries = sorted(self.entries(), key=lambda e: e['last_used'])
+        total = sum(e['bytes'] for e in entries)
+        while entries and total > self.max_bytes:
+            oldest = entries.pop(0)
+            self._remove(oldest['key'])
+            total -= oldest['bytes']
+            print(f"[v0] Cache evicted {oldest['key']} ({oldest['bytes']:,} bytes)")
+
+
+def _decode_strings(codes: np.ndarray, values: np.ndarray, dtype: str) -> pd.Series:
+    """Rebuild a string column from dictionary codes (-1 = missing)"""
+    lookup = np.append(values.astype(object), None)
+    return pd.Series(lookup[codes], dtype=dtype)
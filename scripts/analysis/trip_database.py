@@ -0,0 +1,237 @@
+"""
+Durham Region Transit Trip Database Backend
+Bulk-loads trip records into SQLite and pushes metric aggregation down into SQL
+"""
+
+import os
+import sqlite3
+import pandas as pd
+from typing import Optional, Sequence
+from ridership_analysis import RidershipAnalyzer, REQUIRED_COLUMNS
+from trip_dataset import KEY_DTYPES
+from time_segmentation import TimePeriodScheme, DRT_SERVICE_PERIODS
+from trip_aggregates import TripAggregates, PARTIAL_KEYS, PARTIAL_MEASURES
+from quantile_sketch import DELAY_SKETCH, SKETCH_KEYS
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCHEMA_SCRIPTS = ['01-create-tables.sql', '03-create-trip-records.sql', '04-create-gtfs-calendar.sql']
+
+TRIP_RECORD_COLUMNS = [
+    'route_id', 'route_name', 'service_type', 'trip_date',
+    'scheduled_departure', 'actual_departure', 'scheduled_arrival', 'actual_arrival',
+    'boardings', 'hour', 'delay_seconds', 'on_time', 'revenue_seconds'
+]
+
+TRIP_RECORD_INDEXES = ['idx_trip_records_partials', 'idx_trip_records_date']
+
+# Field list reported by get_data_overview for database-backed analyzers
+ENRICHED_FIELDS = REQUIRED_COLUMNS + [
+    'delay_minutes', 'on_time', 'hour', 'day_of_week', 'is_weekend', 'time_period'
+]
+
+
+class TripDatabase:
+    """SQLite store of trip records using the schema in scripts/*.sql"""
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the database and apply the schema scripts
+
+        Args:
+            db_path: SQLite database file (':memory:' for a scratch database)
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._apply_schema()
+
+    def _apply_schema(self):
+        self._add_revenue_seconds()
+        for script in SCHEMA_SCRIPTS:
+            with open(os.path.join(SCRIPTS_DIR, script)) as f:
+                self.conn.executescript(f.read())
+
+    def _add_revenue_seconds(self):
+        """Add and backfill trip_records.revenue_seconds in databases created before it existed"""
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(trip_records)')]
+        if not columns or 'revenue_seconds' in columns:
+            return
+        with self.conn:
+            self.conn.execute('ALTER TABLE trip_records ADD COLUMN revenue_seconds DOUBLE PRECISION')
+            self.conn.execute("""
+                UPDATE trip_records
+                SET revenue_seconds = strftime('%s', scheduled_arrival) - strftime('%s', scheduled_departure)
+                WHERE scheduled_arrival >= scheduled_departure
+            """)
+            # The covering indexes are recreated with the new column by the schema scripts
+            for index in TRIP_RECORD_INDEXES:
+                self.conn.execute(f'DROP INDEX IF EXISTS {index}')
+        print(f"[v0] Backfilled revenue_seconds for existing trip records in {self.db_path}")
+
+    def close(self):
+        self.conn.close()
+
+    def load_csv(self, csv_path: str, chunksize: int = 100_000, batch_size: int = 10_000,
+                 replace: bool = False) -> int:
+        """
+        Bulk-load a trip CSV with batched inserts
+
+        Indexes are dropped during the load and rebuilt once at the end,
+        which is much faster than maintaining them row by row.
+
+        Args:
+            csv_path: Trip CSV with the RidershipAnalyzer required columns
+            chunksize: Rows parsed and enriched per CSV chunk
+            batch_size: Rows per executemany() call
+            replace: Delete existing trip records first
+
+        Returns:
+            Number of trips inserted
+        """
+        enricher = RidershipAnalyzer.from_aggregates(TripAggregates())
+        total = 0
+
+        with self.conn:
+            if replace:
+                self.conn.execute('DELETE FROM trip_records')
+            for index in TRIP_RECORD_INDEXES:
+                self.conn.execute(f'DROP INDEX IF EXISTS {index}')
+
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=KEY_DTYPES):
+                enricher.enrich(chunk)
+                total += self.insert_trips(chunk, batch_size)
+
+        self._apply_schema()
+        self.conn.execute('ANALYZE trip_records')
+        print(f"[v0] Loaded {total:,} trips into {self.db_path}")
+        return total
+
+    def insert_trips(self, df: pd.DataFrame, batch_size: int = 10_000) -> int:
+        """Insert an enriched trip frame (see RidershipAnalyzer.enrich) in batches"""
+        revenue_seconds = (df['scheduled_arrival'] - df['scheduled_departure']).dt.total_seconds()
+        rows = pd.DataFrame({
+            'route_id': df['route_id'].astype(str),
+            'route_name': df['route_name'],
+            'service_type': df['service_type'],
+            'trip_date': df['trip_date'].dt.strftime('%Y-%m-%d'),
+            'scheduled_departure': df['scheduled_departure'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+            'actual_departure': df['actual_departure'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+            'scheduled_arrival': df['scheduled_arrival'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+            'actual_arrival': df['actual_arrival'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+            'boardings': df['boardings'],
+            'hour': df['hour'],
+            'delay_seconds': (df['actual_arrival'] - df['scheduled_arrival']).dt.total_seconds(),
+            'on_time': df['on_time'].astype('int64'),
+            'revenue_seconds': revenue_seconds.where(revenue_seconds >= 0)
+        })
+        # NULL instead of NaN/NaT; integers back to Python ints
+        rows = rows.astype(object).where(rows.notna(), None)
+        for col in ('boardings', 'hour'):
+            rows[col] = [None if v is None else int(v) for v in rows[col]]
+
+        placeholders = ', '.join('?' * len(TRIP_RECORD_COLUMNS))
+        sql = f"INSERT INTO trip_records ({', '.join(TRIP_RECORD_COLUMNS)}) VALUES ({placeholders})"
+        records = list(rows.itertuples(index=False, name=None))
+        for start in range(0, len(records), batch_size):
+            self.conn.executemany(sql, records[start:start + batch_size])
+        return len(records)
+
+    def query_partials(self, start_date: str = None, end_date: str = None,
+                       routes: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Run the per route/day/hour aggregation inside SQLite
+
+        Only the grouped rows (routes x days x hours) are returned, not trips.
+        """
+        where, params = self._filters(start_date, end_date, routes)
+
+        sql = f"""
+            SELECT route_id, route_name, service_type, trip_date, hour,
+                   COUNT(*) AS trips,
+                   COALESCE(SUM(boardings), 0) AS boardings,
+                   COUNT(boardings) AS boardings_count,
+                   SUM(on_time) AS on_time,
+                   COALESCE(SUM(delay_seconds), 0.0) AS delay_seconds,
+                   COALESCE(SUM(delay_seconds * delay_seconds), 0.0) AS delay_sq_seconds,
+                   COUNT(delay_seconds) AS delay_count,
+                   COALESCE(SUM(revenue_seconds), 0.0) AS revenue_seconds,
+                   COUNT(revenue_seconds) AS revenue_count
+            FROM trip_records
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            GROUP BY route_id, route_name, service_type, trip_date, hour
+        """
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def query_delay_counts(self, start_date: str = None, end_date: str = None,
+                           routes: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Trip counts per route/day/hour and distinct delay (whole seconds)
+
+        Delays are whole seconds, so this is far smaller than the trip table
+        and is binned into quantile sketches on the Python side.
+        """
+        where, params = self._filters(start_date, end_date, routes)
+        where.append('delay_seconds IS NOT NULL')
+        sql = f"""
+            SELECT route_id, trip_date, hour, delay_seconds, COUNT(*) AS count
+            FROM trip_records
+            WHERE {' AND '.join(where)}
+            GROUP BY route_id, trip_date, hour, delay_seconds
+        """
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    @staticmethod
+    def _filters(start_date: str = None, end_date: str = None,
+                 routes: Optional[Sequence[str]] = None):
+        where, params = [], []
+        if start_date:
+            where.append('trip_date >= ?')
+            params.append(start_date)
+        if end_date:
+            where.append('trip_date <= ?')
+            params.append(end_date)
+        if routes is not None:
+            where.append(f"route_id IN ({', '.join('?' * len(routes))})")
+            params.extend(str(r) for r in routes)
+        return where, params
+
+    def aggregates(self, start_date: str = None, end_date: str = None,
+                   routes: Optional[Sequence[str]] = None,
+                   period_scheme: TimePeriodScheme = DRT_SERVICE_PERIODS) -> TripAggregates:
+        """Pushed-down partials shaped like TripAggregates built from a trip frame"""
+        partials = self.query_partials(start_date, end_date, routes)
+
+        partials['trip_date'] = pd.to_datetime(partials['trip_date'])
+        if partials['hour'].notna().all():
+            partials['hour'] = partials['hour'].astype('int32')
+        if (partials['boardings_count'] < partials['trips']).any():
+            partials['boardings'] = partials['boardings'].astype('float64')
+
+        # Weekend flag and period depend only on (day, hour): derive them on
+        # the grouped rows rather than storing them per trip
+        day_of_week = partials['trip_date'].dt.dayofweek
+        partials['is_weekend'] = day_of_week >= 5
+        partials['time_period'] = period_scheme.classify(partials['hour'], day_of_week)
+
+        partials = partials.sort_values(PARTIAL_KEYS, na_position='last', kind='stable')
+        return TripAggregates(partials[PARTIAL_KEYS + PARTIAL_MEASURES].reset_index(drop=True),
+                              list(ENRICHED_FIELDS),
+                              self._delay_sketches(start_date, end_date, routes, period_scheme))
+
+    def _delay_sketches(self, start_date, end_date, routes, period_scheme: TimePeriodScheme) -> pd.DataFrame:
+        """Quantile sketches (see quantile_sketch) from the pushed-down delay counts"""
+        counts = self.query_delay_counts(start_date, end_date, routes)
+        counts['trip_date'] = pd.to_datetime(counts['trip_date'])
+        counts['time_period'] = period_scheme.classify(counts['hour'], counts['trip_date'].dt.dayofweek)
+        counts['delay_bin'] = DELAY_SKETCH.bins(counts['delay_seconds'])
+        return counts.groupby(SKETCH_KEYS + ['delay_bin'], dropna=False, observed=True,
+                              sort=True)['count'].sum().reset_index()
+
+    def analyzer(self, start_date: str = None, end_date: str = None,
+                 routes: Optional[Sequence[str]] = None,
+                 period_scheme: TimePeriodScheme = DRT_SERVICE_PERIODS) -> RidershipAnalyzer:
+        """RidershipAnalyzer whose metrics come from SQL-side aggregation"""
+        return RidershipAnalyzer.from_aggregates(
+            self.aggregates(start_date, end_date, routes, period_scheme), period_scheme
+        )
@@ -0,0 +1,148 @@
+"""
+Durham Region Transit Partitioned Trip Dataset
+Reads multi-file trip archives with partition pruning by date and route
+"""
+
+import glob
+import os
+import re
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Hive-style path segments, e.g. data/trips/trip_date=2024-11/route_id=900/part-0.csv
+PARTITION_SEGMENT = re.compile(r'^(?P<key>[A-Za-z_]+)=(?P<value>[^/\\]+)$')
+
+# Route keys are always parsed as text: per-file or per-chunk type inference
+# would read route 10 as an integer in one chunk and as '10' in another that
+# also holds '10A', splitting the route when partials are merged
+KEY_DTYPES = {'route_id': str, 'route_name': str, 'service_type': str}
+
+
+class TripDataset:
+    """
+    A directory tree (or glob) of trip CSV files, optionally partitioned
+
+    Partition values are taken from `key=value` directory names. A
+    `trip_date=YYYY-MM` (or `YYYY-MM-DD`) segment lets date-range queries
+    skip whole files, and a `route_id=...` segment does the same for route
+    filters. Files without partition segments are always read.
+    """
+
+    def __init__(self, source: str):
+        """
+        Args:
+            source: Directory (searched recursively for *.csv) or glob pattern
+        """
+        self.source = source
+        if os.path.isdir(source):
+            paths = glob.glob(os.path.join(source, '**', '*.csv'), recursive=True)
+        else:
+            paths = glob.glob(source, recursive=True)
+
+        if not paths:
+            raise ValueError(f"No trip files found for {source}")
+
+        self.files = [{'path': path, 'partitions': self._parse_partitions(path)} for path in sorted(paths)]
+
+    @staticmethod
+    def _parse_partitions(path: str) -> Dict[str, str]:
+        partitions = {}
+        for segment in os.path.normpath(os.path.dirname(path)).split(os.sep):
+            match = PARTITION_SEGMENT.match(segment)
+            if match:
+                partitions[match.group('key')] = match.group('value')
+        return partitions
+
+    def plan(self, start_date: str = None, end_date: str = None,
+             routes: Optional[Sequence[str]] = None) -> List[str]:
+        """Return only the files that can hold trips matching the filters"""
+        start = pd.Timestamp(start_date) if start_date else None
+        end = pd.Timestamp(end_date) if end_date else None
+        route_set = {str(r) for r in routes} if routes is not None else None
+
+        selected = []
+        for entry in self.files:
+            partitions = entry['partitions']
+
+            if 'trip_date' in partitions and (start is not None or end is not None):
+                period_start, period_end = _partition_date_span(partitions['trip_date'])
+                if start is not None and period_end < start:
+                    continue
+                if end is not None and period_start > end:
+                    continue
+
+            if route_set is not None and 'route_id' in partitions and partitions['route_id'] not in route_set:
+                continue
+
+            selected.append(entry['path'])
+
+        return selected
+
+    def read(self, start_date: str = None, end_date: str = None,
+             routes: Optional[Sequence[str]] = None, columns: Optional[Sequence[str]] = None,
+             chunksize: int = None) -> Iterator[pd.DataFrame]:
+        """
+        Yield trip frames matching a date range and route filter
+
+        Only the planned files are opened and only the requested columns
+        (plus those needed to filter) are parsed.
+
+        Args:
+            start_date: Inclusive first trip date (YYYY-MM-DD)
+            end_date: Inclusive last trip date (YYYY-MM-DD)
+            routes: Route ids to keep
+            columns: Columns to return (default: all columns in the files)
+            chunksize: Rows per parsed chunk within each file
+        """
+        paths = self.plan(start_date, end_date, routes)
+        print(f"[v0] Reading {len(paths)} of {len(self.files)} trip files from {self.source}")
+
+        filter_cols = []
+        if start_date or end_date:
+            filter_cols.append('trip_date')
+        if routes is not None:
+            filter_cols.append('route_id')
+        route_set = {str(r) for r in routes} if routes is not None else None
+
+        for path in paths:
+            partitions = self._parse_partitions(path)
+            usecols = None
+            if columns is not None:
+                wanted = list(dict.fromkeys(list(columns) + filter_cols))
+                header = pd.read_csv(path, nrows=0).columns
+                usecols = [col for col in wanted if col in header]
+
+            dtype = {col: KEY_DTYPES[col] for col in KEY_DTYPES if usecols is None or col in usecols}
+            frames = pd.read_csv(path, usecols=usecols, chunksize=chunksize, dtype=dtype) if chunksize \
+                else [pd.read_csv(path, usecols=usecols, dtype=dtype)]
+
+            for frame in frames:
+                # Columns that only exist in the directory layout
+                for key, value in partitions.items():
+                    if key == 'route_id' and key not in frame.columns:
+                        frame[key] = value
+
+                mask = pd.Series(True, index=frame.index)
+                if start_date or end_date:
+                    frame['trip_date'] = pd.to_datetime(frame['trip_date'])
+                    if start_date:
+                        mask &= frame['trip_date'] >= pd.Timestamp(start_date)
+                    if end_date:
+                        mask &= frame['trip_date'] <= pd.Timestamp(end_date)
+                if route_set is not None:
+                    mask &= frame['route_id'].astype(str).isin(route_set)
+
+                frame = frame[mask] if not mask.all() else frame
+                if columns is not None:
+                    frame = frame[[col for col in columns if col in frame.columns]]
+                if len(frame):
+                    yield frame.reset_index(drop=True)
+
+
+def _partition_date_span(value: str):
+    """First and last day covered by a trip_date partition value"""
+    if re.fullmatch(r'\d{4}-\d{2}', value):
+        period = pd.Period(value, freq='M')
+        return period.start_time.normalize(), period.end_time.normalize()
+    day = pd.Timestamp(value).normalize()
+    return day, day
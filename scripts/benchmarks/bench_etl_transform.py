@@ -0,0 +1,36 @@
+"""
+Durham Region Transit ETL Transform Benchmark
+Measures transform_ridership_data throughput on synthetic hourly ridership
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data-processing'))
+from etl_pipeline import transform_ridership_data
+from generate_trip_data import generate_hourly_ridership
+
+
+def run_benchmark(sizes=(100_000, 1_000_000, 10_000_000)):
+    print("=" * 60)
+    print("ETL TRANSFORM THROUGHPUT")
+    print("=" * 60)
+    results = []
+    for rows in sizes:
+        df = generate_hourly_ridership(rows)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            transform_ridership_data(df)
+            elapsed = time.perf_counter() - start
+        results.append({'rows': rows, 'seconds': elapsed, 'rows_per_s': rows / elapsed})
+        print(f"{rows:>12,} rows  {elapsed:8.3f} s  {rows / elapsed:>14,.0f} rows/s")
+    print("=" * 60)
+    return results
+
+
+if __name__ == '__main__':
+    sizes = tuple(int(arg) for arg in sys.argv[1:]) or (100_000, 1_000_000, 10_000_000)
+    run_benchmark(sizes)
@@ -0,0 +1,66 @@
+"""
+Durham Region Transit GTFS Reader Benchmark
+Times reading a synthetic regional GTFS zip and bulk-loading it into SQLite
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'data-processing'))
+from etl_pipeline import load_gtfs_schedule
+from instrumentation import peak_rss_bytes
+from generate_trip_data import write_gtfs_feed
+
+
+def run_benchmark(feed_path: str = None, routes: int = 300, stops: int = 8000, stops_per_trip: int = 40):
+    work_dir = tempfile.mkdtemp()
+    if feed_path is None:
+        feed_path = os.path.join(work_dir, 'gtfs.zip')
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_gtfs_feed(feed_path, routes=routes, stops=stops, stops_per_trip=stops_per_trip,
+                            blank_fraction=0.2)
+
+    rss_before = peak_rss_bytes()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        feed, info = load_gtfs_schedule(os.path.join(work_dir, 'drt_gtfs.db'), feed_path)
+    total = time.perf_counter() - start
+    rss_after = peak_rss_bytes()
+
+    stop_times = info['rows']['stop_times']
+    result = {
+        'feed_mb': round(os.path.getsize(feed_path) / 1e6, 1),
+        'stop_times': stop_times,
+        'read_seconds': info['read_seconds'],
+        'read_rows_per_s': round(stop_times / info['read_seconds'], 1),
+        'load_seconds': info['load_seconds'],
+        'load_rows_per_s': round(stop_times / info['load_seconds'], 1),
+        'total_seconds': round(total, 3),
+        'stop_times_memory_mb': feed.summary()['stop_times']['memory_mb'],
+        'peak_rss_mb': round(rss_after / 1e6, 1) if rss_after else None,
+        'peak_rss_increase_mb': round((rss_after - rss_before) / 1e6, 1) if rss_after else None
+    }
+
+    print("=" * 60)
+    print("GTFS FEED READ + LOAD")
+    print("=" * 60)
+    for key, value in result.items():
+        print(f"{key:<24} {value:>14,}" if isinstance(value, (int, float)) else f"{key:<24} {value!s:>14}")
+    print("=" * 60)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark GTFS feed reading and loading')
+    parser.add_argument('--feed', help='Existing GTFS zip (default: generate a synthetic feed)')
+    parser.add_argument('--routes', type=int, default=300)
+    parser.add_argument('--stops', type=int, default=8000)
+    parser.add_argument('--stops-per-trip', type=int, default=40)
+    args = parser.parse_args()
+    run_benchmark(args.feed, args.routes, args.stops, args.stops_per_trip)
@@ -0,0 +1,110 @@
+"""
+Durham Region Transit Headway Engine Benchmark
+Times stop-level headway analysis in memory and through the hash-bucket spill path
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import pandas as pd
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'data-processing'))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'analysis'))
+from gtfs_reader import read_gtfs_feed
+from headway_analysis import analyze_stop_events, headway_partials, HEADWAY_KEYS
+from instrumentation import peak_rss_bytes
+from time_segmentation import DRT_SERVICE_PERIODS
+from trip_dataset import TripDataset
+from generate_trip_data import write_gtfs_feed, iter_stop_events, write_stop_event_csvs
+
+
+def pandas_headways(events: pd.DataFrame) -> pd.DataFrame:
+    """Straightforward sort_values / groupby-diff version, for comparison"""
+    events = events.assign(trip_date=pd.to_datetime(events['trip_date']))
+    events = events.sort_values(HEADWAY_KEYS + ['trip_date', 'scheduled_arrival'])
+    groups = events.groupby(HEADWAY_KEYS + ['trip_date'], sort=False)
+    scheduled = groups['scheduled_arrival'].diff().dt.total_seconds()
+    observed = (events['actual_arrival'] - groups['actual_arrival'].transform(
+        lambda s: s.ffill().shift())).dt.total_seconds()
+    events = events.assign(
+        scheduled=scheduled, observed=observed,
+        time_period=DRT_SERVICE_PERIODS.classify(events['scheduled_arrival'].dt.hour,
+                                                 events['trip_date'].dt.dayofweek)
+    )
+    events = events[events['observed'].notna() & (events['scheduled'] > 0)]
+    return events.assign(
+        bunched=events['observed'] < 0.25 * events['scheduled'],
+        gaps=events['observed'] > 2 * events['scheduled']
+    ).groupby(HEADWAY_KEYS + ['time_period'], observed=True)[['scheduled', 'observed', 'bunched', 'gaps']].sum()
+
+
+def _write_inputs(work_dir: str, routes: int, days: int):
+    """Feed and stop event CSVs, written in a child process so it does not raise the parent's peak RSS"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        write_gtfs_feed(os.path.join(work_dir, 'gtfs.zip'), routes=routes, stops=max(routes * 25, 1000))
+        feed = read_gtfs_feed(os.path.join(work_dir, 'gtfs.zip'))
+        write_stop_event_csvs(feed, os.path.join(work_dir, 'stop_events'), days=days)
+
+
+def run_benchmark(routes: int = 100, days: int = 7, chunksize: int = 2_000_000, buckets: int = 64,
+                  compare_pandas: bool = True):
+    work_dir = tempfile.mkdtemp()
+    results = []
+
+    def timed(label, run, events_total):
+        rss_before = peak_rss_bytes()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        elapsed = time.perf_counter() - start
+        rss_after = peak_rss_bytes()
+        results.append({'run': label, 'events': events_total, 'seconds': round(elapsed, 3),
+                        'events_per_s': round(events_total / elapsed, 1),
+                        'peak_rss_increase_mb': round((rss_after - rss_before) / 1e6, 1) if rss_after else None})
+
+    try:
+        writer = multiprocessing.Process(target=_write_inputs, args=(work_dir, routes, days))
+        writer.start()
+        writer.join()
+        events_dir = os.path.join(work_dir, 'stop_events')
+        events_total = sum(len(pd.read_csv(path, usecols=['stop_id']))
+                           for path in TripDataset(events_dir).plan())
+
+        # Spill path first, before the in-memory runs raise the peak
+        timed(f'csv, spill ({buckets} buckets)',
+              lambda: analyze_stop_events(events_dir, chunksize=chunksize, buckets=buckets), events_total)
+        with contextlib.redirect_stdout(io.StringIO()):
+            feed = read_gtfs_feed(os.path.join(work_dir, 'gtfs.zip'))
+        events = pd.concat(list(iter_stop_events(feed, days=days)), ignore_index=True)
+        timed('frame, one sort', lambda: headway_partials(events), events_total)
+        if compare_pandas:
+            timed('frame, pandas groupby', lambda: pandas_headways(events), events_total)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("=" * 88)
+    print(f"STOP-LEVEL HEADWAYS: {events_total:,} stop events ({routes} routes, {days} days)")
+    print("=" * 88)
+    for result in results:
+        print(f"{result['run']:<28} {result['seconds']:9.3f} s  {result['events_per_s']:>14,.0f} events/s  "
+              f"peak RSS +{result['peak_rss_increase_mb']} MB")
+    print("=" * 88)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark stop-level headway analysis')
+    parser.add_argument('--routes', type=int, default=100)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--chunksize', type=int, default=2_000_000)
+    parser.add_argument('--buckets', type=int, default=64)
+    parser.add_argument('--no-pandas', action='store_true', help='Skip the pandas groupby comparison')
+    args = parser.parse_args()
+    run_benchmark(args.routes, args.days, args.chunksize, args.buckets, not args.no_pandas)
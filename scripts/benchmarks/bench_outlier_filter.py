@@ -0,0 +1,84 @@
+"""
+Durham Region Transit Outlier Filter Benchmark
+Compares grouped (route, hour-of-week) outlier filtering with the former global IQR filter
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data-processing'))
+from outlier_filter import OUTLIER_METHODS, filter_outliers
+from generate_trip_data import generate_hourly_ridership
+
+
+def global_iqr_filter(df: pd.DataFrame) -> pd.DataFrame:
+    """The transform's previous filter: one IQR over every row"""
+    q1 = df['total_passengers'].quantile(0.25)
+    q3 = df['total_passengers'].quantile(0.75)
+    iqr = q3 - q1
+    return df[
+        (df['total_passengers'] >= q1 - 1.5 * iqr) &
+        (df['total_passengers'] <= q3 + 1.5 * iqr)
+    ].copy()
+
+
+def inject_spikes(df: pd.DataFrame, rate: float = 0.002, seed: int = 7) -> np.ndarray:
+    """Multiply a random subset of counts by 5-10x; returns the spiked row mask"""
+    rng = np.random.default_rng(seed)
+    spiked = rng.random(len(df)) < rate
+    factor = rng.uniform(5, 10, spiked.sum())
+    df.loc[spiked, 'total_passengers'] = (df.loc[spiked, 'total_passengers'] * factor + 50).astype(np.int32)
+    return spiked
+
+
+def score(df: pd.DataFrame, kept: pd.DataFrame, spiked: np.ndarray, busy: np.ndarray) -> dict:
+    removed = np.ones(len(df), dtype=bool)
+    removed[kept.index.to_numpy()] = False
+    return {
+        'removed': int(removed.sum()),
+        'spikes_caught_pct': round(100 * (removed & spiked).sum() / max(spiked.sum(), 1), 2),
+        'clean_rows_removed_pct': round(100 * (removed & ~spiked).sum() / max((~spiked).sum(), 1), 3),
+        'busy_route_rows_removed_pct': round(100 * (removed & busy).sum() / max(busy.sum(), 1), 3)
+    }
+
+
+def run_benchmark(sizes=(1_000_000, 10_000_000), rows_per_route: int = 5000):
+    print("=" * 96)
+    print("OUTLIER FILTER: GROUPED (route, hour_of_week) vs GLOBAL IQR")
+    print("=" * 96)
+    results = []
+    for rows in sizes:
+        # About 30 rows per (route, hour-of-week) group at every size
+        routes = max(rows // rows_per_route, 1)
+        df = generate_hourly_ridership(rows, routes=routes, shaped=True)
+        spiked = inject_spikes(df)
+        # Routes in the top decile of total ridership
+        route_totals = df.groupby('route_id', observed=True)['total_passengers'].sum()
+        busy_routes = route_totals[route_totals >= route_totals.quantile(0.9)].index
+        busy = df['route_id'].isin(busy_routes).to_numpy()
+
+        runs = [('global iqr', lambda: global_iqr_filter(df))]
+        runs += [(f'grouped {method}', lambda method=method: filter_outliers(df, method=method)[0])
+                 for method in OUTLIER_METHODS]
+        for label, run in runs:
+            start = time.perf_counter()
+            kept = run()
+            elapsed = time.perf_counter() - start
+            result = {'rows': rows, 'groups': routes * 168, 'filter': label, 'seconds': round(elapsed, 3),
+                      'rows_per_s': round(rows / elapsed, 1)}
+            result.update(score(df, kept, spiked, busy))
+            results.append(result)
+            print(f"{rows:>11,} rows  {label:<15} {elapsed:7.3f} s  {rows / elapsed:>12,.0f} rows/s  "
+                  f"spikes caught {result['spikes_caught_pct']:6.2f}%  "
+                  f"clean removed {result['clean_rows_removed_pct']:6.3f}%  "
+                  f"busy-route removed {result['busy_route_rows_removed_pct']:6.3f}%")
+    print("=" * 96)
+    return results
+
+
+if __name__ == '__main__':
+    sizes = tuple(int(arg) for arg in sys.argv[1:]) or (1_000_000, 10_000_000)
+    run_benchmark(sizes)
@@ -0,0 +1,64 @@
+"""
+Durham Region Transit SQL Backend Benchmark
+Compares the pandas in-memory path with SQLite pushdown for the report metrics
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+from ridership_analysis import RidershipAnalyzer
+from trip_database import TripDatabase
+
+
+def compute_all_metrics(analyzer: RidershipAnalyzer):
+    analyzer.get_data_overview()
+    analyzer.compute_boardings_analysis()
+    analyzer.compute_ontime_performance()
+    analyzer.compute_productivity_metrics()
+    analyzer.generate_time_series_data()
+    analyzer.generate_heatmap_data()
+
+
+def run_benchmark(csv_path: str, db_path: str = None):
+    """Time CSV->metrics (pandas) against load-once + SQL aggregation"""
+    db_path = db_path or os.path.join(tempfile.mkdtemp(), 'drt_trips.db')
+    results = {}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        compute_all_metrics(RidershipAnalyzer(csv_path))
+        results['pandas_csv_to_metrics_s'] = time.perf_counter() - start
+
+        db = TripDatabase(db_path)
+        start = time.perf_counter()
+        rows = db.load_csv(csv_path, replace=True)
+        results['sqlite_bulk_load_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compute_all_metrics(db.analyzer())
+        results['sqlite_pushdown_metrics_s'] = time.perf_counter() - start
+        results['pushdown_result_rows'] = len(db.query_partials())
+        db.close()
+
+    results['trips'] = rows
+    results['sqlite_load_rows_per_s'] = rows / results['sqlite_bulk_load_s']
+
+    print("=" * 60)
+    print("SQL PUSHDOWN BENCHMARK")
+    print("=" * 60)
+    for name, value in results.items():
+        print(f"{name:32s} {value:,.3f}" if isinstance(value, float) else f"{name:32s} {value:,}")
+    print("=" * 60)
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python bench_sql_backend.py <trip_csv> [db_path]")
+        sys.exit(1)
+    run_benchmark(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,347 @@
+"""
+Durham Region Transit Synthetic Data Generator
+Seeded, vectorized trip records in the RidershipAnalyzer input layout
+"""
+
+import argparse
+import io
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+from typing import Iterator
+
+SERVICE_TYPES = ['Conventional', 'PULSE Rapid Transit', 'Express', 'On Demand']
+SERVICE_TYPE_WEIGHTS = [0.6, 0.1, 0.15, 0.15]
+
+# Relative demand by hour of day: AM and PM commute peaks over a daytime base
+HOURLY_DEMAND = np.array([
+    0.05, 0.02, 0.01, 0.01, 0.05, 0.35, 0.80, 1.00, 0.95, 0.60, 0.50, 0.55,
+    0.60, 0.55, 0.60, 0.85, 0.95, 0.90, 0.70, 0.50, 0.40, 0.30, 0.20, 0.10
+])
+
+
+def route_catalogue(routes: int = 60, seed: int = 7) -> pd.DataFrame:
+    """Route ids, names, service types and per-route demand / running time"""
+    rng = np.random.default_rng(seed)
+    service = rng.choice(len(SERVICE_TYPES), routes, p=SERVICE_TYPE_WEIGHTS)
+    return pd.DataFrame({
+        'route_id': [f'{900 + i if service[i] == 1 else 100 + i}' for i in range(routes)],
+        'route_name': [f'Route {i + 1} Corridor' for i in range(routes)],
+        'service_type': np.array(SERVICE_TYPES)[service],
+        'demand': rng.lognormal(mean=3.0, sigma=0.6, size=routes),
+        'run_minutes': rng.integers(20, 75, routes),
+        'congestion': rng.uniform(0.5, 2.0, routes)
+    })
+
+
+def generate_trips(rows: int, seed: int = 42, routes: int = 60, start_date: str = '2024-11-01',
+                   days: int = 30, catalogue: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Generate trip records with realistic time-of-day, weekday and delay structure
+
+    Args:
+        rows: Number of trips
+        seed: Random seed (same arguments -> same records)
+        routes: Routes in the generated network (ignored if catalogue given)
+        start_date: First service day
+        days: Service days covered
+        catalogue: Route table from route_catalogue()
+    """
+    rng = np.random.default_rng(seed)
+    catalogue = catalogue if catalogue is not None else route_catalogue(routes)
+
+    # Busier routes run more trips
+    route = rng.choice(len(catalogue), rows, p=catalogue['demand'] / catalogue['demand'].sum())
+    day = rng.integers(0, days, rows)
+    trip_date = np.datetime64(start_date, 'D') + day
+    is_weekend = ((trip_date.astype('int64') + 3) % 7) >= 5
+
+    # Departure hour drawn from the weekday or flattened weekend profile
+    weekday_p = HOURLY_DEMAND / HOURLY_DEMAND.sum()
+    weekend_shape = np.sqrt(HOURLY_DEMAND)
+    weekend_p = weekend_shape / weekend_shape.sum()
+    hour = np.where(
+        is_weekend,
+        rng.choice(24, rows, p=weekend_p),
+        rng.choice(24, rows, p=weekday_p)
+    )
+    departure_s = hour * 3600 + rng.integers(0, 3600, rows)
+
+    run_s = catalogue['run_minutes'].to_numpy()[route] * 60 + rng.integers(-120, 120, rows)
+    peak_factor = HOURLY_DEMAND[hour]
+
+    # Delays grow with congestion and peak load; a few trips run early
+    delay_s = (
+        rng.gamma(1.6, 120, rows) * catalogue['congestion'].to_numpy()[route] * (0.6 + peak_factor)
+        - rng.exponential(60, rows)
+    ).astype(np.int64)
+    departure_delay_s = (delay_s * rng.uniform(0.2, 0.7, rows)).astype(np.int64)
+
+    boardings = rng.poisson(
+        catalogue['demand'].to_numpy()[route] * (0.3 + peak_factor) * np.where(is_weekend, 0.6, 1.0)
+    )
+
+    base = trip_date.astype('datetime64[s]')
+    scheduled_departure = base + departure_s
+    scheduled_arrival = scheduled_departure + run_s
+
+    return pd.DataFrame({
+        'route_id': catalogue['route_id'].to_numpy()[route],
+        'route_name': catalogue['route_name'].to_numpy()[route],
+        'service_type': catalogue['service_type'].to_numpy()[route],
+        'scheduled_departure': scheduled_departure,
+        'actual_departure': scheduled_departure + departure_delay_s,
+        'scheduled_arrival': scheduled_arrival,
+        'actual_arrival': scheduled_arrival + delay_s,
+        'boardings': boardings,
+        'trip_date': trip_date
+    })
+
+
+def iter_trip_chunks(rows: int, chunk_rows: int = 1_000_000, seed: int = 42,
+                     **options) -> Iterator[pd.DataFrame]:
+    """Yield `rows` trips in chunks; each chunk has its own spawned seed"""
+    catalogue = route_catalogue(options.pop('routes', 60))
+    seeds = np.random.SeedSequence(seed).spawn((rows + chunk_rows - 1) // chunk_rows)
+    for i, child in enumerate(seeds):
+        size = min(chunk_rows, rows - i * chunk_rows)
+        yield generate_trips(size, seed=int(child.generate_state(1)[0]), catalogue=catalogue, **options)
+
+
+def write_trip_csv(path: str, rows: int, chunk_rows: int = 1_000_000, seed: int = 42,
+                   partition_by_month: bool = False, **options) -> int:
+    """
+    Write generated trips to a CSV (or a trip_date=YYYY-MM/ partitioned directory)
+
+    Memory use is bounded by chunk_rows regardless of the total size.
+
+    Returns:
+        Number of rows written
+    """
+    written = 0
+    started = set()
+    for chunk in iter_trip_chunks(rows, chunk_rows, seed, **options):
+        if partition_by_month:
+            months = chunk['trip_date'].dt.strftime('%Y-%m')
+            for month, part in chunk.groupby(months):
+                target = os.path.join(path, f'trip_date={month}', 'part-0.csv')
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                part.to_csv(target, mode='a' if target in started else 'w',
+                            header=target not in started, index=False)
+                started.add(target)
+        else:
+            chunk.to_csv(path, mode='a' if written else 'w', header=not written, index=False)
+        written += len(chunk)
+        print(f"[v0] Generated {written:,} / {rows:,} trips")
+    return written
+
+
+def generate_hourly_ridership(rows: int, routes: int = 200, days: int = 365, seed: int = 42,
+                              shaped: bool = False) -> pd.DataFrame:
+    """
+    Random hourly route ridership rows in the ETL input layout
+
+    With shaped=True counts follow a per-route demand level and the
+    HOURLY_DEMAND profile (Poisson around the mean), so routes and hours
+    differ in scale the way real ridership does; otherwise counts are
+    uniform in [50, 500).
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2024-01-01')
+    route_codes = rng.integers(0, routes, rows)
+    ride_dates = start + pd.to_timedelta(rng.integers(0, days, rows), unit='D')
+    hours = rng.integers(0, 24, rows, dtype=np.int8)
+    if shaped:
+        route_demand = rng.lognormal(mean=5.0, sigma=1.0, size=routes)
+        passengers = rng.poisson(route_demand[route_codes] * HOURLY_DEMAND[hours]).astype(np.int32)
+    else:
+        passengers = rng.integers(50, 500, rows, dtype=np.int32)
+    return pd.DataFrame({
+        'route_id': pd.Categorical.from_codes(route_codes, categories=[f'R{i:04d}' for i in range(routes)]),
+        'ride_date': ride_dates,
+        'hour_of_day': hours,
+        'total_passengers': passengers
+    })
+
+
+def _gtfs_time_text(seconds: np.ndarray) -> pd.Series:
+    """Seconds after service start -> HH:MM:SS (hours may pass 24)"""
+    hours, rest = np.divmod(seconds, 3600)
+    minutes, secs = np.divmod(rest, 60)
+    parts = [pd.Series(v).astype(str).str.zfill(2) for v in (hours, minutes, secs)]
+    return parts[0] + ':' + parts[1] + ':' + parts[2]
+
+
+def write_gtfs_feed(path: str, routes: int = 300, stops: int = 8000, stops_per_trip: int = 40,
+                    blank_fraction: float = 0.0, seed: int = 42) -> int:
+    """
+    Write a synthetic GTFS zip shaped like a regional bus network
+
+    Each route serves a fixed stop pattern in both directions from 05:00
+    until past midnight (times beyond 24:00), at a base headway halved in
+    the AM and PM peaks, with separate weekday / Saturday / Sunday service.
+
+    Args:
+        path: Output .zip path
+        routes: Number of routes
+        stops: Stops in the network
+        stops_per_trip: Stops on every route pattern
+        blank_fraction: Share of intermediate stop times left blank (non-timepoints)
+        seed: Random seed
+
+    Returns:
+        Number of stop_times rows written
+    """
+    rng = np.random.default_rng(seed)
+    route_ids = [f'{100 + i}' for i in range(routes)]
+    stop_ids = [f'S{i:05d}' for i in range(stops)]
+    service_ids = ['WKDY', 'SAT', 'SUN']
+
+    trip_rows = []
+    pattern_rows = []
+    for r, route_id in enumerate(route_ids):
+        pattern = rng.choice(stops, stops_per_trip, replace=False)
+        segment_s = np.r_[0, np.cumsum(rng.integers(60, 180, stops_per_trip - 1))]
+        base_headway = rng.choice([600, 900, 1200, 1800])
+        for s, service_id in enumerate(service_ids):
+            headway = base_headway * (1 if s == 0 else 2)
+            starts = np.arange(5 * 3600, 25 * 3600, headway)
+            if s == 0:
+                peak = ((starts >= 7 * 3600) & (starts < 9 * 3600)) | ((starts >= 16 * 3600) & (starts < 18 * 3600))
+                starts = np.sort(np.r_[starts, starts[peak] + headway // 2])
+            for direction in (0, 1):
+                for k, start in enumerate(starts):
+                    trip_rows.append((route_id, service_id, f'{route_id}_{service_id}_{direction}_{k}', direction, start))
+                pattern_rows.append((route_id, direction, pattern if direction == 0 else pattern[::-1],
+                                     segment_s if direction == 0 else segment_s[-1] - segment_s[::-1]))
+
+    trips = pd.DataFrame(trip_rows, columns=['route_id', 'service_id', 'trip_id', 'direction_id', 'start_s'])
+    patterns = {(route_id, direction): (stop_index, offsets)
+                for route_id, direction, stop_index, offsets in pattern_rows}
+
+    stop_index = np.stack([patterns[key][0] for key in zip(trips['route_id'], trips['direction_id'])])
+    offsets = np.stack([patterns[key][1] for key in zip(trips['route_id'], trips['direction_id'])])
+    times = trips['start_s'].to_numpy()[:, None] + offsets
+    n = times.size
+    time_text = _gtfs_time_text(times.ravel())
+    blank = np.zeros(times.shape, dtype=bool)
+    blank[:, 1:-1] = rng.random((len(trips), stops_per_trip - 2)) < blank_fraction
+    time_text[blank.ravel()] = ''
+
+    stop_times = pd.DataFrame({
+        'trip_id': np.repeat(trips['trip_id'].to_numpy(), stops_per_trip),
+        'arrival_time': time_text,
+        'departure_time': time_text,
+        'stop_id': np.asarray(stop_ids)[stop_index.ravel()],
+        'stop_sequence': np.tile(np.arange(1, stops_per_trip + 1), len(trips))
+    })
+    files = {
+        'agency.txt': pd.DataFrame({'agency_id': ['DRT'], 'agency_name': ['Durham Region Transit'],
+                                    'agency_url': ['https://www.durhamregiontransit.com'],
+                                    'agency_timezone': ['America/Toronto']}),
+        'routes.txt': pd.DataFrame({'route_id': route_ids, 'route_short_name': route_ids,
+                                    'route_long_name': [f'Route {r} Corridor' for r in route_ids],
+                                    'route_type': 3}),
+        'stops.txt': pd.DataFrame({'stop_id': stop_ids, 'stop_name': [f'Stop {s}' for s in stop_ids],
+                                   'stop_lat': rng.uniform(43.8, 44.1, stops),
+                                   'stop_lon': rng.uniform(-79.1, -78.7, stops)}),
+        'trips.txt': trips[['route_id', 'service_id', 'trip_id', 'direction_id']],
+        'calendar.txt': pd.DataFrame({
+            'service_id': service_ids,
+            'monday': [1, 0, 0], 'tuesday': [1, 0, 0], 'wednesday': [1, 0, 0], 'thursday': [1, 0, 0],
+            'friday': [1, 0, 0], 'saturday': [0, 1, 0], 'sunday': [0, 0, 1],
+            'start_date': '20240101', 'end_date': '20241231'
+        }),
+        'calendar_dates.txt': pd.DataFrame({'service_id': ['WKDY', 'SUN'], 'date': ['20241225', '20241225'],
+                                            'exception_type': [2, 1]}),
+        'stop_times.txt': stop_times
+    }
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, frame in files.items():
+            with archive.open(name, 'w') as f, io.TextIOWrapper(f, encoding='utf-8', newline='') as text:
+                frame.to_csv(text, index=False)
+    print(f"[v0] Wrote GTFS feed {path}: {routes:,} routes, {len(trips):,} trips, {n:,} stop times")
+    return n
+
+
+def iter_stop_events(feed, start_date: str = '2024-11-01', days: int = 30, seed: int = 42,
+                     cancel_rate: float = 0.01) -> Iterator[pd.DataFrame]:
+    """
+    Yield one day of simulated AVL stop events at a time for a GTFS feed
+
+    Every trip scheduled that day (calendar.txt weekday pattern) arrives at
+    each stop with a start delay plus a per-trip drift that accumulates
+    along the route, so late trips run into their followers and bunch.
+    A few trips are cancelled (no actual arrivals).
+
+    Args:
+        feed: GTFSFeed from gtfs_reader.read_gtfs_feed (interpolated)
+        start_date: First service day
+        days: Number of service days
+        seed: Random seed
+        cancel_rate: Share of trips with no actual arrivals
+    """
+    rng = np.random.default_rng(seed)
+    stop_times = feed.stop_times
+    trip_codes = stop_times['trip_id'].cat.codes.to_numpy()
+    trip_service = feed.trips['service_id'].astype(str).to_numpy()
+    route_ids = feed.trips['route_id'].astype(str).to_numpy()
+    direction_ids = feed.trips['direction_id'].to_numpy()
+    stop_ids = stop_times['stop_id'].astype(str).to_numpy()
+    arrival = stop_times['arrival_time'].to_numpy().astype(np.int64)
+    position = stop_times['stop_sequence'].to_numpy().astype(np.int64) - 1
+    weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+    for day in pd.date_range(start_date, periods=days, freq='D'):
+        running = feed.calendar.loc[feed.calendar[weekdays[day.dayofweek]] == 1, 'service_id']
+        rows = np.flatnonzero(np.isin(trip_service, running.to_numpy())[trip_codes])
+        trips = trip_codes[rows]
+
+        start_delay = rng.gamma(1.5, 60, len(trip_service)) - 30
+        drift = rng.normal(4, 12, len(trip_service))
+        delay = start_delay[trips] + drift[trips] * position[rows] + rng.normal(0, 20, len(rows))
+        cancelled = (rng.random(len(trip_service)) < cancel_rate)[trips]
+
+        scheduled = np.datetime64(day.date(), 's') + arrival[rows]
+        actual = scheduled + delay.astype(np.int64)
+        actual[cancelled] = np.datetime64('NaT')
+        yield pd.DataFrame({
+            'route_id': route_ids[trips],
+            'direction_id': direction_ids[trips],
+            'stop_id': stop_ids[rows],
+            'trip_date': day.strftime('%Y-%m-%d'),
+            'scheduled_arrival': scheduled,
+            'actual_arrival': actual
+        })
+
+
+def write_stop_event_csvs(feed, directory: str, start_date: str = '2024-11-01', days: int = 30,
+                          seed: int = 42) -> int:
+    """Write iter_stop_events output as trip_date=YYYY-MM-DD/part-0.csv partitions"""
+    total = 0
+    for events in iter_stop_events(feed, start_date, days, seed):
+        day_dir = os.path.join(directory, f"trip_date={events['trip_date'].iloc[0]}")
+        os.makedirs(day_dir, exist_ok=True)
+        events.to_csv(os.path.join(day_dir, 'part-0.csv'), index=False)
+        total += len(events)
+    print(f"[v0] Wrote {total:,} stop events over {days} days to {directory}")
+    return total
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic DRT trip records')
+    parser.add_argument('output', help='CSV path (or directory with --partition-by-month)')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--routes', type=int, default=60)
+    parser.add_argument('--start-date', default='2024-11-01')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    parser.add_argument('--partition-by-month', action='store_true')
+    args = parser.parse_args()
+
+    write_trip_csv(
+        args.output, args.rows, chunk_rows=args.chunk_rows, seed=args.seed,
+        partition_by_month=args.partition_by_month, routes=args.routes,
+        start_date=args.start_date, days=args.days
+    )
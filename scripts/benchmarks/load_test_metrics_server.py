@@ -0,0 +1,140 @@
+"""
+Durham Region Transit Metrics Server Load Test
+Replays a mix of filtered dashboard queries concurrently and reports latency percentiles
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+from metrics_server import MetricsQueryService, QUERY_ENDPOINTS, load_analyzer, make_server
+
+
+def build_query_mix(base_url: str, distinct: int, seed: int = 42) -> List[str]:
+    """Distinct dashboard-style URLs: per-route pages, date windows and network views"""
+    with urlopen(f'{base_url}/api/routes') as response:
+        routes = [str(r['route_id']) for r in json.load(response)]
+    with urlopen(f'{base_url}/api/overview') as response:
+        date_range = json.load(response)['result']['date_range']
+
+    rng = np.random.default_rng(seed)
+    days = np.arange(np.datetime64(date_range['start']), np.datetime64(date_range['end']) + 1)
+    endpoints = sorted(QUERY_ENDPOINTS)
+
+    urls = set()
+    while len(urls) < distinct:
+        endpoint = endpoints[rng.integers(len(endpoints))]
+        params = []
+        if rng.random() < 0.7:
+            params.append(f'route={routes[rng.integers(len(routes))]}')
+        if rng.random() < 0.6:
+            start, end = np.sort(rng.choice(days, 2))
+            params += [f'start={start}', f'end={end}']
+        urls.add(f"{base_url}{endpoint}{'?' + '&'.join(params) if params else ''}")
+    return sorted(urls)
+
+
+def run_load_test(base_url: str, requests: int = 2000, concurrency: int = 8,
+                  distinct: int = 200, seed: int = 42) -> Dict:
+    """
+    Issue requests drawn (with repetition) from a fixed query mix
+
+    Returns:
+        Latency percentiles (ms), throughput, error count and server cache stats
+    """
+    urls = build_query_mix(base_url, distinct, seed)
+    rng = np.random.default_rng(seed + 1)
+    # Zipf-like popularity so some queries repeat often, as dashboard traffic does
+    weights = 1.0 / np.arange(1, len(urls) + 1)
+    plan = rng.choice(len(urls), requests, p=weights / weights.sum())
+
+    latencies = np.zeros(requests)
+    errors = []
+    lock = threading.Lock()
+
+    def fetch(i: int):
+        start = time.perf_counter()
+        try:
+            with urlopen(urls[plan[i]]) as response:
+                response.read()
+        except HTTPError as exc:
+            if exc.code != 404:  # an empty slice is a valid answer
+                with lock:
+                    errors.append(exc.code)
+        latencies[i] = time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fetch, range(requests)))
+    wall = time.perf_counter() - wall_start
+
+    with urlopen(f'{base_url}/api/health') as response:
+        cache = json.load(response)['cache']
+
+    ms = latencies * 1000
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'distinct_queries': len(urls),
+        'errors': len(errors),
+        'throughput_rps': round(requests / wall, 1),
+        'latency_ms': {
+            'p50': round(float(np.percentile(ms, 50)), 3),
+            'p90': round(float(np.percentile(ms, 90)), 3),
+            'p99': round(float(np.percentile(ms, 99)), 3),
+            'max': round(float(ms.max()), 3)
+        },
+        'cache': cache
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test the DRT metrics query server')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='Base URL of a running server, e.g. http://127.0.0.1:8050')
+    target.add_argument('--data', help='Trip CSV / dataset / state to serve in-process for the test')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--distinct', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if args.data:
+        with contextlib.redirect_stdout(io.StringIO()):
+            service = MetricsQueryService(load_analyzer(args.data))
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+    try:
+        results = run_load_test(base_url.rstrip('/'), args.requests, args.concurrency,
+                                args.distinct, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    print("=" * 60)
+    print("METRICS SERVER LOAD TEST")
+    print("=" * 60)
+    print(f"Requests: {results['requests']:,} ({results['distinct_queries']} distinct, "
+          f"concurrency {results['concurrency']})")
+    print(f"Throughput: {results['throughput_rps']:,} req/s, errors: {results['errors']}")
+    latency = results['latency_ms']
+    print(f"Latency ms: p50 {latency['p50']}  p90 {latency['p90']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"Cache hit rate: {results['cache']['hit_rate']}")
+    print("=" * 60)
+    print(json.dumps(results))
@@ -0,0 +1,222 @@
+"""
+Durham Region Transit Benchmark Suite
+Times and memory-profiles the analysis, report and ETL stages at several data scales
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'analysis'))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'data-processing'))
+from generate_trip_data import write_trip_csv
+from ridership_analysis import RidershipAnalyzer
+from report_generator import DRTReportGenerator
+import etl_pipeline
+
+DEFAULT_SCALES = (10_000, 100_000, 1_000_000)
+
+ANALYZER_METHODS = [
+    'route_summary', 'get_data_overview', 'compute_boardings_analysis',
+    'compute_ontime_performance', 'compute_productivity_metrics',
+    'generate_time_series_data', 'generate_heatmap_data',
+    'generate_recommendations', 'memory_profile'
+]
+
+
+def measure(fn: Callable, profile_memory: bool = True) -> Dict:
+    """
+    Run fn once for wall time, then again under tracemalloc for peak memory
+
+    Output printed by fn is discarded. Peak memory is the largest amount of
+    Python/numpy heap allocated during the call, on top of what was already held.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+
+        peak = None
+        if profile_memory:
+            tracemalloc.start()
+            try:
+                fn()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    return {'seconds': round(seconds, 6), 'peak_bytes': peak}
+
+
+def _cold(analyzer: RidershipAnalyzer, method: str) -> Callable:
+    """Call a metric method with memoized partials dropped, so each timing includes its scan"""
+    def run():
+        if analyzer.df is not None:
+            analyzer.aggregates = None
+        analyzer._route_summary = None
+        getattr(analyzer, method)()
+    return run
+
+
+def hourly_ridership_from_trips(trips: pd.DataFrame) -> pd.DataFrame:
+    """Trip records rolled up to the ETL hourly ridership layout"""
+    departure = pd.to_datetime(trips['scheduled_departure'])
+    hourly = trips.assign(
+        ride_date=departure.dt.normalize(), hour_of_day=departure.dt.hour
+    ).groupby(['route_id', 'ride_date', 'hour_of_day'])['boardings'].sum()
+    return hourly.rename('total_passengers').reset_index()
+
+
+def performance_from_trips(trips: pd.DataFrame) -> pd.DataFrame:
+    """Per-route trip counts and delays in the ETL performance layout"""
+    delay = (pd.to_datetime(trips['actual_arrival'])
+             - pd.to_datetime(trips['scheduled_arrival'])).dt.total_seconds() / 60
+    on_time = delay.between(-1, 5)
+    return pd.DataFrame({
+        'route_id': trips['route_id'],
+        'completed_trips': 1,
+        'on_time_trips': on_time.astype(int),
+        'delayed_trips': (~on_time).astype(int),
+        'cancelled_trips': 0,
+        'avg_delay_minutes': delay
+    })
+
+
+def benchmark_scale(csv_path: str, rows: int, profile_memory: bool = True) -> List[Dict]:
+    """Every benchmark for one generated trip file"""
+    results = []
+
+    def record(group: str, name: str, fn: Callable, items: int):
+        result = measure(fn, profile_memory)
+        result.update({'scale': rows, 'group': group, 'benchmark': name, 'rows': items,
+                       'rows_per_s': round(items / result['seconds'], 1) if result['seconds'] else None})
+        results.append(result)
+        peak = f"{result['peak_bytes'] / 1024 ** 2:9.1f} MB" if result['peak_bytes'] is not None else ''
+        print(f"  {group:9s} {name:32s} {result['seconds']:9.3f} s {peak}")
+
+    # Analyzer: load, then each metric method on the loaded frame
+    record('analyzer', 'load_csv', lambda: RidershipAnalyzer(csv_path, use_cache=False), rows)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer = RidershipAnalyzer(csv_path, use_cache=False)
+    for method in ANALYZER_METHODS:
+        record('analyzer', method, _cold(analyzer, method), rows)
+
+    # Report: full report generation on an already-loaded generator
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator = DRTReportGenerator(csv_path, use_cache=False)
+    report = _cold(generator.analyzer, 'route_summary')
+    record('report', 'generate_full_report', lambda: (report(), generator.generate_full_report()), rows)
+
+    # ETL: stages fed with inputs derived from the same trips
+    trips = pd.read_csv(csv_path)
+    hourly = hourly_ridership_from_trips(trips)
+    performance = performance_from_trips(trips)
+    with contextlib.redirect_stdout(io.StringIO()):
+        clean = etl_pipeline.transform_ridership_data(hourly.copy())
+        metrics = etl_pipeline.calculate_performance_metrics(performance)
+        forecast = etl_pipeline.generate_ridership_forecast(clean, seed=42)
+
+    record('etl', 'extract_gtfs_data', etl_pipeline.extract_gtfs_data, 0)
+    record('etl', 'transform_ridership_data',
+           lambda: etl_pipeline.transform_ridership_data(hourly.copy()), len(hourly))
+    record('etl', 'calculate_performance_metrics',
+           lambda: etl_pipeline.calculate_performance_metrics(performance), len(performance))
+    record('etl', 'generate_ridership_forecast',
+           lambda: etl_pipeline.generate_ridership_forecast(clean, seed=42), len(clean))
+    record('etl', 'export_analysis_results',
+           lambda: etl_pipeline.export_analysis_results(metrics, forecast), len(metrics))
+
+    return results
+
+
+def compare(current: Dict, baseline_path: str):
+    """Print the time ratio of each benchmark against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['scale'], r['group'], r['benchmark']): r for r in baseline['results']}
+
+    print("\n" + "=" * 72)
+    print(f"COMPARISON WITH {baseline_path}")
+    print("=" * 72)
+    for result in current['results']:
+        before = previous.get((result['scale'], result['group'], result['benchmark']))
+        if before and before['seconds']:
+            ratio = result['seconds'] / before['seconds']
+            print(f"{result['scale']:>11,} {result['benchmark']:32s} "
+                  f"{before['seconds']:9.3f} -> {result['seconds']:9.3f} s  x{ratio:5.2f}")
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, data_dir: str = None, seed: int = 42,
+                   profile_memory: bool = True) -> Dict:
+    """
+    Generate (or reuse) a trip file per scale and benchmark every stage
+
+    Args:
+        scales: Trip counts to benchmark
+        data_dir: Where generated CSVs are kept (reused when present)
+        seed: Generator seed, so runs on different releases see identical data
+        profile_memory: Also record tracemalloc peak memory (runs each stage twice)
+
+    Returns:
+        Results document (environment + one record per scale/benchmark)
+    """
+    data_dir = data_dir or tempfile.mkdtemp(prefix='drt_bench_')
+    os.makedirs(data_dir, exist_ok=True)
+
+    document = {
+        'generated_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'seed': seed,
+        'results': []
+    }
+
+    for rows in scales:
+        csv_path = os.path.join(data_dir, f'trips_{rows}_seed{seed}.csv')
+        if not os.path.exists(csv_path):
+            with contextlib.redirect_stdout(io.StringIO()):
+                write_trip_csv(csv_path, rows, seed=seed)
+
+        print("=" * 72)
+        print(f"SCALE: {rows:,} TRIPS")
+        print("=" * 72)
+        document['results'].extend(benchmark_scale(csv_path, rows, profile_memory))
+
+    return document
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark DRT analysis, report and ETL stages')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES))
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--data-dir', default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help='Skip tracemalloc peak memory runs')
+    parser.add_argument('--compare', default=None, help='Earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    document = run_benchmarks(args.scales, args.data_dir, args.seed, not args.no_memory)
+
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    print(f"\n[v0] Benchmark results written to {args.output}")
+
+    if args.compare:
+        compare(document, args.compare)
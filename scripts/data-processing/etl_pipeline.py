@@ -3,19 +3,51 @@ TTC Transit Data ETL Pipeline
 Extracts, transforms, and loads transit data for performance analysis
 """
 
+import os
+import sys
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
 
+# Period definitions are shared with the ridership analysis module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+from time_segmentation import ETL_HOURLY_PERIODS
+from instrumentation import active_tracer, stage, traced
+from trip_database import TripDatabase
+from outlier_filter import OUTLIER_FALLBACK_KEYS, OUTLIER_GROUP_KEYS, filter_outliers, summarize_removals
+from gtfs_reader import ROUTE_TYPE_NAMES, load_gtfs_feed, read_gtfs_feed
+
+# Environment variable naming a GTFS zip for the pipeline to read
+GTFS_PATH_ENV = 'DRT_GTFS_PATH'
+
 # Sample GTFS data processing functions
-def extract_gtfs_data():
+@traced('etl.extract_gtfs_data')
+def extract_gtfs_data(feed_path=None):
     """
-    Simulates extracting GTFS (General Transit Feed Specification) data
-    In production, this would fetch from TTC's GTFS feed
+    Extracts the route list from a GTFS (General Transit Feed Specification) feed
+    
+    Reads the local feed archive when feed_path is given; otherwise returns
+    a small sample route list for demonstration.
+    
+    Args:
+        feed_path: GTFS .zip (or unpacked directory)
+    
+    Returns:
+        Routes with route_id, route_short_name, route_long_name, route_type
     """
     print("[ETL] Extracting GTFS data...")
     
+    if feed_path:
+        routes = read_gtfs_feed(feed_path).routes
+        return pd.DataFrame({
+            'route_id': routes['route_id'],
+            'route_short_name': routes['route_short_name'].fillna(''),
+            'route_long_name': routes['route_long_name'].fillna(''),
+            'route_type': [ROUTE_TYPE_NAMES.get(code, str(code)) for code in routes['route_type'].tolist()]
+        })
+    
     # Sample routes data
     routes_data = {
         'route_id': ['R001', 'R002', 'R003', 'R004', 'R005'],
@@ -27,52 +59,79 @@ def extract_gtfs_data():
     
     return pd.DataFrame(routes_data)
 
-def transform_ridership_data(df):
+# Hours flagged as rush hour (7-9 AM and 4-6 PM inclusive)
+RUSH_HOURS = (7, 8, 9, 16, 17, 18)
+
+@traced('etl.transform_ridership_data')
+def transform_ridership_data(df, outlier_method='iqr', outlier_keys=OUTLIER_GROUP_KEYS,
+                             return_report=False, min_group_size=8,
+                             outlier_fallbacks=OUTLIER_FALLBACK_KEYS):
     """
     Transforms raw ridership data with cleaning and feature engineering
+    
+    Outliers are judged against their own (route, hour-of-week) group rather
+    than the whole network, so busy routes and peak hours are not dropped
+    wholesale. Rows of groups too small to bound are judged against the
+    coarser fallback groupings instead (route x hour of day, then route).
+    All features are derived with array operations; the rolling
+    average is a calendar 7-day window per route over (ride_date + hour_of_day).
+    
+    Args:
+        df: Hourly ridership rows (route_id, ride_date, hour_of_day, total_passengers)
+        outlier_method: 'iqr', 'mad' or 'zscore'
+        outlier_keys: Grouping for outlier bounds (() for one global group)
+        return_report: Also return the per-group outlier report
+        min_group_size: Values a group needs for bounds of its own
+        outlier_fallbacks: Coarser groupings for rows of smaller groups
+            (() to leave those rows unchecked)
     """
     print("[ETL] Transforming ridership data...")
     
-    # Remove outliers using IQR method
-    Q1 = df['total_passengers'].quantile(0.25)
-    Q3 = df['total_passengers'].quantile(0.75)
-    IQR = Q3 - Q1
-    
-    df_clean = df[
-        (df['total_passengers'] >= Q1 - 1.5 * IQR) & 
-        (df['total_passengers'] <= Q3 + 1.5 * IQR)
-    ].copy()
+    # Remove outliers per group
+    with stage('etl.filter_outliers', method=outlier_method, rows_in=len(df)) as record:
+        df_clean, outlier_report = filter_outliers(
+            df, 'total_passengers', by=outlier_keys, method=outlier_method,
+            min_group_size=min_group_size, fallbacks=outlier_fallbacks
+        )
+        record['rows_out'] = len(df_clean)
+        record['rows_unchecked'] = int(outlier_report['unchecked'].sum())
+        record['groups'] = len(outlier_report)
+        record['groups_with_removals'] = int((outlier_report['removed'] > 0).sum())
     
     # Add time-based features
-    df_clean['is_rush_hour'] = df_clean['hour_of_day'].apply(
-        lambda x: 1 if (7 <= x <= 9) or (16 <= x <= 18) else 0
-    )
+    df_clean['is_rush_hour'] = np.isin(df_clean['hour_of_day'].to_numpy(), RUSH_HOURS).astype(np.int8)
     
-    df_clean['time_period'] = df_clean['hour_of_day'].apply(classify_time_period)
+    df_clean['time_period'] = ETL_HOURLY_PERIODS.classify(df_clean['hour_of_day'])
     
-    # Calculate rolling averages
-    df_clean = df_clean.sort_values(['route_id', 'ride_date', 'hour_of_day'])
-    df_clean['rolling_avg_7d'] = df_clean.groupby('route_id')['total_passengers'].transform(
-        lambda x: x.rolling(window=7, min_periods=1).mean()
-    )
+    # Calculate rolling averages over a true 7-day window per route
+    df_clean['ride_date'] = pd.to_datetime(df_clean['ride_date'])
+    df_clean['ride_ts'] = df_clean['ride_date'] + pd.to_timedelta(df_clean['hour_of_day'], unit='h')
+    df_clean = df_clean.sort_values(['route_id', 'ride_ts'], kind='stable').reset_index(drop=True)
     
-    print(f"[ETL] Cleaned {len(df_clean)} records (removed {len(df) - len(df_clean)} outliers)")
+    # Rows without a route_id (sorted last) roll as their own group under a sentinel key.
+    # With sort=False the groups come out in row order, so the result is assigned by position
+    route_key = df_clean['route_id'].astype(object).where(df_clean['route_id'].notna(), '<missing route>')
+    rolling = df_clean.groupby(route_key, sort=False).rolling('7D', on='ride_ts', min_periods=1)['total_passengers'].mean()
+    df_clean['rolling_avg_7d'] = rolling.to_numpy()
     
+    print(f"[ETL] Cleaned {len(df_clean)} records (removed {len(df) - len(df_clean)} outliers "
+          f"in {record['groups_with_removals']} of {record['groups']} {outlier_method} groups)")
+    for group in summarize_removals(outlier_report, top=3):
+        key = ', '.join(f"{name}={group[name]}" for name in outlier_keys) or 'all rows'
+        print(f"[ETL]   {key}: removed {group['removed']} of {group['rows']}")
+    if record['rows_unchecked']:
+        print(f"[ETL] {record['rows_unchecked']} rows left unchecked (no grouping had "
+              f"{min_group_size} values to bound them)")
+    
+    if return_report:
+        return df_clean, outlier_report
     return df_clean
 
 def classify_time_period(hour):
-    """Classifies hour into time periods"""
-    if 6 <= hour < 9:
-        return 'Morning Rush'
-    elif 9 <= hour < 16:
-        return 'Midday'
-    elif 16 <= hour < 19:
-        return 'Evening Rush'
-    elif 19 <= hour < 23:
-        return 'Evening'
-    else:
-        return 'Overnight'
+    """Classifies a single hour into time periods (see ETL_HOURLY_PERIODS)"""
+    return ETL_HOURLY_PERIODS.label_for(hour)
 
+@traced('etl.calculate_performance_metrics')
 def calculate_performance_metrics(df):
     """
     Calculates key performance indicators for transit routes
@@ -100,38 +159,278 @@ def calculate_performance_metrics(df):
     
     return metrics
 
-def generate_ridership_forecast(df, periods=7):
+# Columns of the performance_metrics table filled from trip records
+PERFORMANCE_METRIC_COLUMNS = [
+    'route_id', 'metric_date', 'scheduled_trips', 'completed_trips', 'on_time_trips',
+    'delayed_trips', 'cancelled_trips', 'avg_delay_minutes', 'on_time_performance'
+]
+
+# Trip columns needed for the daily rollup
+PERFORMANCE_TRIP_COLUMNS = ['route_id', 'trip_date', 'scheduled_arrival', 'actual_arrival']
+
+def _daily_trip_sums(trips):
+    """Per (route, day) additive counts; partial sums from chunks merge by adding"""
+    delay_seconds = (
+        pd.to_datetime(trips['actual_arrival']) - pd.to_datetime(trips['scheduled_arrival'])
+    ).dt.total_seconds()
+    completed = delay_seconds.notna()
+    
+    work = pd.DataFrame({
+        'route_id': trips['route_id'].astype(str),
+        'metric_date': pd.to_datetime(trips['trip_date']).dt.normalize(),
+        'scheduled_trips': 1,
+        'completed_trips': completed.astype(np.int64),
+        'on_time_trips': (delay_seconds <= 5 * 60).astype(np.int64),
+        'delay_seconds': delay_seconds.fillna(0),
+        'delay_count': completed.astype(np.int64)
+    })
+    return work.groupby(['route_id', 'metric_date'], sort=True).sum().reset_index()
+
+def _finalize_daily_metrics(sums):
+    """Derive delayed/cancelled counts, average delay and OTP from summed counts"""
+    metrics = sums[['route_id', 'scheduled_trips', 'completed_trips', 'on_time_trips']].copy()
+    metrics.insert(1, 'metric_date', sums['metric_date'].dt.strftime('%Y-%m-%d'))
+    metrics['delayed_trips'] = sums['completed_trips'] - sums['on_time_trips']
+    metrics['cancelled_trips'] = sums['scheduled_trips'] - sums['completed_trips']
+    metrics['avg_delay_minutes'] = (sums['delay_seconds'] / sums['delay_count'] / 60).round(2)
+    metrics['on_time_performance'] = (sums['on_time_trips'] / sums['completed_trips'] * 100).round(2)
+    return metrics[PERFORMANCE_METRIC_COLUMNS]
+
+@traced('etl.compute_daily_performance_metrics')
+def compute_daily_performance_metrics(trips):
+    """
+    Daily per-route performance rollup from trip-level records
+    
+    One grouped pass over the trips. A trip without an actual arrival is
+    counted as cancelled; completed trips are on time when they arrive no
+    more than 5 minutes late (the analysis module's definition).
+    
+    Args:
+        trips: Trip records with route_id, trip_date, scheduled_arrival, actual_arrival
+    
+    Returns:
+        Rows in the performance_metrics layout (metric_date as YYYY-MM-DD)
+    """
+    print("[ETL] Computing daily performance metrics from trip records...")
+    return _finalize_daily_metrics(_daily_trip_sums(trips))
+
+def upsert_performance_metrics(conn, metrics, start_date=None, end_date=None, batch_size=5000,
+                               prune=True):
+    """
+    Bulk upsert daily metrics into performance_metrics
+    
+    Rows are staged in a temporary table in batches, then merged with a
+    single INSERT ... ON CONFLICT(route_id, metric_date) DO UPDATE. With
+    prune, metrics is taken as the complete result for the covered range:
+    existing rows in that range with no counterpart in metrics are deleted,
+    so re-running a range is idempotent. A missing bound defaults to the
+    first/last metric_date in metrics; when that leaves the range undefined
+    (empty metrics), nothing is pruned.
+    
+    Args:
+        conn: sqlite3 connection with the performance_metrics table
+        metrics: Output of compute_daily_performance_metrics
+        start_date: First day covered by this run (YYYY-MM-DD, None = first metric_date)
+        end_date: Last day covered by this run (YYYY-MM-DD, None = last metric_date)
+        batch_size: Rows per executemany() call
+        prune: Delete stale rows in the covered range (False for a plain upsert)
+    
+    Returns:
+        Number of rows upserted
+    """
+    columns = ', '.join(PERFORMANCE_METRIC_COLUMNS)
+    updates = ', '.join(f'{col} = excluded.{col}' for col in PERFORMANCE_METRIC_COLUMNS[2:])
+    
+    rows = metrics[PERFORMANCE_METRIC_COLUMNS].astype(object)
+    rows = rows.where(rows.notna(), None)
+    records = list(rows.itertuples(index=False, name=None))
+    
+    with conn:
+        conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS staged_performance_metrics AS "
+                     f"SELECT {columns} FROM performance_metrics WHERE 0")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS temp.idx_staged_performance_key "
+                     "ON staged_performance_metrics(route_id, metric_date)")
+        conn.execute("DELETE FROM staged_performance_metrics")
+        placeholders = ', '.join('?' * len(PERFORMANCE_METRIC_COLUMNS))
+        for start in range(0, len(records), batch_size):
+            conn.executemany(
+                f"INSERT INTO staged_performance_metrics ({columns}) VALUES ({placeholders})",
+                records[start:start + batch_size]
+            )
+        
+        # WHERE true keeps SQLite from parsing ON CONFLICT as a join constraint
+        conn.execute(f"""
+            INSERT INTO performance_metrics ({columns})
+            SELECT {columns} FROM staged_performance_metrics WHERE true
+            ON CONFLICT (route_id, metric_date) DO UPDATE SET {updates}
+        """)
+        
+        if len(metrics):
+            start_date = start_date or metrics['metric_date'].min()
+            end_date = end_date or metrics['metric_date'].max()
+        if prune and start_date and end_date:
+            conn.execute("""
+                DELETE FROM performance_metrics
+                WHERE metric_date >= ? AND metric_date <= ?
+                  AND NOT EXISTS (
+                      SELECT 1 FROM staged_performance_metrics s
+                      WHERE s.route_id = performance_metrics.route_id
+                        AND s.metric_date = performance_metrics.metric_date
+                  )
+            """, (pd.Timestamp(start_date).strftime('%Y-%m-%d'), pd.Timestamp(end_date).strftime('%Y-%m-%d')))
+        conn.execute("DELETE FROM staged_performance_metrics")
+    
+    return len(records)
+
+@traced('etl.materialize_performance_metrics')
+def materialize_performance_metrics(db_path, trips_source, start_date=None, end_date=None,
+                                    chunksize=500_000, batch_size=5000):
+    """
+    Recompute performance_metrics for a date range from trip records
+    
+    Trips are read in chunks (only the needed columns), reduced to per
+    (route, day) sums and merged, so memory is bounded by the rollup size.
+    The source is authoritative for the range: stored route-days in it that
+    the trips no longer produce are removed. An omitted bound stops at the
+    first/last trip date read, so an unbounded run never prunes days outside
+    the source.
+    
+    Args:
+        db_path: SQLite database (schema applied if missing)
+        trips_source: Trip CSV path or DataFrame
+        start_date: First trip date to materialize (default: first in source)
+        end_date: Last trip date to materialize (default: last in source)
+        chunksize: CSV rows per chunk
+        batch_size: Rows per upsert batch
+    
+    Returns:
+        Summary with trips read, rows upserted and load time
+    """
+    print(f"[ETL] Materializing performance metrics into {db_path}...")
+    if isinstance(trips_source, str):
+        chunks = pd.read_csv(trips_source, usecols=PERFORMANCE_TRIP_COLUMNS, chunksize=chunksize)
+    else:
+        chunks = [trips_source]
+    
+    partial_sums = []
+    trips_read = 0
+    for chunk in chunks:
+        trip_dates = pd.to_datetime(chunk['trip_date'])
+        mask = pd.Series(True, index=chunk.index)
+        if start_date:
+            mask &= trip_dates >= pd.Timestamp(start_date)
+        if end_date:
+            mask &= trip_dates <= pd.Timestamp(end_date)
+        chunk = chunk[mask]
+        trips_read += len(chunk)
+        if len(chunk):
+            partial_sums.append(_daily_trip_sums(chunk))
+    
+    if partial_sums:
+        sums = pd.concat(partial_sums, ignore_index=True).groupby(
+            ['route_id', 'metric_date'], sort=True
+        ).sum().reset_index()
+        metrics = _finalize_daily_metrics(sums)
+    else:
+        metrics = pd.DataFrame(columns=PERFORMANCE_METRIC_COLUMNS)
+    
+    db = TripDatabase(db_path)
+    try:
+        load_start = time.perf_counter()
+        rows = upsert_performance_metrics(db.conn, metrics, start_date, end_date, batch_size)
+        load_seconds = time.perf_counter() - load_start
+    finally:
+        db.close()
+    
+    print(f"[ETL] Upserted {rows} route-day rows from {trips_read} trips")
+    return {
+        'trips_read': trips_read,
+        'rows_upserted': rows,
+        'load_seconds': round(load_seconds, 6),
+        'rows_per_s': round(rows / load_seconds, 1) if load_seconds else None
+    }
+
+@traced('etl.load_gtfs_schedule')
+def load_gtfs_schedule(db_path, feed_path, chunksize=1_000_000, batch_size=50_000):
+    """
+    Loads a GTFS feed into the routes, stops, trips, stop_times and calendar tables
+    
+    stop_times.txt is parsed in chunks straight from the archive; the
+    previous schedule in the database is replaced.
+    
+    Args:
+        db_path: SQLite database (schema applied if missing)
+        feed_path: GTFS .zip (or unpacked directory)
+        chunksize: stop_times.txt rows parsed per chunk
+        batch_size: Rows per insert batch
+    
+    Returns:
+        The GTFSFeed read, and rows loaded per table with timings
+    """
+    print(f"[ETL] Loading GTFS schedule {feed_path} into {db_path}...")
+    read_start = time.perf_counter()
+    feed = read_gtfs_feed(feed_path, chunksize=chunksize)
+    read_seconds = time.perf_counter() - read_start
+    
+    db = TripDatabase(db_path)
+    try:
+        load_start = time.perf_counter()
+        counts = load_gtfs_feed(db.conn, feed, batch_size=batch_size)
+        load_seconds = time.perf_counter() - load_start
+    finally:
+        db.close()
+    
+    print(f"[ETL] Loaded {counts['stop_times']:,} stop times for {counts['trips']:,} trips")
+    return feed, {
+        'rows': counts,
+        'read_seconds': round(read_seconds, 6),
+        'load_seconds': round(load_seconds, 6)
+    }
+
+@traced('etl.generate_ridership_forecast')
+def generate_ridership_forecast(df, periods=7, seed=None, series_keys=('route_id',), window=7):
     """
     Simple time series forecasting for ridership
     Uses moving average for demonstration
+    
+    Every series is forecast at once: trailing means come from one grouped
+    pass and the (series x horizon) forecast matrix is built with array ops.
+    
+    Args:
+        df: Ridership rows with ride_date, total_passengers and the series keys
+        periods: Forecast horizon in days
+        seed: Seed for the ±10% variation (same seed -> same forecast)
+        series_keys: Columns identifying a series, e.g. ('route_id', 'stop_id')
+        window: Number of trailing days averaged per series
     """
     print(f"[ETL] Generating {periods}-day ridership forecast...")
+    keys = list(series_keys)
     
-    # Calculate daily totals by route
-    daily_ridership = df.groupby(['route_id', 'ride_date'])['total_passengers'].sum().reset_index()
+    # Calculate daily totals by series (sorted by series, then date)
+    daily_ridership = df.groupby(keys + ['ride_date'], observed=True)['total_passengers'].sum().reset_index()
+    daily_ridership['ride_date'] = pd.to_datetime(daily_ridership['ride_date'])
     
-    forecasts = []
+    # Trailing moving average and last observed date for every series in one pass
+    trailing = daily_ridership.groupby(keys, observed=True, sort=True).tail(window)
+    series = trailing.groupby(keys, observed=True, sort=True).agg(
+        recent_avg=('total_passengers', 'mean'),
+        last_date=('ride_date', 'max')
+    ).reset_index()
     
-    for route_id in daily_ridership['route_id'].unique():
-        route_data = daily_ridership[daily_ridership['route_id'] == route_id]
-        
-        # Calculate 7-day moving average
-        recent_avg = route_data.tail(7)['total_passengers'].mean()
-        
-        # Simple forecast (in production, use ARIMA, Prophet, or ML models)
-        for i in range(1, periods + 1):
-            forecast_date = route_data['ride_date'].max() + timedelta(days=i)
-            # Add random variation (±10%)
-            forecast_value = recent_avg * (1 + np.random.uniform(-0.1, 0.1))
-            
-            forecasts.append({
-                'route_id': route_id,
-                'forecast_date': forecast_date,
-                'predicted_passengers': int(forecast_value)
-            })
-    
-    return pd.DataFrame(forecasts)
+    # Simple forecast (in production, use ARIMA, Prophet, or ML models)
+    rng = np.random.default_rng(seed)
+    horizon = np.arange(1, periods + 1)
+    variation = rng.uniform(-0.1, 0.1, size=(len(series), periods))
+    values = series['recent_avg'].to_numpy()[:, None] * (1 + variation)
+    dates = series['last_date'].to_numpy()[:, None] + (horizon * np.timedelta64(1, 'D'))
+    
+    forecast = series[keys].loc[series.index.repeat(periods)].reset_index(drop=True)
+    forecast['forecast_date'] = dates.ravel()
+    forecast['predicted_passengers'] = values.ravel().astype(np.int64)
+    
+    return forecast
 
+@traced('etl.export_analysis_results')
 def export_analysis_results(metrics_df, forecast_df):
     """
     Exports processed data for dashboard consumption
@@ -184,12 +483,13 @@ if __name__ == "__main__":
     })
     
     # Execute ETL pipeline
-    routes_df = extract_gtfs_data()
+    routes_df = extract_gtfs_data(os.environ.get(GTFS_PATH_ENV))
     clean_ridership = transform_ridership_data(ridership_sample)
     metrics = calculate_performance_metrics(performance_sample)
-    forecasts = generate_ridership_forecast(clean_ridership)
+    forecasts = generate_ridership_forecast(clean_ridership, seed=42)
     summary = export_analysis_results(metrics, forecasts)
     
     print("\n[ETL] Pipeline completed successfully!")
     print(f"[ETL] Processed {len(clean_ridership)} ridership records")
     print(f"[ETL] Generated {len(forecasts)} forecast data points\n")
+    print("\n".join(active_tracer().format_summary()))
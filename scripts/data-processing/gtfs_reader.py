@@ -0,0 +1,564 @@
+"""
+Transit GTFS Feed Reader
+Reads a GTFS archive into dictionary-encoded frames and bulk-loads it into the schema tables
+"""
+
+import contextlib
+import os
+import time
+import zipfile
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+# Seconds value stored for a blank arrival/departure (non-timepoint stops)
+NO_TIME = -1
+
+# GTFS route_type codes -> the names used in the routes table
+ROUTE_TYPE_NAMES = {
+    0: 'Streetcar', 1: 'Subway', 2: 'Rail', 3: 'Bus', 4: 'Ferry', 5: 'Cable Tram',
+    6: 'Aerial Lift', 7: 'Funicular', 11: 'Trolleybus', 12: 'Monorail'
+}
+
+# GTFS location_type codes -> stops.location_type
+LOCATION_TYPE_NAMES = {0: 'stop', 1: 'station', 2: 'entrance', 3: 'node', 4: 'boarding_area'}
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# Per file: column -> (dtype, default when the optional column is absent).
+# A default of None marks a required column.
+GTFS_COLUMNS = {
+    'routes.txt': {
+        'route_id': (str, None), 'route_short_name': (str, ''), 'route_long_name': (str, ''),
+        'route_type': ('Int64', None), 'route_color': (str, np.nan)
+    },
+    'stops.txt': {
+        'stop_id': (str, None), 'stop_name': (str, ''), 'stop_lat': ('float64', np.nan),
+        'stop_lon': ('float64', np.nan), 'location_type': ('Int64', 0),
+        'parent_station': (str, np.nan), 'wheelchair_boarding': ('Int64', 0)
+    },
+    'trips.txt': {
+        'route_id': (str, None), 'service_id': (str, None), 'trip_id': (str, None),
+        'trip_headsign': (str, np.nan), 'direction_id': ('Int64', pd.NA),
+        'block_id': (str, np.nan), 'wheelchair_accessible': ('Int64', 0)
+    },
+    'calendar.txt': {
+        'service_id': (str, None), **{day: ('int8', None) for day in WEEKDAYS},
+        'start_date': (str, None), 'end_date': (str, None)
+    },
+    'calendar_dates.txt': {
+        'service_id': (str, None), 'date': (str, None), 'exception_type': ('int8', None)
+    }
+}
+
+STOP_TIMES_COLUMNS = ['trip_id', 'arrival_time', 'departure_time', 'stop_id', 'stop_sequence',
+                      'pickup_type', 'drop_off_type']
+
+
+def parse_gtfs_times(values) -> np.ndarray:
+    """
+    GTFS H:MM:SS / HH:MM:SS strings to int32 seconds after the service day start
+
+    Hours may exceed 23 (trips running past midnight). The strings are
+    viewed as a fixed-width byte matrix, right-aligned, and the digits are
+    read column by column, so there is no per-value Python work. Blank
+    values (and NaN / None) become NO_TIME.
+
+    Raises:
+        ValueError: A value is not a valid GTFS time
+    """
+    text = np.asarray(values, dtype=object)
+    raw = text.astype('S')
+    if raw.dtype.itemsize < 8:
+        raw = raw.astype('S8')
+    if (raw.view(np.uint8) == ord(' ')).any():
+        raw = np.char.strip(raw).astype(raw.dtype)
+    width = raw.dtype.itemsize
+    chars = raw.view(np.uint8).reshape(len(raw), width)
+    length = (chars != 0).sum(axis=1)
+    blank = (length == 0) | (raw == b'nan') | (raw == b'None')
+
+    # Right-align so seconds, minutes and colons sit in fixed columns
+    aligned = chars
+    if not (length == width).all():
+        aligned = np.full_like(chars, ord('0'))
+        for size in np.unique(length):
+            rows = np.flatnonzero(length == size)
+            aligned[rows, width - size:] = chars[rows, :size]
+    digits = aligned.astype(np.int32) - ord('0')
+
+    def digit(column):
+        return digits[:, width - column]
+
+    seconds = digit(2) * 10 + digit(1)
+    minutes = digit(5) * 10 + digit(4)
+    hours = np.zeros(len(raw), dtype=np.int32)
+    valid = (length >= 7) & (digit(3) == ord(':') - ord('0')) & (digit(6) == ord(':') - ord('0'))
+    for column in range(width, 6, -1):
+        valid &= (digit(column) >= 0) & (digit(column) <= 9)
+        hours = hours * 10 + digit(column)
+    for column in (1, 2, 4, 5):
+        valid &= (digit(column) >= 0) & (digit(column) <= 9)
+    valid &= (minutes < 60) & (seconds < 60)
+
+    if not (valid | blank).all():
+        bad = text[np.flatnonzero(~(valid | blank))[:5]]
+        raise ValueError(f"Invalid GTFS time value(s): {list(bad)}")
+
+    return np.where(blank, NO_TIME, hours * 3600 + minutes * 60 + seconds).astype(np.int32)
+
+
+def format_gtfs_times(seconds: np.ndarray) -> List[Optional[str]]:
+    """int seconds to HH:MM:SS (hours past 23 kept), NO_TIME to None"""
+    seconds = np.asarray(seconds, dtype=np.int64)
+    blank = seconds == NO_TIME
+    clean = np.where(blank, 0, seconds)
+    hours, rest = np.divmod(clean, 3600)
+    minutes, secs = np.divmod(rest, 60)
+    hour_width = max(2, len(str(int(hours.max())))) if len(hours) else 2
+
+    chars = np.empty((len(seconds), hour_width + 6), dtype=np.uint8)
+    for i in range(hour_width):
+        chars[:, i] = hours // 10 ** (hour_width - 1 - i) % 10 + ord('0')
+    chars[:, hour_width] = chars[:, hour_width + 3] = ord(':')
+    chars[:, hour_width + 1], chars[:, hour_width + 2] = minutes // 10 + ord('0'), minutes % 10 + ord('0')
+    chars[:, hour_width + 4], chars[:, hour_width + 5] = secs // 10 + ord('0'), secs % 10 + ord('0')
+
+    text = chars.view(f'S{hour_width + 6}').ravel().astype(str).astype(object)
+    text[blank] = None
+    return text.tolist()
+
+
+class GTFSFeed:
+    """
+    A GTFS feed held as compact, dictionary-encoded frames
+
+    routes, stops, trips, calendar and calendar_dates are the (small) GTFS
+    tables with ids as strings. stop_times has one row per scheduled stop
+    event: trip_id and stop_id are categoricals over trips / stops, arrival
+    and departure are int32 seconds after the service day start (NO_TIME
+    when blank) and the remaining fields are small integers, which keeps
+    it near 20 bytes per row.
+    """
+
+    def __init__(self, routes: pd.DataFrame, stops: pd.DataFrame, trips: pd.DataFrame,
+                 stop_times: pd.DataFrame, calendar: Optional[pd.DataFrame] = None,
+                 calendar_dates: Optional[pd.DataFrame] = None, source: str = None):
+        self.routes = routes
+        self.stops = stops
+        self.trips = trips
+        self.stop_times = stop_times
+        self.calendar = calendar
+        self.calendar_dates = calendar_dates
+        self.source = source
+
+    def tables(self) -> Dict[str, Optional[pd.DataFrame]]:
+        return {
+            'routes': self.routes, 'stops': self.stops, 'trips': self.trips,
+            'stop_times': self.stop_times, 'calendar': self.calendar,
+            'calendar_dates': self.calendar_dates
+        }
+
+    def summary(self) -> Dict:
+        """Row counts and in-memory size per table"""
+        return {
+            name: {'rows': len(table), 'memory_mb': round(table.memory_usage(deep=True).sum() / 1e6, 2)}
+            for name, table in self.tables().items() if table is not None
+        }
+
+
+def _member_paths(source: str) -> Dict[str, str]:
+    """GTFS file name -> path inside the archive (or directory); feeds are sometimes nested"""
+    if os.path.isdir(source):
+        names = [os.path.relpath(os.path.join(root, f), source)
+                 for root, _, files in os.walk(source) for f in files]
+    else:
+        with zipfile.ZipFile(source) as archive:
+            names = archive.namelist()
+    members = {}
+    for name in sorted(names, key=len):
+        members.setdefault(os.path.basename(name), name)
+    return members
+
+
+@contextlib.contextmanager
+def _open_member(source: str, member: str):
+    """Binary stream of one feed file, read straight from the archive"""
+    if os.path.isdir(source):
+        with open(os.path.join(source, member), 'rb') as f:
+            yield f
+    else:
+        with zipfile.ZipFile(source) as archive, archive.open(member) as f:
+            yield f
+
+
+def _read_table(source: str, members: Dict[str, str], name: str) -> Optional[pd.DataFrame]:
+    """Read one small GTFS file with the GTFS_COLUMNS types (None if the file is absent)"""
+    if name not in members:
+        return None
+    spec = GTFS_COLUMNS[name]
+    with _open_member(source, members[name]) as f:
+        header = pd.read_csv(f, nrows=0, encoding='utf-8-sig', skipinitialspace=True).columns
+    missing = [col for col, (_, default) in spec.items() if default is None and col not in header]
+    if missing:
+        raise ValueError(f"{name} is missing required column(s): {', '.join(missing)}")
+
+    present = [col for col in spec if col in header]
+    with _open_member(source, members[name]) as f:
+        table = pd.read_csv(f, encoding='utf-8-sig', skipinitialspace=True, usecols=present,
+                            dtype={col: spec[col][0] for col in present})
+    for col, (dtype, default) in spec.items():
+        if col not in table.columns:
+            table[col] = pd.Series(default, index=table.index, dtype=dtype if dtype is not str else object)
+    return table[list(spec)]
+
+
+def _read_stop_times(source: str, member: str, trip_ids: pd.Index, stop_ids: pd.Index,
+                     chunksize: int) -> pd.DataFrame:
+    """Stream stop_times.txt in chunks into compact column arrays"""
+    trip_dtype = pd.CategoricalDtype(trip_ids)
+    stop_dtype = pd.CategoricalDtype(stop_ids)
+    with _open_member(source, member) as f:
+        header = pd.read_csv(f, nrows=0, encoding='utf-8-sig', skipinitialspace=True).columns
+    required = STOP_TIMES_COLUMNS[:5]
+    missing = [col for col in required if col not in header]
+    if missing:
+        raise ValueError(f"stop_times.txt is missing required column(s): {', '.join(missing)}")
+    present = [col for col in STOP_TIMES_COLUMNS if col in header]
+
+    parts = {col: [] for col in STOP_TIMES_COLUMNS}
+    dropped = 0
+    with _open_member(source, member) as f:
+        # Blank times stay '' (parse_gtfs_times maps them to NO_TIME) instead
+        # of going through NaN detection on every string
+        reader = pd.read_csv(
+            f, encoding='utf-8-sig', skipinitialspace=True, chunksize=chunksize,
+            usecols=present, keep_default_na=False,
+            na_values={'pickup_type': [''], 'drop_off_type': ['']},
+            dtype={'trip_id': trip_dtype, 'stop_id': stop_dtype, 'arrival_time': object,
+                   'departure_time': object, 'stop_sequence': np.int64,
+                   'pickup_type': 'float32', 'drop_off_type': 'float32'}
+        )
+        for chunk in reader:
+            trip_codes = chunk['trip_id'].cat.codes.to_numpy()
+            stop_codes = chunk['stop_id'].cat.codes.to_numpy()
+            # Rows pointing at trips/stops the feed does not define
+            known = (trip_codes >= 0) & (stop_codes >= 0)
+            dropped += int((~known).sum())
+            parts['trip_id'].append(trip_codes[known].astype(np.int32))
+            parts['stop_id'].append(stop_codes[known].astype(np.int32))
+            parts['arrival_time'].append(parse_gtfs_times(chunk['arrival_time'].to_numpy()[known]))
+            parts['departure_time'].append(parse_gtfs_times(chunk['departure_time'].to_numpy()[known]))
+            parts['stop_sequence'].append(chunk['stop_sequence'].to_numpy()[known].astype(np.int32))
+            for col in ('pickup_type', 'drop_off_type'):
+                values = chunk[col].to_numpy()[known] if col in chunk else np.zeros(known.sum())
+                parts[col].append(np.nan_to_num(values).astype(np.int8))
+
+    if dropped:
+        print(f"[ETL] Skipped {dropped:,} stop_times rows with unknown trip_id or stop_id")
+    columns = {col: np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int32)
+               for col, arrays in parts.items()}
+    return pd.DataFrame({
+        'trip_id': pd.Categorical.from_codes(columns['trip_id'], dtype=trip_dtype),
+        'arrival_time': columns['arrival_time'],
+        'departure_time': columns['departure_time'],
+        'stop_id': pd.Categorical.from_codes(columns['stop_id'], dtype=stop_dtype),
+        'stop_sequence': columns['stop_sequence'],
+        'pickup_type': columns['pickup_type'].astype(np.int8),
+        'drop_off_type': columns['drop_off_type'].astype(np.int8)
+    })
+
+
+def _fill_between(values: np.ndarray, trips: np.ndarray) -> np.ndarray:
+    """Linearly fill NO_TIME entries from the nearest known times of the same trip"""
+    index = np.arange(len(values))
+    known = values != NO_TIME
+    before = np.maximum.accumulate(np.where(known, index, -1))
+    after = np.minimum.accumulate(np.where(known, index, len(values))[::-1])[::-1]
+    fillable = ~known & (before >= 0) & (after < len(values))
+    fillable[fillable] &= (trips[before[fillable]] == trips[fillable]) & (trips[after[fillable]] == trips[fillable])
+
+    filled = values.copy()
+    lo, hi = before[fillable], after[fillable]
+    share = (index[fillable] - lo) / (hi - lo)
+    filled[fillable] = np.round(values[lo] + share * (values[hi] - values[lo])).astype(np.int32)
+    return filled
+
+
+def interpolate_stop_times(stop_times: pd.DataFrame) -> pd.DataFrame:
+    """
+    Order stop times by (trip, stop_sequence) and estimate blank times
+
+    Blank (non-timepoint) arrivals and departures are interpolated by stop
+    order between the trip's neighbouring timed stops, as the GTFS
+    reference suggests when no shape distances are given. A `timepoint`
+    column (1 = time from the feed) records which times are estimates.
+    """
+    trip_codes = stop_times['trip_id'].cat.codes.to_numpy()
+    sequence = stop_times['stop_sequence'].to_numpy()
+    ordered = np.all((np.diff(trip_codes) > 0) | ((np.diff(trip_codes) == 0) & (np.diff(sequence) > 0)))
+    if not ordered:
+        stop_times = stop_times.take(np.lexsort((sequence, trip_codes))).reset_index(drop=True)
+        trip_codes = stop_times['trip_id'].cat.codes.to_numpy()
+
+    timed = stop_times['arrival_time'].to_numpy() != NO_TIME
+    stop_times = stop_times.assign(
+        arrival_time=_fill_between(stop_times['arrival_time'].to_numpy(), trip_codes),
+        departure_time=_fill_between(stop_times['departure_time'].to_numpy(), trip_codes),
+        timepoint=timed.astype(np.int8)
+    )
+    return stop_times
+
+
+def read_gtfs_feed(source: str, chunksize: int = 1_000_000, interpolate: bool = True) -> GTFSFeed:
+    """
+    Read a GTFS feed from a zip archive or an unpacked directory
+
+    Args:
+        source: Path to the .zip (or a directory with the .txt files)
+        chunksize: stop_times.txt rows parsed per chunk
+        interpolate: Order stop times by trip and fill blank times
+            (see interpolate_stop_times)
+
+    Returns:
+        GTFSFeed with routes, stops, trips, calendar(_dates) and stop_times
+    """
+    start = time.perf_counter()
+    members = _member_paths(source)
+    missing = [name for name in ('routes.txt', 'stops.txt', 'trips.txt', 'stop_times.txt')
+               if name not in members]
+    if missing:
+        raise ValueError(f"{source} is not a complete GTFS feed (missing {', '.join(missing)})")
+    if 'calendar.txt' not in members and 'calendar_dates.txt' not in members:
+        raise ValueError(f"{source} has neither calendar.txt nor calendar_dates.txt")
+
+    routes = _read_table(source, members, 'routes.txt')
+    stops = _read_table(source, members, 'stops.txt')
+    trips = _read_table(source, members, 'trips.txt')
+    calendar = _read_table(source, members, 'calendar.txt')
+    calendar_dates = _read_table(source, members, 'calendar_dates.txt')
+    if calendar is not None:
+        for col in ('start_date', 'end_date'):
+            calendar[col] = pd.to_datetime(calendar[col], format='%Y%m%d')
+    if calendar_dates is not None:
+        calendar_dates['date'] = pd.to_datetime(calendar_dates['date'], format='%Y%m%d')
+
+    # Ids are dictionary-encoded; repeated route/service ids on trips too
+    trips['route_id'] = pd.Categorical(trips['route_id'], categories=routes['route_id'])
+    trips['service_id'] = trips['service_id'].astype('category')
+    stop_times = _read_stop_times(source, members['stop_times.txt'], pd.Index(trips['trip_id']),
+                                  pd.Index(stops['stop_id']), chunksize)
+    if interpolate:
+        stop_times = interpolate_stop_times(stop_times)
+
+    feed = GTFSFeed(routes, stops, trips, stop_times, calendar, calendar_dates, source)
+    print(f"[ETL] Read GTFS feed {source}: {len(routes):,} routes, {len(stops):,} stops, "
+          f"{len(trips):,} trips, {len(stop_times):,} stop times in {time.perf_counter() - start:.2f}s")
+    return feed
+
+
+def trip_spans(feed: GTFSFeed) -> pd.DataFrame:
+    """
+    Scheduled revenue span of every trip: first departure to last arrival
+
+    Computed with one ordering of stop_times (skipped when the feed was
+    interpolated, which already orders it by trip) and two reduceat passes.
+    Blank times are ignored; trips with fewer than two timed stops get NaN.
+
+    Returns:
+        trip_id, route_id, service_id, start_seconds, revenue_seconds
+    """
+    stop_times = feed.stop_times
+    codes = stop_times['trip_id'].cat.codes.to_numpy()
+    departure = stop_times['departure_time'].to_numpy()
+    arrival = stop_times['arrival_time'].to_numpy()
+    if len(codes) and np.any(np.diff(codes) < 0):
+        order = np.argsort(codes, kind='stable')
+        codes, departure, arrival = codes[order], departure[order], arrival[order]
+
+    start = np.full(len(feed.trips), np.nan)
+    span = np.full(len(feed.trips), np.nan)
+    if len(codes):
+        first = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        trips = codes[first]
+        timed = departure != NO_TIME
+        first_departure = np.minimum.reduceat(np.where(timed, departure, np.iinfo(np.int32).max), first)
+        last_arrival = np.maximum.reduceat(np.where(arrival != NO_TIME, arrival, NO_TIME), first)
+        timed_stops = np.add.reduceat(timed.astype(np.int64), first)
+        valid = (timed_stops >= 2) & (last_arrival >= first_departure)
+        start[trips[valid]] = first_departure[valid]
+        span[trips[valid]] = last_arrival[valid] - first_departure[valid]
+
+    return pd.DataFrame({
+        'trip_id': feed.trips['trip_id'].to_numpy(),
+        'route_id': feed.trips['route_id'].to_numpy(),
+        'service_id': feed.trips['service_id'].to_numpy(),
+        'start_seconds': start,
+        'revenue_seconds': span
+    })
+
+
+def service_day_counts(feed: GTFSFeed, start_date: str, end_date: str) -> pd.Series:
+    """
+    Days each service_id runs between two dates (inclusive)
+
+    calendar.txt weekday patterns are expanded over the range, then
+    calendar_dates.txt additions and removals are applied.
+    """
+    days = pd.date_range(start_date, end_date, freq='D')
+    active = pd.DataFrame(columns=['service_id', 'date'])
+    if feed.calendar is not None and len(days):
+        calendar = feed.calendar
+        runs = calendar[WEEKDAYS].to_numpy()[:, days.dayofweek] == 1
+        runs &= (days.to_numpy() >= calendar['start_date'].to_numpy()[:, None])
+        runs &= (days.to_numpy() <= calendar['end_date'].to_numpy()[:, None])
+        service, day = np.nonzero(runs)
+        active = pd.DataFrame({'service_id': calendar['service_id'].to_numpy()[service],
+                               'date': days[day]})
+    if feed.calendar_dates is not None and len(days):
+        exceptions = feed.calendar_dates[feed.calendar_dates['date'].between(days[0], days[-1])]
+        removed = exceptions.loc[exceptions['exception_type'] == 2, ['service_id', 'date']]
+        added = exceptions.loc[exceptions['exception_type'] == 1, ['service_id', 'date']]
+        keep = ~pd.MultiIndex.from_frame(active).isin(pd.MultiIndex.from_frame(removed))
+        active = pd.concat([active[keep], added]).drop_duplicates()
+    return active.groupby('service_id').size()
+
+
+def scheduled_revenue_hours(feed: GTFSFeed, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Scheduled revenue hours per route over a date range, from stop_times spans
+
+    Each trip's span (see trip_spans) is counted once for every day its
+    service runs in the range (see service_day_counts).
+
+    Returns:
+        route_id, scheduled_trips, revenue_hours (one row per route with service)
+    """
+    spans = trip_spans(feed)
+    spans['days'] = spans['service_id'].astype(str).map(
+        service_day_counts(feed, start_date, end_date)
+    ).fillna(0).astype(np.int64)
+    spans = spans[(spans['days'] > 0) & spans['revenue_seconds'].notna()]
+    routes = spans.assign(
+        revenue_seconds=spans['revenue_seconds'] * spans['days']
+    ).groupby('route_id', observed=True).agg(
+        scheduled_trips=('days', 'sum'),
+        revenue_seconds=('revenue_seconds', 'sum')
+    ).reset_index()
+    routes['route_id'] = routes['route_id'].astype(str)
+    routes['revenue_hours'] = routes['revenue_seconds'] / 3600
+    return routes[['route_id', 'scheduled_trips', 'revenue_hours']]
+
+
+def _none_for_missing(values: pd.Series) -> List:
+    """Column values as Python objects with NULL for NaN/NA"""
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def _stop_time_rows(stop_times: pd.DataFrame, start: int, stop: int) -> List[List]:
+    """Column lists for one insert batch (times formatted back to HH:MM:SS)"""
+    part = stop_times.iloc[start:stop]
+    return [
+        part['trip_id'].cat.categories.to_numpy()[part['trip_id'].cat.codes].tolist(),
+        format_gtfs_times(part['arrival_time'].to_numpy()),
+        format_gtfs_times(part['departure_time'].to_numpy()),
+        part['stop_id'].cat.categories.to_numpy()[part['stop_id'].cat.codes].tolist(),
+        part['stop_sequence'].tolist(), part['pickup_type'].tolist(), part['drop_off_type'].tolist()
+    ]
+
+
+def load_gtfs_feed(conn, feed: GTFSFeed, replace: bool = True, batch_size: int = 50_000) -> Dict[str, int]:
+    """
+    Bulk-load a feed into the routes, stops, trips, stop_times and calendar tables
+
+    Rows are built column-wise and inserted with batched executemany()
+    inside one transaction. stop_times rows are materialized one batch at a
+    time, and its indexes are dropped during the load and rebuilt once at
+    the end.
+
+    Args:
+        conn: sqlite3 connection with the schema applied (see TripDatabase)
+        feed: Feed from read_gtfs_feed
+        replace: Delete the previous schedule (all six tables) first
+        batch_size: Rows per executemany() call
+
+    Returns:
+        Rows inserted per table
+    """
+    routes = feed.routes
+    stops = feed.stops
+    stop_times = feed.stop_times
+    # The schema requires both times; blanks remain only if the feed was
+    # read with interpolate=False
+    untimed = (stop_times['arrival_time'] == NO_TIME) | (stop_times['departure_time'] == NO_TIME)
+    if untimed.any():
+        print(f"[ETL] Skipping {int(untimed.sum()):,} stop times without arrival/departure times")
+        stop_times = stop_times[~untimed]
+    # Stations inherit missing coordinates from their parent; nodes without
+    # any are not stored (stop_times cannot reference them)
+    for col in ('stop_lat', 'stop_lon'):
+        parent = stops['parent_station'].map(stops.set_index('stop_id')[col])
+        stops = stops.assign(**{col: stops[col].fillna(parent)})
+    stops = stops[stops['stop_lat'].notna() & stops['stop_lon'].notna()]
+
+    rows = {
+        'routes': (
+            ['route_id', 'route_short_name', 'route_long_name', 'route_type', 'route_color'],
+            [routes['route_id'].tolist(), routes['route_short_name'].fillna('').tolist(),
+             routes['route_long_name'].fillna('').tolist(),
+             [ROUTE_TYPE_NAMES.get(code, str(code)) for code in routes['route_type'].tolist()],
+             _none_for_missing(routes['route_color'])]
+        ),
+        'stops': (
+            ['stop_id', 'stop_name', 'stop_lat', 'stop_lon', 'location_type', 'parent_station',
+             'wheelchair_accessible'],
+            [stops['stop_id'].tolist(), stops['stop_name'].fillna('').tolist(),
+             stops['stop_lat'].tolist(), stops['stop_lon'].tolist(),
+             stops['location_type'].fillna(0).map(LOCATION_TYPE_NAMES).tolist(),
+             _none_for_missing(stops['parent_station']),
+             (stops['wheelchair_boarding'].fillna(0) == 1).tolist()]
+        ),
+        'trips': (
+            ['trip_id', 'route_id', 'service_id', 'trip_headsign', 'direction_id', 'block_id',
+             'wheelchair_accessible'],
+            [feed.trips['trip_id'].tolist(), feed.trips['route_id'].astype(object).tolist(),
+             feed.trips['service_id'].astype(object).tolist(), _none_for_missing(feed.trips['trip_headsign']),
+             _none_for_missing(feed.trips['direction_id']), _none_for_missing(feed.trips['block_id']),
+             (feed.trips['wheelchair_accessible'].fillna(0) == 1).tolist()]
+        ),
+    }
+    if feed.calendar is not None:
+        calendar = feed.calendar
+        rows['calendar'] = (
+            ['service_id'] + WEEKDAYS + ['start_date', 'end_date'],
+            [calendar['service_id'].tolist()] + [(calendar[day] == 1).tolist() for day in WEEKDAYS] +
+            [calendar['start_date'].dt.strftime('%Y-%m-%d').tolist(),
+             calendar['end_date'].dt.strftime('%Y-%m-%d').tolist()]
+        )
+    if feed.calendar_dates is not None:
+        dates = feed.calendar_dates
+        rows['calendar_dates'] = (
+            ['service_id', 'service_date', 'exception_type'],
+            [dates['service_id'].tolist(), dates['date'].dt.strftime('%Y-%m-%d').tolist(),
+             dates['exception_type'].tolist()]
+        )
+
+    counts = {}
+    with conn:
+        conn.execute('DROP INDEX IF EXISTS idx_stop_times_trip')
+        conn.execute('DROP INDEX IF EXISTS idx_stop_times_stop')
+        if replace:
+            for table in ('stop_times', 'trips', 'calendar_dates', 'calendar', 'stops', 'routes'):
+                conn.execute(f'DELETE FROM {table}')
+        for table, (columns, values) in rows.items():
+            sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+            conn.executemany(sql, zip(*values))
+            counts[table] = len(values[0])
+
+        sql = f"INSERT INTO stop_times ({', '.join(STOP_TIMES_COLUMNS)}) VALUES ({', '.join('?' * 7)})"
+        for start in range(0, len(stop_times), batch_size):
+            conn.executemany(sql, zip(*_stop_time_rows(stop_times, start, start + batch_size)))
+        counts['stop_times'] = len(stop_times)
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_stop_times_trip ON stop_times(trip_id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_stop_times_stop ON stop_times(stop_id)')
+    return counts
@@ -0,0 +1,11 @@
+"""
+Durham Region Transit Test Configuration
+Puts the analysis, data-processing and benchmark script directories on sys.path
+"""
+
+import os
+import sys
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for directory in ('analysis', 'data-processing', 'benchmarks'):
+    sys.path.insert(0, os.path.join(SCRIPTS_DIR, directory))
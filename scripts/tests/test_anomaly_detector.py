@@ -0,0 +1,63 @@
+"""
+Durham Region Transit Anomaly Detector Tests
+Checks streaming anomaly scores against a sequential Welford reference
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from predictive_model import OnlineAnomalyDetector, detect_service_anomalies, ANOMALY_COLUMNS
+
+
+@pytest.fixture
+def records():
+    """Large, low-variance delays in a handful of (route, hour of week) slots"""
+    rng = np.random.default_rng(7)
+    rows = 3000
+    delays = 1e8 + rng.normal(0, 1, rows)
+    delays[rng.choice(rows, 15, replace=False)] += 8
+    return pd.DataFrame({
+        'route_id': rng.choice(['R1', 'R2'], rows),
+        'scheduled_departure': pd.Timestamp('2024-01-01 07:00') + pd.to_timedelta(
+            rng.choice([0, 1], rows) * 7, unit='D'),
+        'delay_minutes': delays
+    })
+
+
+def reference_scores(records, min_history=8):
+    """Score each record against all earlier records of its slot, one at a time"""
+    state, scores = {}, np.full(len(records), np.nan)
+    for i, (route, x) in enumerate(zip(records['route_id'], records['delay_minutes'])):
+        n, mean, m2 = state.get(route, (0, 0.0, 0.0))
+        if n >= min_history:
+            scores[i] = abs(x - mean) / np.sqrt(m2 / (n - 1))
+        delta = x - mean
+        mean += delta / (n + 1)
+        state[route] = (n + 1, mean, m2 + delta * (x - mean))
+    return scores
+
+
+def test_scores_match_sequential_reference(records):
+    flagged = OnlineAnomalyDetector(metrics={'delay_minutes': 'Unusual Delay Pattern'}).update(records)
+    expected = reference_scores(records)
+    hits = np.flatnonzero(expected >= 3.0)
+    assert len(hits) > 0
+    assert flagged['record_index'].tolist() == hits.tolist()
+    np.testing.assert_allclose(flagged['deviation_score'], np.round(expected[hits], 2), atol=0.011)
+
+
+@pytest.mark.parametrize('chunksize', [1, 97, 1000])
+def test_chunked_stream_flags_same_records(records, chunksize):
+    metrics = {'delay_minutes': 'Unusual Delay Pattern'}
+    batch = detect_service_anomalies(records, OnlineAnomalyDetector(metrics=metrics), chunksize=len(records))
+    chunked = detect_service_anomalies(records, OnlineAnomalyDetector(metrics=metrics), chunksize=chunksize)
+    assert [(a['route_id'], a['date']) for a in chunked] == [(a['route_id'], a['date']) for a in batch]
+    np.testing.assert_allclose([a['deviation_score'] for a in chunked],
+                               [a['deviation_score'] for a in batch], atol=0.011)
+
+
+def test_records_keep_baseline_fields(records):
+    anomalies = detect_service_anomalies(records)
+    assert anomalies and all(list(a) == ANOMALY_COLUMNS for a in anomalies)
+    detailed = detect_service_anomalies(records, details=True)
+    assert {'metric', 'hour_of_week', 'observed', 'expected'} <= set(detailed[0])
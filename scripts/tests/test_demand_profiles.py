@@ -0,0 +1,56 @@
+"""
+Durham Region Transit Demand Profile Tests
+Checks peak demand lookups and the lazily loaded default index
+"""
+
+import pandas as pd
+import pytest
+import predictive_model
+from predictive_model import DemandProfileIndex, predict_peak_demand, DEMAND_PROFILES_ENV
+
+
+def hourly_rows():
+    grid = pd.MultiIndex.from_product(
+        [['R001', 'R002'], pd.date_range('2024-03-04', periods=14, freq='D'), range(24)],
+        names=['route_id', 'ride_date', 'hour_of_day']
+    ).to_frame(index=False)
+    grid['total_passengers'] = 10 + 100 * (grid['hour_of_day'] == 8) + 150 * (grid['hour_of_day'] == 17)
+    return grid
+
+
+@pytest.fixture(autouse=True)
+def reset_default_index(monkeypatch):
+    monkeypatch.setattr(predictive_model, '_default_profile_index', None)
+    monkeypatch.delenv(DEMAND_PROFILES_ENV, raising=False)
+
+
+def test_empty_index_raises_value_error():
+    empty = hourly_rows().iloc[:0]
+    with pytest.raises(ValueError, match='no routes'):
+        DemandProfileIndex().build(empty).predict(['R001'], ['2024-03-20'])
+    with pytest.raises(ValueError, match='no routes'):
+        DemandProfileIndex().predict(['R001'], ['2024-03-20'])
+
+
+def test_default_index_loads_from_environment(tmp_path, monkeypatch):
+    path = str(tmp_path / 'profiles.npz')
+    index = DemandProfileIndex().build(hourly_rows())
+    index.save(path)
+    monkeypatch.setenv(DEMAND_PROFILES_ENV, path)
+
+    predictions = predict_peak_demand('R001', '2024-03-20')
+    assert predictions == predict_peak_demand('R001', '2024-03-20', index)
+    assert predictions['morning_peak']['time'] == '8:00 AM'
+    assert predictions['evening_peak']['time'] == '5:00 PM'
+    assert predictive_model._default_profile_index is not None
+
+
+def test_default_index_builds_from_history():
+    predictions = predict_peak_demand('R002', '2024-03-20', history=hourly_rows())
+    assert predictions['evening_peak']['predicted_passengers'] == 160
+    assert predict_peak_demand('R002', '2024-03-20') == predictions
+
+
+def test_missing_default_index_raises_value_error():
+    with pytest.raises(ValueError, match=DEMAND_PROFILES_ENV):
+        predict_peak_demand('R001', '2024-03-20')
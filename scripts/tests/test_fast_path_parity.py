@@ -0,0 +1,124 @@
+"""
+Durham Region Transit Fast Path Parity Tests
+Checks every load mode against the baseline in-memory analyzer on generated trips
+"""
+
+import json
+import math
+import pandas as pd
+import pytest
+from generate_trip_data import generate_trips
+from ridership_analysis import RidershipAnalyzer
+from trip_database import TripDatabase
+from trip_dataset import TripDataset
+
+
+@pytest.fixture(scope='module', params=['numeric_ids', 'mixed_ids'])
+def trip_csv(request, tmp_path_factory):
+    """
+    Generated trips; mixed_ids adds one '<route>A' trip at the end of the
+    file, so only the last chunks see a non-numeric route id
+    """
+    trips = generate_trips(6000, routes=8, start_date='2024-11-01', days=10)
+    if request.param == 'mixed_ids':
+        trips.loc[len(trips) - 1, 'route_id'] = trips.loc[0, 'route_id'] + 'A'
+    path = str(tmp_path_factory.mktemp('trips') / 'trips.csv')
+    trips.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(scope='module')
+def baseline(trip_csv):
+    return RidershipAnalyzer(trip_csv, use_cache=False)
+
+
+def route_trips(analyzer: RidershipAnalyzer) -> dict:
+    table = analyzer._partials()
+    return table.groupby(table['route_id'].astype(str))['trips'].sum().to_dict()
+
+
+def report_metrics(analyzer: RidershipAnalyzer) -> dict:
+    """Every report metric, as the JSON the report would contain"""
+    metrics = {
+        'overview': analyzer.get_data_overview(),
+        'boardings': analyzer.compute_boardings_analysis(),
+        'ontime': analyzer.compute_ontime_performance(),
+        'productivity': analyzer.compute_productivity_metrics(),
+        'timeseries': analyzer.generate_time_series_data(),
+        'heatmap': analyzer.generate_heatmap_data()
+    }
+    metrics['recommendations'] = analyzer.generate_recommendations(metrics)
+    metrics['overview'].pop('fields')
+    return json.loads(json.dumps(metrics, default=str, sort_keys=True))
+
+
+def assert_close(actual, expected, path='metrics'):
+    """Equal structure and values, floats to 1e-9 relative"""
+    if isinstance(expected, dict):
+        assert sorted(actual) == sorted(expected), path
+        for key in expected:
+            assert_close(actual[key], expected[key], f'{path}.{key}')
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected), path
+        for i, (a, e) in enumerate(zip(actual, expected)):
+            assert_close(a, e, f'{path}[{i}]')
+    elif isinstance(expected, float) and isinstance(actual, (int, float)):
+        assert math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-9), (path, actual, expected)
+    else:
+        assert actual == expected, (path, actual, expected)
+
+
+def test_stream(trip_csv, baseline):
+    streamed = RidershipAnalyzer(trip_csv, chunksize=1700)
+    assert route_trips(streamed) == route_trips(baseline)
+    assert len(route_trips(streamed)) == streamed.get_data_overview()['unique_routes']
+    assert_close(report_metrics(streamed), report_metrics(baseline))
+
+
+def test_cache(trip_csv, baseline, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    miss = RidershipAnalyzer(trip_csv, cache_dir=cache_dir)
+    hit = RidershipAnalyzer(trip_csv, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(hit.df, miss.df)
+    assert_close(report_metrics(hit), report_metrics(baseline))
+
+
+def test_compact(trip_csv, baseline):
+    assert_close(report_metrics(RidershipAnalyzer(trip_csv, compact=True, use_cache=False)),
+                 report_metrics(baseline))
+
+
+def test_parallel_matches_serial_exactly(trip_csv, baseline):
+    serial = RidershipAnalyzer(trip_csv, chunksize=1700)
+    parallel = RidershipAnalyzer(trip_csv, workers=3, chunksize=1700)
+    pd.testing.assert_frame_equal(parallel.aggregates.table, serial.aggregates.table, check_exact=True)
+    pd.testing.assert_frame_equal(parallel.aggregates.sketches, serial.aggregates.sketches, check_exact=True)
+    assert report_metrics(parallel) == report_metrics(serial)
+    assert route_trips(parallel) == route_trips(baseline)
+    assert_close(report_metrics(parallel), report_metrics(baseline))
+
+
+def test_sql(trip_csv, baseline, tmp_path):
+    db = TripDatabase(str(tmp_path / 'trips.db'))
+    try:
+        db.load_csv(trip_csv, chunksize=2500)
+        assert_close(report_metrics(db.analyzer()), report_metrics(baseline))
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize('chunksize', [None, 1000])
+def test_dataset(trip_csv, baseline, tmp_path, chunksize):
+    trips = pd.read_csv(trip_csv, dtype=str)
+    half = len(trips) // 2
+    trips.iloc[:half].to_csv(tmp_path / 'part-0.csv', index=False)
+    trips.iloc[half:].to_csv(tmp_path / 'part-1.csv', index=False)
+    loaded = RidershipAnalyzer.from_dataset(TripDataset(str(tmp_path)), chunksize=chunksize)
+    assert route_trips(loaded) == route_trips(baseline)
+    assert_close(report_metrics(loaded), report_metrics(baseline))
+
+
+def test_state(trip_csv, baseline, tmp_path):
+    state_path = str(tmp_path / 'state.pkl')
+    RidershipAnalyzer(trip_csv, use_cache=False).save_state(state_path)
+    assert_close(report_metrics(RidershipAnalyzer.from_state(state_path)), report_metrics(baseline))
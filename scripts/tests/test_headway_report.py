@@ -0,0 +1,65 @@
+"""
+Durham Region Transit Headway Report Tests
+Checks headway thresholds and the optional headway report section
+"""
+
+import json
+import pandas as pd
+import pytest
+from generate_trip_data import generate_trips, iter_stop_events, write_gtfs_feed, write_stop_event_csvs
+from gtfs_reader import read_gtfs_feed
+from headway_analysis import BUNCHING_RATIO, GAP_RATIO, analyze_stop_events, summarize_regularity
+from report_generator import DRTReportGenerator
+
+
+@pytest.fixture(scope='module')
+def feed(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('gtfs') / 'gtfs.zip')
+    write_gtfs_feed(path, routes=3, stops=60, stops_per_trip=10)
+    return read_gtfs_feed(path)
+
+
+@pytest.fixture(scope='module')
+def events(feed):
+    return pd.concat(list(iter_stop_events(feed, start_date='2024-11-04', days=2)), ignore_index=True)
+
+
+@pytest.mark.parametrize('chunked', [False, True])
+def test_summary_reports_applied_thresholds(feed, events, tmp_path, chunked):
+    source = events
+    if chunked:
+        source = str(tmp_path / 'events')
+        write_stop_event_csvs(feed, source, start_date='2024-11-04', days=2)
+    default = summarize_regularity(analyze_stop_events(source, chunksize=5000 if chunked else 5_000_000))
+    custom = summarize_regularity(analyze_stop_events(source, chunksize=5000 if chunked else 5_000_000,
+                                                      bunching_ratio=0.5, gap_ratio=1.5))
+
+    assert default['thresholds'] == {'bunching_ratio': BUNCHING_RATIO, 'gap_ratio': GAP_RATIO}
+    assert custom['thresholds'] == {'bunching_ratio': 0.5, 'gap_ratio': 1.5}
+    assert custom['system']['bunching_pct'] >= default['system']['bunching_pct']
+
+
+@pytest.fixture
+def trip_csv(tmp_path):
+    path = str(tmp_path / 'trips.csv')
+    generate_trips(2000, routes=5, start_date='2024-11-04', days=3).to_csv(path, index=False)
+    return path
+
+
+def test_report_without_stop_events_leaves_headways_out(trip_csv, tmp_path):
+    generator = DRTReportGenerator(trip_csv)
+    report = generator.generate_full_report()
+    assert 'headway_regularity' not in report['metrics']
+
+    summary_path = str(tmp_path / 'summary.txt')
+    generator.export_summary_text(summary_path)
+    with open(summary_path) as f:
+        assert 'Headway Regularity' not in f.read()
+
+
+def test_report_with_stop_events_includes_headways(trip_csv, feed, tmp_path):
+    events_dir = str(tmp_path / 'events')
+    write_stop_event_csvs(feed, events_dir, start_date='2024-11-04', days=1)
+    report = DRTReportGenerator(trip_csv, stop_events=events_dir).generate_full_report()
+    assert report['metrics']['headway_regularity']['stops_analyzed'] > 0
+    json.dumps(report['metrics']['headway_regularity']['thresholds'])
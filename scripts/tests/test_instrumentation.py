@@ -0,0 +1,89 @@
+"""
+Durham Region Transit Instrumentation Tests
+Checks that one tracer can be shared by concurrent threads and scoped to a run
+"""
+
+import json
+import threading
+import time
+from generate_trip_data import generate_trips
+from instrumentation import Tracer, active_tracer, stage, use_tracer
+from report_generator import DRTReportGenerator
+
+
+def test_threads_nest_their_own_stages(tmp_path):
+    trace_path = str(tmp_path / 'trace.jsonl')
+    tracer = Tracer(trace_path)
+    threads, rounds = 8, 50
+    start = threading.Barrier(threads)
+
+    def work(worker):
+        start.wait()
+        for i in range(rounds):
+            with tracer.stage(f'outer-{worker}'):
+                with tracer.stage(f'inner-{worker}', payload='x' * 2000):
+                    time.sleep(0)
+
+    pool = [threading.Thread(target=work, args=(worker,)) for worker in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    with open(trace_path) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == len(tracer.records) == threads * rounds * 2
+    for record in lines:
+        worker = record['stage'].split('-')[1]
+        if record['stage'].startswith('inner'):
+            assert record['parent'] == f'outer-{worker}' and record['depth'] == 1
+        else:
+            assert record['parent'] is None and record['depth'] == 0
+
+
+def test_use_tracer_routes_only_the_calling_thread():
+    routed, seen = Tracer(), {}
+    entered, release = threading.Event(), threading.Event()
+
+    def other_thread():
+        entered.wait()
+        seen['tracer'] = active_tracer()
+        release.set()
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    with use_tracer(routed):
+        with stage('routed'):
+            entered.set()
+            release.wait()
+    thread.join()
+
+    assert seen['tracer'] is not routed
+    assert [r['stage'] for r in routed.records] == ['routed']
+    assert active_tracer() is not routed
+
+
+def test_summary_since_mark_skips_earlier_and_evicted_stages():
+    tracer = Tracer(max_records=3)
+    for name in ('a', 'b'):
+        with tracer.stage(name):
+            pass
+    mark = tracer.mark()
+    for name in ('c', 'd'):
+        with tracer.stage(name):
+            pass
+    assert [s['stage'] for s in tracer.summary(since=mark)['stages']] == ['c', 'd']
+    assert [s['stage'] for s in tracer.summary()['stages']] == ['b', 'c', 'd']
+
+
+def test_regenerated_report_times_only_its_own_run(tmp_path):
+    trip_csv = str(tmp_path / 'trips.csv')
+    generate_trips(2000, routes=4, start_date='2024-11-04', days=3).to_csv(trip_csv, index=False)
+    generator = DRTReportGenerator(trip_csv, use_cache=False)
+
+    first = generator.generate_full_report()['metadata']['performance']
+    second = generator.generate_full_report()['metadata']['performance']
+    top_level = [s['stage'] for s in second['stages'] if s.get('parent') is None]
+    assert 'analyzer.load' in [s['stage'] for s in first['stages']]
+    assert top_level == ['report.generate']
+    assert second['total_wall_s'] == round(second['stages'][-1]['wall_s'], 3)
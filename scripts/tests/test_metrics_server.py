@@ -0,0 +1,114 @@
+"""
+Durham Region Transit Metrics Server Tests
+Checks that concurrent identical cache misses compute once
+"""
+
+import threading
+import time
+import pandas as pd
+import pytest
+from generate_trip_data import generate_trips
+from metrics_server import MetricsQueryService, TTLLRUCache
+from ridership_analysis import RidershipAnalyzer
+
+
+def run_concurrently(threads: int, target):
+    start = threading.Barrier(threads)
+    results, errors = [None] * threads, []
+
+    def worker(i):
+        start.wait()
+        try:
+            results[i] = target()
+        except Exception as exc:
+            errors.append(exc)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_misses_compute_once():
+    cache, calls = TTLLRUCache(), []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'value'
+
+    results, errors = run_concurrently(8, lambda: cache.get_or_compute('key', compute))
+    assert not errors and len(calls) == 1
+    assert sorted(cached for _, cached in results) == [False] + [True] * 7
+    assert {value for value, _ in results} == {'value'}
+    assert cache.get_or_compute('key', compute) == ('value', True)
+    assert cache.stats()['misses'] == 1 and cache.stats()['in_flight'] == 0
+
+
+def test_failed_compute_is_raised_to_waiters_and_not_cached():
+    cache, calls = TTLLRUCache(), []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        raise RuntimeError('query failed')
+
+    results, errors = run_concurrently(4, lambda: cache.get_or_compute('key', compute))
+    assert len(calls) == 1 and len(errors) == 4
+    assert cache.get_or_compute('key', lambda: 'retried') == ('retried', False)
+
+
+def test_result_computed_across_clear_is_not_stored():
+    cache = TTLLRUCache()
+
+    def compute():
+        cache.clear()
+        return 'stale'
+
+    assert cache.get_or_compute('key', compute) == ('stale', False)
+    assert cache.get('key') is None
+
+
+
+def test_miss_after_clear_does_not_wait_on_the_old_computation():
+    cache, started, release = TTLLRUCache(), threading.Event(), threading.Event()
+
+    def compute_old():
+        started.set()
+        release.wait(5)
+        return 'old'
+
+    leader = threading.Thread(target=cache.get_or_compute, args=('key', compute_old))
+    leader.start()
+    started.wait(5)
+    cache.clear()
+    assert cache.get_or_compute('key', lambda: 'fresh') == ('fresh', False)
+    release.set()
+    leader.join()
+    assert cache.get('key') == 'fresh'
+    assert cache.stats()['in_flight'] == 0
+
+@pytest.fixture
+def service(tmp_path):
+    path = str(tmp_path / 'trips.csv')
+    generate_trips(3000, routes=6, start_date='2024-11-04', days=5).to_csv(path, index=False)
+    return MetricsQueryService(RidershipAnalyzer(path))
+
+
+def test_service_answers_identical_concurrent_queries_once(service, monkeypatch):
+    calls = []
+    original = RidershipAnalyzer.compute_boardings_analysis
+
+    def counted(self):
+        calls.append(1)
+        time.sleep(0.2)
+        return original(self)
+
+    monkeypatch.setattr(RidershipAnalyzer, 'compute_boardings_analysis', counted)
+    params = {'route': ['101,102'], 'start': ['2024-11-05']}
+    results, errors = run_concurrently(6, lambda: service.query('/api/boardings', params))
+    assert not errors and len(calls) == 1
+    assert {(status, body) for status, body, _ in results} == {results[0][:2]}
+    assert results[0][0] == 200
@@ -0,0 +1,67 @@
+"""
+Durham Region Transit Performance Metrics Tests
+Re-materialization of performance_metrics from trip records
+"""
+
+import sqlite3
+import pytest
+from etl_pipeline import materialize_performance_metrics
+from generate_trip_data import generate_trips
+
+
+def stored_keys(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return set(conn.execute('SELECT route_id, metric_date FROM performance_metrics'))
+
+
+@pytest.fixture
+def trips():
+    return generate_trips(5000, routes=8, start_date='2024-01-01', days=20)
+
+
+@pytest.mark.parametrize('start_date, end_date', [
+    (None, None), ('2024-01-05', None), (None, '2024-01-15'), ('2024-01-05', '2024-01-15')
+])
+def test_rerun_with_shrunken_source_removes_stale_rows(tmp_path, trips, start_date, end_date):
+    db_path = str(tmp_path / 'metrics.db')
+    materialize_performance_metrics(db_path, trips, start_date, end_date)
+
+    # Drop one route from the source, then run again
+    shrunken = trips[trips['route_id'] != trips['route_id'].iloc[0]]
+    materialize_performance_metrics(db_path, shrunken, start_date, end_date)
+
+    fresh_path = str(tmp_path / 'fresh.db')
+    materialize_performance_metrics(fresh_path, shrunken, start_date, end_date)
+    assert stored_keys(db_path) == stored_keys(fresh_path)
+
+
+def test_bounded_rerun_keeps_rows_outside_range(tmp_path, trips):
+    db_path = str(tmp_path / 'metrics.db')
+    materialize_performance_metrics(db_path, trips)
+    before = stored_keys(db_path)
+
+    materialize_performance_metrics(db_path, trips.iloc[:0], '2024-01-05', '2024-01-06')
+    after = stored_keys(db_path)
+    assert after == {key for key in before if not '2024-01-05' <= key[1] <= '2024-01-06'}
+
+
+def test_bounded_rerun_removes_days_missing_from_source(tmp_path, trips):
+    db_path = str(tmp_path / 'metrics.db')
+    materialize_performance_metrics(db_path, trips)
+
+    shrunken = trips[trips['trip_date'].astype(str) < '2024-01-12']
+    materialize_performance_metrics(db_path, shrunken, '2024-01-05', '2024-01-15')
+    assert not {key for key in stored_keys(db_path) if '2024-01-12' <= key[1] <= '2024-01-15'}
+    assert {key for key in stored_keys(db_path) if key[1] > '2024-01-15'}
+
+
+def test_unbounded_rerun_only_prunes_days_in_source(tmp_path, trips):
+    db_path = str(tmp_path / 'metrics.db')
+    materialize_performance_metrics(db_path, trips)
+    before = stored_keys(db_path)
+
+    materialize_performance_metrics(db_path, trips[trips['trip_date'].astype(str) <= '2024-01-05'])
+    assert stored_keys(db_path) == before
+
+    materialize_performance_metrics(db_path, trips.iloc[:0])
+    assert stored_keys(db_path) == before
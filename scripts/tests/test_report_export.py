@@ -0,0 +1,31 @@
+"""
+Durham Region Transit Report Export Tests
+Checks that binary (.npz) tables load with the same values as the JSON export
+"""
+
+import json
+import pytest
+from report_export import export_sections, load_section
+
+
+@pytest.fixture
+def report_data():
+    rows = [
+        {'route_id': '101', 'route_name': 'Route 2 Corridor', 'trips': 12, 'delay': 1.5, 'on_time': True},
+        {'route_id': '102', 'route_name': None, 'trips': None, 'delay': float('nan'), 'on_time': None},
+        {'route_id': '10A', 'route_name': 'Route 10A', 'trips': 7, 'delay': None, 'on_time': False},
+        {'route_id': None, 'route_name': float('nan'), 'trips': 3, 'delay': 2.25, 'on_time': True},
+    ]
+    return {'routes': {'daily': rows, 'count': len(rows)}}
+
+
+@pytest.mark.parametrize('layout', ['records', 'columnar'])
+def test_binary_tables_round_trip_missing_values(tmp_path, report_data, layout):
+    export_sections(report_data, str(tmp_path / 'json'), layout=layout)
+    export_sections(report_data, str(tmp_path / 'npz'), layout=layout, binary_tables=True, min_binary_rows=1)
+
+    from_json = load_section(str(tmp_path / 'json'), 'routes')
+    from_npz = load_section(str(tmp_path / 'npz'), 'routes')
+    # json.dumps writes NaN as NaN, so equal dumps mean equal values and types
+    assert json.dumps(from_npz, sort_keys=True) == json.dumps(from_json, sort_keys=True)
+    assert json.dumps(from_npz, sort_keys=True) == json.dumps(report_data['routes'], sort_keys=True)
@@ -0,0 +1,41 @@
+"""
+Durham Region Transit Ridership Model Tests
+Checks train_ridership_model return values and holdout handling
+"""
+
+import pandas as pd
+import pytest
+from predictive_model import RidershipModel, train_ridership_model
+
+pytest.importorskip('sklearn')
+
+
+def hourly_rows(days):
+    grid = pd.MultiIndex.from_product(
+        [['R001', 'R002'], pd.date_range('2024-03-04', periods=days, freq='D'), range(24)],
+        names=['route_id', 'ride_date', 'hour_of_day']
+    ).to_frame(index=False)
+    grid['total_passengers'] = 20 + grid['hour_of_day'] * 3
+    return grid
+
+
+def test_returns_metrics_dict_by_default():
+    metrics = train_ridership_model(hourly_rows(7), n_estimators=5)
+    assert isinstance(metrics, dict)
+    assert {'r2_score', 'mae', 'rmse', 'train_date'} <= set(metrics)
+    assert metrics['validation_samples'] >= 2
+
+
+def test_return_model_flag(tmp_path):
+    model, metrics = train_ridership_model(hourly_rows(7), model_path=str(tmp_path / 'model.pkl'),
+                                           return_model=True, n_estimators=5)
+    assert isinstance(model, RidershipModel) and isinstance(metrics, dict)
+    assert len(RidershipModel.load(str(tmp_path / 'model.pkl')).predict_week('2024-03-11')) == 2 * 7 * 24
+
+
+@pytest.mark.parametrize('rows', [1, 2, 3])
+def test_tiny_history_skips_holdout_metrics(rows):
+    metrics = train_ridership_model(hourly_rows(1).head(rows), n_estimators=5)
+    assert metrics['validation_samples'] == 0
+    assert metrics['training_samples'] == rows
+    assert metrics['r2_score'] is None and metrics['mae'] is None and metrics['rmse'] is None
@@ -0,0 +1,76 @@
+"""
+Durham Region Transit Ridership Transform Tests
+Checks rolling averages and outlier filtering in transform_ridership_data
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from etl_pipeline import transform_ridership_data
+
+
+@pytest.fixture
+def ridership():
+    """Shuffled hourly rows with a non-default index and some missing route ids"""
+    rng = np.random.default_rng(3)
+    rows = 400
+    df = pd.DataFrame({
+        'route_id': rng.choice(['R001', 'R002', 'R003', None], rows),
+        'ride_date': (pd.Timestamp('2024-02-01') + pd.to_timedelta(rng.integers(0, 30, rows), unit='D')).strftime('%Y-%m-%d'),
+        'hour_of_day': rng.integers(5, 23, rows),
+        'total_passengers': rng.integers(10, 200, rows)
+    })
+    return df.set_axis(rng.permutation(rows) + 1000)
+
+
+def reference_rolling(df: pd.DataFrame) -> np.ndarray:
+    """Mean of the same route's rows in the 7 days up to and including each row (rows are time-sorted)"""
+    route = df['route_id'].fillna('<missing>').to_numpy()
+    ts = df['ride_ts'].to_numpy()
+    values = df['total_passengers'].to_numpy(dtype=np.float64)
+    window = np.timedelta64(7, 'D')
+    position = np.arange(len(df))
+    return np.array([
+        values[(route == route[i]) & (position <= i) & (ts > ts[i] - window)].mean()
+        for i in range(len(df))
+    ])
+
+
+def test_rolling_average_per_route_including_missing_ids(ridership):
+    result = transform_ridership_data(ridership, outlier_keys=())
+    assert len(result) == len(ridership)
+    assert result['route_id'].isna().sum() == ridership['route_id'].isna().sum()
+    assert result['rolling_avg_7d'].notna().all()
+    np.testing.assert_allclose(result['rolling_avg_7d'], reference_rolling(result))
+
+
+@pytest.fixture
+def sparse_ridership():
+    """Like the pipeline's sample: too few rows per (route, hour of week) to bound, with spikes"""
+    rng = np.random.default_rng(11)
+    rows = 1000
+    df = pd.DataFrame({
+        'route_id': rng.choice(['R001', 'R002', 'R003', 'R004'], rows),
+        'ride_date': pd.Timestamp('2024-02-01') + pd.to_timedelta(rng.integers(0, 30, rows), unit='D'),
+        'hour_of_day': rng.integers(0, 24, rows),
+        'total_passengers': rng.integers(50, 100, rows)
+    })
+    df.loc[:4, 'total_passengers'] = 5000
+    return df
+
+
+def test_undersized_groups_fall_back_to_coarser_groupings(sparse_ridership):
+    result, report = transform_ridership_data(sparse_ridership, return_report=True)
+    assert report['rows'].max() < 8
+    assert (result['total_passengers'] < 5000).all()
+    assert report['unchecked'].sum() == 0
+
+
+def test_without_fallbacks_small_groups_are_left_unchecked(sparse_ridership):
+    result, report = transform_ridership_data(sparse_ridership, return_report=True, outlier_fallbacks=())
+    assert len(result) == len(sparse_ridership)
+    assert report['unchecked'].sum() == len(sparse_ridership)
+
+    result, report = transform_ridership_data(sparse_ridership, return_report=True, min_group_size=2,
+                                              outlier_fallbacks=())
+    assert report['unchecked'].sum() < len(sparse_ridership)
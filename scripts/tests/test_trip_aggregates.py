@@ -0,0 +1,78 @@
+"""
+Durham Region Transit Trip Aggregates Tests
+Checks that restated route-days replace, rather than add to, earlier partials
+"""
+
+import pandas as pd
+import pytest
+from generate_trip_data import generate_trips
+from ridership_analysis import RidershipAnalyzer
+from time_segmentation import DRT_SERVICE_PERIODS
+from trip_aggregates import TripAggregates
+
+RESTATED_DAY = pd.Timestamp('2024-01-03')
+
+
+def enriched(trips: pd.DataFrame) -> pd.DataFrame:
+    trips = trips.copy()
+    RidershipAnalyzer._empty(DRT_SERVICE_PERIODS).enrich(trips)
+    return trips
+
+
+@pytest.fixture
+def trips():
+    return enriched(generate_trips(2000, routes=5, start_date='2024-01-01', days=5))
+
+
+@pytest.fixture(params=['all_routes', 'one_route'])
+def restatement(request, trips):
+    corrected = trips[trips['trip_date'] == RESTATED_DAY].copy()
+    if request.param == 'one_route':
+        corrected = corrected[corrected['route_id'] == corrected['route_id'].iloc[0]]
+    corrected = corrected.head(50)
+    corrected['boardings'] += 7
+    return corrected
+
+
+def sorted_frame(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(list(df.columns[:4])).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('state', ['table_and_sketches', 'sketches_only', 'empty'])
+def test_restated_day_replaces_previous_partials(trips, restatement, state):
+    full = TripAggregates.from_frame(trips)
+    if state == 'sketches_only':
+        aggregates = TripAggregates(sketches=full.sketches, fields=full.fields)
+    elif state == 'empty':
+        aggregates = TripAggregates()
+    else:
+        aggregates = full
+
+    replaced = aggregates.replace_days(TripAggregates.from_frame(restatement))
+
+    restated = (trips['trip_date'] == RESTATED_DAY) & trips['route_id'].isin(restatement['route_id'])
+    kept = trips[~restated] if state != 'empty' else trips.iloc[:0]
+    expected = TripAggregates.from_frame(pd.concat([kept, restatement], ignore_index=True))
+    assert replaced == ([] if state == 'empty' else ['2024-01-03'])
+    pd.testing.assert_frame_equal(sorted_frame(aggregates.sketches), sorted_frame(expected.sketches))
+    if state == 'sketches_only':
+        expected = TripAggregates.from_frame(restatement)
+    pd.testing.assert_frame_equal(aggregates.table, expected.table)
+
+
+@pytest.mark.parametrize('options', [{}, {'replace_days': True}])
+def test_append_adds_by_default_and_replaces_only_restated_route_days(tmp_path, options):
+    raw = generate_trips(2000, routes=5, start_date='2024-01-01', days=5)
+    path = str(tmp_path / 'trips.csv')
+    raw.to_csv(path, index=False)
+    analyzer = RidershipAnalyzer(path, use_cache=False)
+
+    dates = pd.to_datetime(raw['trip_date'])
+    correction = raw[(dates == RESTATED_DAY) & (raw['route_id'] == raw['route_id'].iloc[0])]
+    analyzer.append(correction.copy(), **options)
+
+    trips = analyzer._partials().groupby('route_id')['trips'].sum()
+    expected = raw['route_id'].value_counts()
+    if not options:
+        expected = expected.add(correction['route_id'].value_counts(), fill_value=0)
+    assert trips.to_dict() == expected.astype(int).to_dict()
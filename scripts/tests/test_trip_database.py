@@ -0,0 +1,50 @@
+"""
+Durham Region Transit Trip Database Tests
+Checks that SQL-side partials match the in-memory partials, dtypes included
+"""
+
+import pandas as pd
+import pytest
+from generate_trip_data import generate_trips
+from ridership_analysis import RidershipAnalyzer
+from trip_aggregates import TripAggregates
+from trip_database import TripDatabase
+
+
+@pytest.fixture(params=['numeric', 'text'])
+def trip_csv(request, tmp_path):
+    trips = generate_trips(3000, routes=8, start_date='2024-11-04', days=6)
+    if request.param == 'text':
+        trips['route_id'] = 'R' + trips['route_id']
+    path = str(tmp_path / 'trips.csv')
+    trips.to_csv(path, index=False)
+    return path
+
+
+def test_sql_partials_match_frame_partials(trip_csv, tmp_path):
+    frame = RidershipAnalyzer(trip_csv)
+    frame.get_data_overview()
+    db = TripDatabase(str(tmp_path / 'trips.db'))
+    db.load_csv(trip_csv, chunksize=1000)
+    sql = db.aggregates()
+
+    assert sql.table['route_id'].dtype == frame.aggregates.table['route_id'].dtype
+    assert sql.sketches['route_id'].dtype == frame.aggregates.sketches['route_id'].dtype
+    pd.testing.assert_frame_equal(sql.table, frame.aggregates.table)
+
+    routes = frame.aggregates.table['route_id'].unique()[:2].tolist()
+    subset = db.aggregates(routes=routes).table
+    assert sorted(subset['route_id'].unique().tolist()) == sorted(routes)
+
+
+def test_route_ids_are_always_text():
+    db = TripDatabase(':memory:')
+    assert db.aggregates().table.empty
+    trips = generate_trips(500, routes=4, start_date='2024-11-04', days=2)
+    enricher = RidershipAnalyzer.from_aggregates(TripAggregates())
+    numeric = trips.assign(route_id=trips['route_id'].astype('int64'))
+    enricher.enrich(numeric)
+    db.insert_trips(numeric)
+    aggregates = db.aggregates()
+    assert aggregates.table['route_id'].map(type).eq(str).all()
+    assert aggregates.sketches['route_id'].map(type).eq(str).all()